@@ -0,0 +1,212 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from contract_pipeline import CONTRACT_FACT_COLUMNS, Clause, DatabaseManager, content_hash, contract_fact_row
+from src.data_processing.parse_workers import analyze_text, init_worker
+from src.utils.metrics import PipelineMetrics
+
+# Queue marker telling a stage that its producer is done
+_DONE = object()
+
+_CONTRACT_FACTS_UPSERT = f"""
+INSERT INTO contract_facts (contract_id, {', '.join(CONTRACT_FACT_COLUMNS)})
+VALUES ({', '.join(f'${i}' for i in range(1, len(CONTRACT_FACT_COLUMNS) + 2))})
+ON CONFLICT (contract_id) DO UPDATE SET
+    {', '.join(f'{key} = EXCLUDED.{key}' for key in CONTRACT_FACT_COLUMNS)},
+    updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def asyncpg_connect_args(db_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate psycopg2-style connection settings to asyncpg keyword arguments"""
+    renamed = {'dbname': 'database'}
+    return {renamed.get(key, key): value for key, value in db_config.items()}
+
+
+class AsyncDatabaseManager:
+    """Writes parsed contracts with asyncpg, against the schema from DatabaseManager.initialize_schema"""
+
+    def __init__(self, db_config: Dict[str, Any], min_size: int = 1, max_size: int = 4,
+                 text_storage: str = 'inline', batch_size: int = 1000):
+        self.db_config = db_config
+        self.text_storage = text_storage
+        self.batch_size = batch_size  # rows per executemany call
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool = None
+
+    async def connect(self):
+        self.pool = await asyncpg.create_pool(
+            min_size=self.min_size, max_size=self.max_size, **asyncpg_connect_args(self.db_config))
+
+    async def disconnect(self):
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+
+    async def store_contract(self, contract_name: str, raw_text: str, digest: str,
+                             clauses: List[Clause]) -> Tuple[int, bool]:
+        """
+        Store a contract with its clauses and data points in one transaction
+        Returns: (contract_id, False if the contract was already processed and skipped)
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                existing = await conn.fetchrow(
+                    "SELECT contract_id, processed FROM contracts WHERE content_hash = $1", digest)
+                if existing and existing['processed']:
+                    return existing['contract_id'], False
+                if existing:
+                    contract_id = existing['contract_id']
+                else:
+                    inline_text, blob_text, blob_z = DatabaseManager.text_columns(raw_text, self.text_storage)
+                    contract_id = await conn.fetchval("""
+                    INSERT INTO contracts (contract_name, raw_text, content_hash) VALUES ($1, $2, $3)
+                    ON CONFLICT (content_hash) DO UPDATE SET contract_name = contracts.contract_name
+                    RETURNING contract_id
+                    """, contract_name, inline_text, digest)
+                    if inline_text is None:
+                        await conn.execute("""
+                        INSERT INTO contract_texts (contract_id, raw_text, raw_text_z) VALUES ($1, $2, $3)
+                        ON CONFLICT (contract_id) DO NOTHING
+                        """, contract_id, blob_text, blob_z)
+                clause_rows, data_point_rows = DatabaseManager.contract_rows(contract_id, clauses)
+                await self._executemany(conn, """
+                INSERT INTO clauses (contract_id, section_number, header, content, clause_type,
+                                     content_start, content_end)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
+                ON CONFLICT (contract_id, clause_type) DO UPDATE SET
+                    section_number = EXCLUDED.section_number,
+                    header = EXCLUDED.header,
+                    content = EXCLUDED.content,
+                    content_start = EXCLUDED.content_start,
+                    content_end = EXCLUDED.content_end,
+                    created_at = EXCLUDED.created_at
+                """, clause_rows)
+                await self._executemany(conn, """
+                INSERT INTO data_points (contract_id, clause_type, data_key, data_value, data_type,
+                                         value_int, value_num, value_bool, value_date)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                ON CONFLICT (contract_id, clause_type, data_key) DO UPDATE SET
+                    data_value = EXCLUDED.data_value,
+                    data_type = EXCLUDED.data_type,
+                    value_int = EXCLUDED.value_int,
+                    value_num = EXCLUDED.value_num,
+                    value_bool = EXCLUDED.value_bool,
+                    value_date = EXCLUDED.value_date,
+                    created_at = EXCLUDED.created_at
+                """, data_point_rows)
+                await conn.execute(_CONTRACT_FACTS_UPSERT, *contract_fact_row(contract_id, data_point_rows))
+                await conn.execute("UPDATE contracts SET processed = TRUE WHERE contract_id = $1", contract_id)
+        return contract_id, True
+
+    async def _executemany(self, conn, sql: str, rows: List[tuple]):
+        for start in range(0, len(rows), self.batch_size):
+            await conn.executemany(sql, rows[start:start + self.batch_size])
+
+
+class AsyncContractPipeline:
+    """
+    Staged ingestion: reader -> parser -> writer, connected by bounded queues
+
+    Files are read in a thread, parsed in a process pool and written by a few
+    concurrent asyncpg writers. A full queue blocks the stage that feeds it,
+    so a slow database holds back reading instead of piling up parsed
+    contracts in memory, while parsing continues during DB round trips.
+    Each contract is committed in its own transaction; there is no group
+    commit. Parser metrics collected by the worker processes are merged into
+    metrics, along with a "store_contract" stage timing each write.
+    """
+
+    def __init__(self, db_config: Dict[str, Any], parser_workers: int = 1, writers: int = 2,
+                 queue_size: int = 16, text_storage: str = 'inline', batch_size: int = 1000,
+                 metrics: Optional[PipelineMetrics] = None, max_repeat: Optional[int] = None,
+                 time_budget_ms: Optional[float] = None):
+        self.db = AsyncDatabaseManager(db_config, min_size=1, max_size=writers, text_storage=text_storage,
+                                       batch_size=batch_size)
+        self.parser_workers = parser_workers
+        self.writers = writers
+        self.queue_size = queue_size
+        self.metrics = metrics
+        # init_worker arguments for the parser processes
+        self.worker_args = (metrics is not None, max_repeat, time_budget_ms)
+
+    async def run(self, paths: List[str],
+                  on_stored: Optional[Callable[[str, str, int, bool], None]] = None) -> int:
+        """
+        Ingest the given contract files
+        on_stored(path, content_hash, contract_id, stored) is called as each
+        contract is committed.
+        Returns: number of contracts written
+        """
+        read_queue = asyncio.Queue(self.queue_size)
+        write_queue = asyncio.Queue(self.queue_size)
+        written = 0
+
+        async def read():
+            for path in paths:
+                text = await asyncio.to_thread(self._read_file, path)
+                await read_queue.put((path, text))
+            for _ in range(self.parser_workers):
+                await read_queue.put(_DONE)
+
+        parsers_left = self.parser_workers
+
+        async def parse(executor):
+            nonlocal parsers_left
+            loop = asyncio.get_running_loop()
+            while (item := await read_queue.get()) is not _DONE:
+                path, text = item
+                clauses, worker_metrics = await loop.run_in_executor(executor, analyze_text, text)
+                if worker_metrics is not None:
+                    self.metrics.merge(worker_metrics)
+                await write_queue.put((path, text, clauses))
+            parsers_left -= 1
+            if parsers_left == 0:
+                for _ in range(self.writers):
+                    await write_queue.put(_DONE)
+
+        async def write():
+            nonlocal written
+            while (item := await write_queue.get()) is not _DONE:
+                path, text, clauses = item
+                digest = content_hash(text)
+                start = time.perf_counter()
+                contract_id, stored = await self.db.store_contract(os.path.basename(path), text, digest, clauses)
+                if self.metrics is not None:
+                    self.metrics.observe_stage('store_contract', time.perf_counter() - start)
+                if stored:
+                    written += 1
+                    print(f"✓ {os.path.basename(path)}: {len(clauses)} clauses stored with ID {contract_id}")
+                else:
+                    print(f"✓ {os.path.basename(path)}: unchanged, already stored with ID {contract_id}")
+                if on_stored:
+                    on_stored(path, digest, contract_id, stored)
+
+        await self.db.connect()
+        try:
+            with ProcessPoolExecutor(self.parser_workers, initializer=init_worker,
+                                     initargs=self.worker_args) as executor:
+                tasks = [asyncio.create_task(read())]
+                tasks += [asyncio.create_task(parse(executor)) for _ in range(self.parser_workers)]
+                tasks += [asyncio.create_task(write()) for _ in range(self.writers)]
+                try:
+                    await asyncio.gather(*tasks)
+                except BaseException:
+                    # A failed stage would leave the others blocked on their queues
+                    for task in tasks:
+                        task.cancel()
+                    raise
+        finally:
+            await self.db.disconnect()
+        return written
+
+    @staticmethod
+    def _read_file(path: str) -> str:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
@@ -0,0 +1,350 @@
+"""
+Bulk backfill of a contract corpus
+
+For initial loads and full re-ingests, where the per-contract pipeline spends
+most of its time in round trips and index maintenance. Contracts are parsed
+in worker processes as usual, but their rows are streamed with COPY FROM
+STDIN into UNLOGGED staging tables and merged into contracts, contract_texts,
+clauses, data_points and contract_facts with one set-based INSERT ... SELECT
+per table every --merge-every contracts. Secondary indexes are dropped before
+the load and built once at the end.
+
+Usage:
+    python backfill.py [--config config/config.json] [--folder data/raw] [--workers 4]
+        [--merge-every 50000] [--text-storage inline] [--keep-indexes]
+
+Dropping the secondary indexes slows down queries on the same database until
+the backfill finishes; use --keep-indexes when it is serving reads.
+"""
+
+import argparse
+import io
+import os
+import time
+from multiprocessing import Pool
+from typing import Callable, Dict, List, Optional
+
+from contract_pipeline import (CONTRACT_FACT_COLUMNS, PARTITIONING_MODES, TEXT_STORAGE_MODES, Clause,
+                               DatabaseManager, content_hash, contract_fact_row)
+from src.data_ingestion.contract_files import list_contract_files, select_changed_files
+from src.data_ingestion.manifest import IngestManifest
+from src.data_processing.parse_workers import analyze_file, init_worker
+from src.utils.config import load_db_config
+from src.utils.database_connection import ConnectionPool
+
+# Staging table -> columns, in COPY order. stage_id stands in for contract_id until the merge assigns it.
+STAGING_COLUMNS = {
+    'staging_contracts': ('stage_id', 'contract_name', 'content_hash', 'raw_text', 'blob_text', 'blob_z'),
+    'staging_clauses': ('stage_id', 'section_number', 'header', 'content', 'clause_type',
+                        'content_start', 'content_end'),
+    'staging_data_points': ('stage_id', 'clause_type', 'data_key', 'data_value', 'data_type',
+                            'value_int', 'value_num', 'value_bool', 'value_date'),
+    'staging_contract_facts': ('stage_id', *CONTRACT_FACT_COLUMNS),
+}
+
+# UNLOGGED: no WAL for rows that are merged and truncated within the same run
+STAGING_SQL = f"""
+CREATE UNLOGGED TABLE IF NOT EXISTS staging_contracts (
+    stage_id BIGINT PRIMARY KEY,
+    contract_name VARCHAR(255),
+    content_hash CHAR(64),
+    raw_text TEXT,
+    blob_text TEXT,
+    blob_z BYTEA,
+    contract_id INTEGER
+);
+CREATE UNLOGGED TABLE IF NOT EXISTS staging_clauses (
+    stage_id BIGINT,
+    section_number VARCHAR(10),
+    header TEXT,
+    content TEXT,
+    clause_type VARCHAR(50),
+    content_start INTEGER,
+    content_end INTEGER
+);
+CREATE UNLOGGED TABLE IF NOT EXISTS staging_data_points (
+    stage_id BIGINT,
+    clause_type VARCHAR(50),
+    data_key VARCHAR(100),
+    data_value TEXT,
+    data_type VARCHAR(20),
+    value_int BIGINT,
+    value_num NUMERIC,
+    value_bool BOOLEAN,
+    value_date DATE
+);
+CREATE UNLOGGED TABLE IF NOT EXISTS staging_contract_facts (
+    stage_id BIGINT,
+    {', '.join(f'{key} {column_type}' for key, column_type in CONTRACT_FACT_COLUMNS.items())}
+);
+TRUNCATE {', '.join(STAGING_COLUMNS)};
+"""
+
+# One statement per target table, run in order inside a single transaction
+MERGE_SQL = (
+    """
+    ANALYZE staging_contracts, staging_clauses, staging_data_points, staging_contract_facts
+    """,
+    """
+    INSERT INTO contracts (contract_name, raw_text, content_hash)
+    SELECT contract_name, raw_text, content_hash FROM staging_contracts
+    ON CONFLICT (content_hash) DO NOTHING
+    """,
+    # Contracts already stored and processed keep their rows; the rest are (re)written
+    """
+    UPDATE staging_contracts s SET contract_id = c.contract_id
+    FROM contracts c
+    WHERE c.content_hash = s.content_hash AND NOT c.processed
+    """,
+    """
+    INSERT INTO contract_texts (contract_id, raw_text, raw_text_z)
+    SELECT contract_id, blob_text, blob_z FROM staging_contracts
+    WHERE contract_id IS NOT NULL AND (blob_text IS NOT NULL OR blob_z IS NOT NULL)
+    ON CONFLICT (contract_id) DO UPDATE SET
+        raw_text = EXCLUDED.raw_text,
+        raw_text_z = EXCLUDED.raw_text_z
+    """,
+    """
+    INSERT INTO clauses (contract_id, section_number, header, content, clause_type, content_start, content_end)
+    SELECT s.contract_id, c.section_number, c.header, c.content, c.clause_type, c.content_start, c.content_end
+    FROM staging_clauses c JOIN staging_contracts s USING (stage_id)
+    WHERE s.contract_id IS NOT NULL
+    ON CONFLICT (contract_id, clause_type) DO UPDATE SET
+        section_number = EXCLUDED.section_number,
+        header = EXCLUDED.header,
+        content = EXCLUDED.content,
+        content_start = EXCLUDED.content_start,
+        content_end = EXCLUDED.content_end,
+        created_at = EXCLUDED.created_at
+    """,
+    """
+    INSERT INTO data_points (contract_id, clause_type, data_key, data_value, data_type,
+                             value_int, value_num, value_bool, value_date)
+    SELECT s.contract_id, d.clause_type, d.data_key, d.data_value, d.data_type,
+        d.value_int, d.value_num, d.value_bool, d.value_date
+    FROM staging_data_points d JOIN staging_contracts s USING (stage_id)
+    WHERE s.contract_id IS NOT NULL
+    ON CONFLICT (contract_id, clause_type, data_key) DO UPDATE SET
+        data_value = EXCLUDED.data_value,
+        data_type = EXCLUDED.data_type,
+        value_int = EXCLUDED.value_int,
+        value_num = EXCLUDED.value_num,
+        value_bool = EXCLUDED.value_bool,
+        value_date = EXCLUDED.value_date,
+        created_at = EXCLUDED.created_at
+    """,
+    f"""
+    INSERT INTO contract_facts (contract_id, {', '.join(CONTRACT_FACT_COLUMNS)})
+    SELECT s.contract_id, {', '.join(f'f.{key}' for key in CONTRACT_FACT_COLUMNS)}
+    FROM staging_contract_facts f JOIN staging_contracts s USING (stage_id)
+    WHERE s.contract_id IS NOT NULL
+    ON CONFLICT (contract_id) DO UPDATE SET
+        {', '.join(f'{key} = EXCLUDED.{key}' for key in CONTRACT_FACT_COLUMNS)},
+        updated_at = CURRENT_TIMESTAMP
+    """,
+    """
+    UPDATE contracts c SET processed = TRUE
+    FROM staging_contracts s
+    WHERE c.contract_id = s.contract_id
+    """,
+    f"""
+    TRUNCATE {', '.join(STAGING_COLUMNS)}
+    """,
+)
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def copy_value(value) -> str:
+    """One field in PostgreSQL's COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (bytes, bytearray)):
+        return '\\\\x' + value.hex()  # bytea hex input, its backslash escaped for COPY
+    if isinstance(value, str):
+        return value.translate(_COPY_ESCAPES)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def copy_line(row: tuple) -> str:
+    return '\t'.join(map(copy_value, row)) + '\n'
+
+
+class BulkLoader:
+    """
+    Stages parsed contracts with COPY and merges them into the main tables
+    in set-based statements. Call begin(), add() every contract, finish().
+    """
+
+    def __init__(self, db_config: Dict[str, str], pool: Optional[ConnectionPool] = None,
+                 text_storage: str = 'inline', merge_every: int = 50000, copy_every: int = 1000,
+                 partitioning: str = 'none', hash_partitions: int = 16):
+        """
+        Args:
+            merge_every: Contracts staged per merge transaction
+            copy_every: Contracts buffered in memory per COPY into the staging tables
+            partitioning: Layout of clauses and data_points (see DatabaseManager);
+                existing plain tables are migrated by begin()
+        """
+        self.db = DatabaseManager(db_config, pool=pool, text_storage=text_storage,
+                                  partitioning=partitioning, hash_partitions=hash_partitions)
+        self.text_storage = text_storage
+        self.merge_every = merge_every
+        self.copy_every = copy_every
+        self._buffers = {table: io.StringIO() for table in STAGING_COLUMNS}
+        self._buffered = 0
+        self._staged_hashes = set()
+        self._on_merged: List[Callable[[], None]] = []
+        self._next_stage_id = 1
+        self.contracts = 0
+        self.duplicates = 0
+        self.merges = 0
+
+    def begin(self, drop_indexes: bool = True):
+        """
+        Create (or migrate to the configured partitioning) the schema and empty
+        staging tables, dropping the secondary indexes unless told not to
+        """
+        self.db.connect()
+        if self.db.partitioning != 'none':
+            self.db.migrate_partitioning()
+        self.db.initialize_schema()
+        if drop_indexes:
+            self.db.drop_secondary_indexes()
+        self.db.cur.execute(STAGING_SQL)
+        self.db.commit()
+
+    def add(self, contract_name: str, text: str, clauses: List[Clause],
+            on_merged: Optional[Callable[[], None]] = None, digest: Optional[str] = None):
+        """
+        Stage one analyzed contract. on_merged runs once its rows are committed
+        to the main tables. A text already staged in this batch is skipped, as
+        the content_hash dedupe would skip it at the merge.
+        """
+        digest = digest or content_hash(text)
+        if on_merged is not None:
+            self._on_merged.append(on_merged)
+        if digest in self._staged_hashes:
+            self.duplicates += 1
+            return
+        self._staged_hashes.add(digest)
+        stage_id = self._next_stage_id
+        self._next_stage_id += 1
+
+        clause_rows, data_point_rows = DatabaseManager.contract_rows(stage_id, clauses)
+        buffers = self._buffers
+        buffers['staging_contracts'].write(copy_line(
+            (stage_id, contract_name, digest, *DatabaseManager.text_columns(text, self.text_storage))))
+        buffers['staging_clauses'].write(''.join(map(copy_line, clause_rows)))
+        buffers['staging_data_points'].write(''.join(map(copy_line, data_point_rows)))
+        buffers['staging_contract_facts'].write(copy_line(contract_fact_row(stage_id, data_point_rows)))
+        self._buffered += 1
+        self.contracts += 1
+
+        if len(self._staged_hashes) >= self.merge_every:
+            self.merge()
+        elif self._buffered >= self.copy_every:
+            self.copy()
+
+    def copy(self):
+        """Stream the buffered rows into the staging tables, one COPY per table"""
+        for table, buffer in self._buffers.items():
+            if buffer.tell():
+                buffer.seek(0)
+                self.db.cur.copy_expert(
+                    f"COPY {table} ({', '.join(STAGING_COLUMNS[table])}) FROM STDIN", buffer)
+                buffer.seek(0)
+                buffer.truncate()
+        self._buffered = 0
+
+    def merge(self):
+        """Merge everything staged into the main tables and commit"""
+        self.copy()
+        if self._staged_hashes:
+            for sql in MERGE_SQL:
+                self.db.cur.execute(sql)
+            self.merges += 1
+        self._staged_hashes.clear()
+        callbacks, self._on_merged = self._on_merged, []
+        self.db.commit()
+        for callback in callbacks:
+            callback()
+
+    def finish(self, maintenance_work_mem: Optional[str] = None):
+        """Merge the remainder, drop the staging tables and build the secondary indexes"""
+        try:
+            self.merge()
+            self.db.cur.execute(f"DROP TABLE IF EXISTS {', '.join(STAGING_COLUMNS)}")
+            if maintenance_work_mem:
+                self.db.cur.execute("SET maintenance_work_mem = %s", (maintenance_work_mem,))
+            self.db.initialize_schema()
+            self.db.cur.execute("ANALYZE contracts, contract_texts, clauses, data_points, contract_facts")
+            self.db.commit()
+        finally:
+            self.db.disconnect()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Bulk-load a contract corpus into PostgreSQL")
+    arg_parser.add_argument("--config", default="config/config.json", help="JSON file with DB connection settings")
+    arg_parser.add_argument("--folder", default="data/raw", help="folder with .txt contracts")
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parser processes")
+    arg_parser.add_argument("--merge-every", type=int, default=50000, metavar="N",
+                            help="contracts per staged merge transaction")
+    arg_parser.add_argument("--copy-every", type=int, default=1000, metavar="N",
+                            help="contracts buffered per COPY into the staging tables")
+    arg_parser.add_argument("--text-storage", choices=TEXT_STORAGE_MODES, default="inline",
+                            help="where the contract text is stored, as in run_pipeline.py")
+    arg_parser.add_argument("--partitioning", choices=PARTITIONING_MODES, default="none",
+                            help="partition clauses and data_points by contract_id hash or by clause_type, "
+                                 "migrating existing plain tables first")
+    arg_parser.add_argument("--hash-partitions", type=int, default=16, metavar="N",
+                            help="partitions per table with --partitioning hash")
+    arg_parser.add_argument("--keep-indexes", action="store_true",
+                            help="maintain the secondary indexes during the load instead of rebuilding them")
+    arg_parser.add_argument("--maintenance-work-mem", default=None, metavar="SIZE",
+                            help="maintenance_work_mem for the index builds, e.g. 1GB")
+    arg_parser.add_argument("--manifest", default="data/ingest_manifest.json",
+                            help="record of ingested files used to skip unchanged ones")
+    arg_parser.add_argument("--full", action="store_true", help="reprocess files even if the manifest says unchanged")
+    arg_parser.add_argument("--regex-max-repeat", type=int, default=None, metavar="N",
+                            help="linear-time extraction: cap unbounded regex repetitions at N characters")
+    arg_parser.add_argument("--extract-budget-ms", type=float, default=None, metavar="T",
+                            help="per-clause extraction budget; rules left when it runs out are skipped")
+    args = arg_parser.parse_args(argv)
+
+    db_config, pool_config = load_db_config(args.config)
+    manifest = IngestManifest(args.manifest)
+    paths = list_contract_files(args.folder)
+    files = select_changed_files(paths, manifest, full=args.full)
+    print(f"{len(files)} new or changed contracts, {len(paths) - len(files)} unchanged skipped")
+    stats = dict(files)
+
+    pool = ConnectionPool(db_config, **pool_config)
+    loader = BulkLoader(db_config, pool=pool, text_storage=args.text_storage,
+                        merge_every=args.merge_every, copy_every=args.copy_every,
+                        partitioning=args.partitioning, hash_partitions=args.hash_partitions)
+    start = time.perf_counter()
+    try:
+        loader.begin(drop_indexes=not args.keep_indexes)
+        worker_args = (False, args.regex_max_repeat, args.extract_budget_ms)
+        with Pool(args.workers, initializer=init_worker, initargs=worker_args) as process_pool:
+            for path, text, clauses, _ in process_pool.imap(analyze_file, list(stats), chunksize=16):
+                digest = content_hash(text)
+                loader.add(os.path.basename(path), text, clauses, digest=digest,
+                           on_merged=lambda path=path, digest=digest: manifest.record(path, digest, stats[path]))
+        loader.finish(args.maintenance_work_mem)
+    finally:
+        manifest.save()
+        pool.closeall()
+    elapsed = time.perf_counter() - start
+    print(f"Backfilled {loader.contracts} contracts ({loader.duplicates} duplicate texts skipped) "
+          f"in {loader.merges} merges, {elapsed:.1f}s, {loader.contracts / elapsed if elapsed else 0:,.0f} contracts/s")
+
+
+if __name__ == "__main__":
+    main()
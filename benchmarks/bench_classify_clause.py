@@ -0,0 +1,83 @@
+"""
+Benchmark for ContractParser.classify_clause
+
+Compares the precompiled keyword classifier against the original
+per-pattern re.search loop. The run fails if the two disagree on any header.
+
+Usage:
+    python benchmarks/bench_classify_clause.py [--headers N] [--repeat R]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from contract_pipeline import Clause, ContractParser  # noqa: E402
+
+
+def legacy_classify_clause(parser: ContractParser, clause: Clause) -> str:
+    """Original implementation: one re.search per clause pattern"""
+    header_lower = clause.header.lower()
+    for clause_type, pattern in parser.clause_patterns.items():
+        if re.search(pattern, header_lower, re.IGNORECASE):
+            return clause_type
+    return 'unclassified'
+
+
+def build_headers(parser: ContractParser, count: int, seed: int = 42) -> list:
+    """Build headers mixing keywords from every clause pattern with filler words"""
+    rng = random.Random(seed)
+    keywords = [kw for pattern in parser.clause_patterns.values() for kw in pattern.split('|')]
+    filler = ['tussentijdse', 'afspraken', 'en', 'van', 'de', 'general', 'terms', 'ondertekening',
+              'gegevens werkgever', 'section', 'annex', 'bijlage']
+    headers = [
+        'Gegevens werkgever', 'Gegevens werknemer', 'Gegevens arbeidsovereenkomst', 'Proeftijd',
+        'Werktijden en plaats werkzaamheden', 'Loon en vakantietoeslag', 'Vakantiedagen', 'Pensioen',
+        'Tussentijdse opzegging arbeidsovereenkomst', 'Geheimhouding', 'Overige afspraken', 'Ondertekening',
+    ]
+    while len(headers) < count:
+        words = [rng.choice(keywords if rng.random() < 0.4 else filler) for _ in range(rng.randint(1, 6))]
+        header = ' '.join(words)
+        headers.append(header.upper() if rng.random() < 0.2 else header.capitalize())
+    return headers[:count]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--headers', type=int, default=20000)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    parser = ContractParser()
+    clauses = [Clause(section_number=str(i), header=h, content='')
+               for i, h in enumerate(build_headers(parser, args.headers))]
+
+    mismatches = [
+        (c.header, legacy_classify_clause(parser, c), parser.classify_clause(c))
+        for c in clauses
+        if legacy_classify_clause(parser, c) != parser.classify_clause(c)
+    ]
+    if mismatches:
+        for header, old, new in mismatches[:20]:
+            print(f"MISMATCH {header!r}: legacy={old} compiled={new}")
+        sys.exit(f"{len(mismatches)} of {len(clauses)} headers classified differently")
+    print(f"✓ {len(clauses)} headers classified identically")
+
+    for name, fn in (('legacy', lambda c: legacy_classify_clause(parser, c)),
+                     ('compiled', parser.classify_clause)):
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for clause in clauses:
+                fn(clause)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>9}: {len(clauses) / best:,.0f} headers/sec ({best * 1000:.1f} ms best of {args.repeat})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Memory held per in-flight contract
+
+Analyzes a batch of synthetic contracts (benchmarks/corpus.py) and keeps the
+text and clauses of all of them alive, as a batched or parallel writer does,
+then reports the traced allocation per contract: the text itself and the
+clauses, header/content strings and extracted data on top of it.
+
+Usage:
+    python benchmarks/bench_clause_memory.py [--count 2000] [--seed 42]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from contract_pipeline import ContractParser  # noqa: E402
+from corpus import generate_corpus  # noqa: E402
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--count', type=int, default=2000)
+    arg_parser.add_argument('--seed', type=int, default=42)
+    args = arg_parser.parse_args()
+
+    parser = ContractParser()
+    gc.collect()
+    tracemalloc.start()
+    texts = list(generate_corpus(args.count, args.seed))
+    text_bytes, _ = tracemalloc.get_traced_memory()
+    batch = [parser.analyze_contract(text) for text in texts]
+    total_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    clause_count = sum(len(clauses) for clauses in batch)
+    print(f"{args.count:,} contracts, {clause_count:,} clauses")
+    print(f"text:    {text_bytes / args.count:>10,.0f} bytes/contract")
+    print(f"clauses: {(total_bytes - text_bytes) / args.count:>10,.0f} bytes/contract "
+          f"({(total_bytes - text_bytes) / clause_count:,.0f} bytes/clause)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Throughput benchmark for the contract pipeline
+
+Runs a synthetic corpus (benchmarks/corpus.py) through each pipeline stage and
+reports contracts/sec and clauses/sec for parse, classify, extract and, when a
+database is configured, DB write. Corpus sizes are run one after another to
+show how throughput scales; contracts are generated lazily, so 1M-contract
+runs stay within constant memory.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 1000,10000,100000,1000000] [--seed 42]
+        [--db-config config/bench_db.json] [--json results.json]
+
+DB write numbers are only produced with --db-config, and the benchmark writes
+into that database: point it at a scratch database, never production.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from contract_pipeline import ContractParser, DatabaseManager  # noqa: E402
+from src.utils.config import load_db_config  # noqa: E402
+from src.utils.database_connection import ConnectionPool  # noqa: E402
+from corpus import generate_corpus  # noqa: E402
+
+STAGES = ('parse', 'classify', 'extract', 'db_write')
+
+
+def run_size(parser: ContractParser, size: int, seed: int, db: DatabaseManager = None) -> dict:
+    """Push size contracts through every stage, timing each stage separately"""
+    elapsed = dict.fromkeys(STAGES, 0.0)
+    clause_count = 0
+    clock = time.perf_counter
+    for number, text in enumerate(generate_corpus(size, seed)):
+        start = clock()
+        clauses = parser.parse_contract(text)
+        parsed = clock()
+        for clause in clauses:
+            clause.clause_type = parser.classify_clause(clause)
+        classified = clock()
+        for clause in clauses:
+            clause.extracted_data = parser.extract_structured_data(clause)
+        extracted = clock()
+        elapsed['parse'] += parsed - start
+        elapsed['classify'] += classified - parsed
+        elapsed['extract'] += extracted - classified
+        clause_count += len(clauses)
+
+        if db is not None:
+            start = clock()
+            with db.contract_transaction():
+                contract_id = db.insert_contract(f"bench_{seed}_{number:08d}.txt", text)
+                db.insert_clauses(contract_id, clauses)
+                db.mark_contract_processed(contract_id)
+            elapsed['db_write'] += clock() - start
+
+    result = {'contracts': size, 'clauses': clause_count, 'stages': {}}
+    for stage in STAGES:
+        if stage == 'db_write' and db is None:
+            continue
+        seconds = elapsed[stage]
+        result['stages'][stage] = {
+            'seconds': seconds,
+            'contracts_per_sec': size / seconds if seconds else float('inf'),
+            'clauses_per_sec': clause_count / seconds if seconds else float('inf'),
+        }
+    return result
+
+
+def print_result(result: dict):
+    print(f"\n{result['contracts']:,} contracts, {result['clauses']:,} clauses")
+    print(f"{'stage':<10}{'seconds':>10}{'contracts/s':>16}{'clauses/s':>16}")
+    for stage, numbers in result['stages'].items():
+        print(f"{stage:<10}{numbers['seconds']:>10.2f}{numbers['contracts_per_sec']:>16,.0f}"
+              f"{numbers['clauses_per_sec']:>16,.0f}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--sizes', default='1000,10000',
+                            help='comma-separated corpus sizes, e.g. 1000,10000,100000,1000000')
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--db-config', default=None, help='JSON DB settings of a scratch database')
+    arg_parser.add_argument('--json', default=None, help='write results to this file')
+    args = arg_parser.parse_args()
+
+    parser = ContractParser()
+    db = None
+    if args.db_config:
+        db_config, pool_config = load_db_config(args.db_config)
+        db = DatabaseManager(db_config, pool=ConnectionPool(db_config, **pool_config))
+        db.connect()
+        db.initialize_schema()
+
+    results = []
+    try:
+        for size in (int(size) for size in args.sizes.split(',')):
+            result = run_size(parser, size, args.seed + len(results), db)
+            print_result(result)
+            results.append(result)
+    finally:
+        if db is not None:
+            db.disconnect()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
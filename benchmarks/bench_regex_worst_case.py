@@ -0,0 +1,109 @@
+"""
+Worst-case latency benchmark for clause extraction
+
+Feeds pathological clauses to extract_structured_data: long single lines that
+repeat the first half of a gapped pattern (kunnen ... niet ... without
+opzeggen, opzegtermijn without a number and unit, start keywords without a
+date, capitalized words without Pensioenfonds, long digit runs) and reports
+the slowest extraction per clause length. With unbounded patterns the time
+grows polynomially with the line length; with --max-repeat it grows linearly,
+and with a time budget on top no clause runs much longer than the budget.
+
+The trigger-word prefilter skips a rule whose literal words are missing from
+the clause, so the cases without the closing word (no opzeggen, no fund, no
+pensioen) return at once in every mode. Their "+ trigger" variants start the
+clause with that word, which keeps the rule running over the long tail: the
+backtracking the bounded mode exists for.
+
+The run fails (exit status 1) when a bounded+budget extraction takes longer
+than the budget plus --max-overrun-ms, the cost of the last search step
+before the budget check gives up.
+
+Usage:
+    python benchmarks/bench_regex_worst_case.py [--lengths 1000,4000,16000,64000]
+        [--max-repeat 200] [--budget-ms 50] [--max-overrun-ms 25] [--default-max-length 4000]
+
+The unbounded patterns are only run up to --default-max-length characters,
+because beyond that a single clause takes minutes.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from contract_pipeline import Clause, ContractParser  # noqa: E402
+
+# name -> (clause type, prefix, repeated fragment)
+CASES = {
+    'kunnen niet, no opzeggen': ('termination', '', 'Partijen kunnen niet '),
+    'kunnen niet + trigger': ('termination', 'opzeggen. ', 'Partijen kunnen niet '),
+    'opzegtermijn, no unit': ('termination', '', 'kunnen opzeggen, opzegtermijn 1 '),
+    'start keywords, no date': ('contract_details', '', 'treedt op in dienst start from 12 '),
+    'capitals, no fund': ('pension', '', 'Werknemer Aa '),
+    'capitals + trigger': ('pension', 'Pensioenfonds. ', 'Werknemer Aa '),
+    'geen, no pensioen': ('pension', '', 'geen '),
+    'geen + trigger': ('pension', 'pensioen. ', 'geen '),
+    'digit run': ('working_hours', '', '1'),
+}
+
+
+def pathological_clause(clause_type: str, prefix: str, fragment: str, length: int) -> Clause:
+    content = (prefix + fragment * (length // len(fragment) + 1))[:length]
+    return Clause(section_number='1', header='Annex', content=content, clause_type=clause_type)
+
+
+def time_extraction(parser: ContractParser, clause: Clause) -> float:
+    start = time.perf_counter()
+    parser.extract_structured_data(clause)
+    return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--lengths', default='1000,4000,16000,64000',
+                            help='comma-separated clause lengths in characters')
+    arg_parser.add_argument('--max-repeat', type=int, default=200)
+    arg_parser.add_argument('--budget-ms', type=float, default=50)
+    arg_parser.add_argument('--max-overrun-ms', type=float, default=25,
+                            help='allowed bounded+budget time beyond the budget')
+    arg_parser.add_argument('--default-max-length', type=int, default=4000,
+                            help='longest clause run with the unbounded patterns')
+    args = arg_parser.parse_args()
+
+    modes = {
+        'default': ContractParser(),
+        'bounded': ContractParser(max_repeat=args.max_repeat),
+        'bounded+budget': ContractParser(max_repeat=args.max_repeat, time_budget_ms=args.budget_ms),
+    }
+    lengths = [int(length) for length in args.lengths.split(',')]
+    limit_ms = args.budget_ms + args.max_overrun_ms
+    over_budget = []
+
+    print(f"{'case':<28}{'mode':<16}" + ''.join(f"{length:>12,}" for length in lengths))
+    for name, (clause_type, prefix, fragment) in CASES.items():
+        for mode, parser in modes.items():
+            cells = []
+            for length in lengths:
+                if mode == 'default' and length > args.default_max_length:
+                    cells.append(f"{'-':>12}")
+                    continue
+                clause = pathological_clause(clause_type, prefix, fragment, length)
+                seconds = time_extraction(parser, clause)
+                if mode == 'bounded+budget' and seconds * 1000 > limit_ms:
+                    over_budget.append(f"{name} at {length:,} characters: {seconds * 1000:.1f}ms")
+                skipped = '*' if clause.skipped_rules else ' '
+                cells.append(f"{seconds * 1000:>10.1f}{skipped} ")
+            print(f"{name:<28}{mode:<16}" + ''.join(cells))
+    print("\nmilliseconds per clause; * = time budget ran out and remaining rules were skipped")
+    if over_budget:
+        print(f"\nFAIL: bounded+budget extraction over {limit_ms:g}ms:")
+        for line in over_budget:
+            print(f"  {line}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+Synthetic contract corpus
+
+Seeded generator of Dutch and English employment contracts in the
+**N. Header** layout read by ContractParser. Contracts vary in clause count,
+clause order, clause length and in how each field is phrased, so every
+extraction rule and both languages get exercised.
+
+Usage:
+    python benchmarks/corpus.py --count 1000 --out data/synthetic [--seed 42]
+"""
+
+import argparse
+import os
+import random
+from typing import Iterator, Optional
+
+CITIES = ['Amsterdam', 'Rotterdam', 'Utrecht', 'Eindhoven', 'Den Haag', 'Groningen', 'Zwolle', 'Breda']
+FUNDS = ['StiPP', 'ABP', 'PFZW', 'PMT', 'BpfBOUW']
+JOBS_NL = ['marketingmedewerker', 'data engineer', 'verpleegkundige', 'accountmanager', 'monteur']
+JOBS_EN = ['marketing assistant', 'data engineer', 'nurse', 'account manager', 'technician']
+MONTHS_NL = ['januari', 'februari', 'maart', 'april', 'mei', 'juni', 'juli', 'augustus',
+             'september', 'oktober', 'november', 'december']
+MONTHS_EN = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+             'September', 'October', 'November', 'December']
+DAYS_NL = ['maandag', 'dinsdag', 'woensdag', 'donderdag', 'vrijdag']
+DAYS_EN = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+FILLER_NL = [
+    'Partijen verklaren kennis te hebben genomen van het personeelshandboek.',
+    'Wijzigingen in deze bepaling worden schriftelijk overeengekomen.',
+    'Het bepaalde in dit artikel geldt onverminderd de wettelijke regeling.',
+    'De werkgever behoudt zich het recht voor deze regeling aan te passen na overleg met de ondernemingsraad.',
+]
+FILLER_EN = [
+    'The parties acknowledge receipt of the employee handbook.',
+    'Amendments to this provision shall be agreed in writing.',
+    'This article applies without prejudice to the statutory provisions.',
+    'The employer reserves the right to amend this arrangement after consulting the works council.',
+]
+
+
+def _date(rng: random.Random, months, numeric: bool) -> str:
+    day, month, year = rng.randint(1, 28), rng.randint(1, 12), rng.randint(2015, 2027)
+    if numeric:
+        return f"{day:02d}-{month:02d}-{year}"
+    return f"{day} {months[month - 1]} {year}"
+
+
+def _filler(rng: random.Random, sentences, max_sentences: int) -> str:
+    return ' '.join(rng.choice(sentences) for _ in range(rng.randint(0, max_sentences)))
+
+
+def _clauses_nl(rng: random.Random, contract_number: int, max_filler: int) -> list:
+    fixed_term = rng.random() < 0.5
+    hours = rng.choice([24, 32, 36, 38, 40])
+    days = sorted(rng.sample(range(5), 2))
+    clauses = [
+        ('Gegevens werkgever', f"Naam: {rng.choice(['NovaTech', 'Zorggroep', 'Bouwbedrijf'])} B.V.\n"
+                               f"Contractnummer: NL-{contract_number:08d}\nHierna te noemen: de werkgever."),
+        ('Gegevens werknemer', f"Naam: M. Janssen\nGeboortedatum: {_date(rng, MONTHS_NL, True)}\n"
+                               "Hierna te noemen: de werknemer."),
+        ('Gegevens arbeidsovereenkomst',
+         f"De werknemer treedt op {_date(rng, MONTHS_NL, rng.random() < 0.3)} in dienst in de functie van "
+         f"{rng.choice(JOBS_NL)}. De arbeidsovereenkomst is voor "
+         + (f"bepaalde tijd en eindigt tot {_date(rng, MONTHS_NL, False)}. " if fixed_term else "onbepaalde tijd. ")
+         + rng.choice(['Op de arbeidsovereenkomst is geen cao van toepassing.',
+                       'De cao Metalektro is van toepassing.',
+                       'De collectieve arbeidsovereenkomst Zorg wordt van toepassing verklaard.'])),
+        ('Proeftijd', rng.choice(['Er geldt geen proeftijd.',
+                                  f"Er geldt een proeftijd van {rng.choice([1, 2])} maand."])),
+        ('Werktijden en plaats werkzaamheden',
+         f"De werknemer werkt {'fulltime' if hours >= 36 else 'parttime'} voor {hours} uur per week, "
+         f"van {DAYS_NL[days[0]]} tot en met {DAYS_NL[days[1]]} van 0{rng.randint(7, 9)}:00 tot "
+         f"{rng.randint(16, 18)}:30. De werkzaamheden worden verricht te {rng.choice(CITIES)}"
+         + (', met de mogelijkheid tot thuiswerken.' if rng.random() < 0.5 else '.')),
+        ('Loon en vakantietoeslag',
+         f"Het loon bedraagt € {rng.randint(2, 6)}.{rng.randint(0, 999):03d} bruto "
+         f"{rng.choice(['per maand', 'per jaar', 'per week'])}. De vakantietoeslag bedraagt 8%."),
+        ('Vakantiedagen', f"Werknemer heeft recht op {rng.randint(20, 30)} vakantiedagen per jaar."),
+        ('Pensioen', rng.choice([
+            f"Werknemer valt onder de verplichte pensioenregeling van {rng.choice(FUNDS)} Pensioenfonds.",
+            'Er is geen pensioenregeling van toepassing.',
+            f"Werknemer kan deelnemen aan de regeling van {rng.choice(FUNDS)} Pensioenfonds.",
+        ])),
+        ('Tussentijdse opzegging', rng.choice([
+            'Partijen kunnen de arbeidsovereenkomst tussentijds opzeggen met inachtneming van de wettelijke '
+            'opzegtermijn. De opzegging gebeurt tegen het einde van de maand.',
+            f"Partijen kunnen de arbeidsovereenkomst opzeggen met een opzegtermijn van "
+            f"{rng.randint(1, 3)} maanden.",
+            'Partijen kunnen de arbeidsovereenkomst niet tussentijds opzeggen.',
+        ])),
+        ('Geheimhouding', 'De werknemer is verplicht tot geheimhouding van alle gegevens over het bedrijf en '
+                          'klanten van de werkgever, ook na beëindiging van de arbeidsovereenkomst.'),
+        ('Overige afspraken', ' '.join(rng.sample([
+            f"Werknemer ontvangt een reiskostenvergoeding van €0,{rng.randint(10, 23)} per kilometer.",
+            'Werkgever stelt een laptop en mobiele telefoon ter beschikking.',
+            'Werknemer krijgt een leaseauto.',
+            'Er geldt een concurrentiebeding en een relatiebeding.',
+            'Eventuele cursussen en opleidingen worden vergoed.',
+            'De ziekmelding geschiedt volgens de controlevoorschriften.',
+            'Werknemer kan deelnemen aan de collectieve verzekeringen.',
+        ], rng.randint(1, 5)))),
+    ]
+    return [(header, f"{content}\n{_filler(rng, FILLER_NL, max_filler)}".strip()) for header, content in clauses]
+
+
+def _clauses_en(rng: random.Random, contract_number: int, max_filler: int) -> list:
+    fixed_term = rng.random() < 0.5
+    hours = rng.choice([24, 32, 36, 38, 40])
+    days = sorted(rng.sample(range(5), 2))
+    clauses = [
+        ('Employer details', f"Name: {rng.choice(['NovaTech', 'CareGroup', 'BuildCo'])} Ltd.\n"
+                             f"Contract number: EN-{contract_number:08d}"),
+        ('Employee information', f"Name: M. Johnson\nDate of birth: {_date(rng, MONTHS_EN, True)}"),
+        ('Contract details',
+         f"The employee will start from {_date(rng, MONTHS_EN, rng.random() < 0.3)} in the position of "
+         f"{rng.choice(JOBS_EN)}. This is a "
+         + (f"fixed term contract until {_date(rng, MONTHS_EN, False)}. " if fixed_term else "permanent contract. ")
+         + rng.choice(['No collective agreement applies.',
+                       'The collective labour agreement is applicable.'])),
+        ('Probation', rng.choice(['There is no probation period.',
+                                  f"A probation period of {rng.choice([1, 2])} months applies."])),
+        ('Working hours', f"The employee works {'full-time' if hours >= 36 else 'part-time'}, {hours} hours per week, "
+                          f"{DAYS_EN[days[0]]} to {DAYS_EN[days[1]]} from 0{rng.randint(7, 9)}:00 to "
+                          f"{rng.randint(16, 18)}:00 in {rng.choice(CITIES)}"
+                          + (', with hybrid work from home.' if rng.random() < 0.5 else '.')),
+        ('Salary', f"The salary is €{rng.randint(2, 6)},{rng.randint(0, 999):03d} gross "
+                   f"{rng.choice(['per month', 'per year', 'per hour'])}."),
+        ('Vacation days', f"The employee is entitled to {rng.randint(20, 30)} vacation days per year."),
+        ('Pension', rng.choice(['A mandatory pension scheme applies.', 'There is no pension scheme.'])),
+        ('Termination', rng.choice([
+            'Either party may terminate the contract with due observance of the statutory notice period, '
+            'effective at the end of the month.',
+            'The parties cannot terminate this contract early.',
+        ])),
+        ('Confidentiality', 'The employee has a confidentiality obligation regarding the company and its clients, '
+                            'which continues after termination.'),
+        ('Additional provisions', ' '.join(rng.sample([
+            f"The employee receives a travel allowance of €{rng.randint(50, 200)} per month.",
+            'A laptop and smartphone are provided.',
+            'A company car is provided.',
+            'A non-compete and non-solicitation clause apply.',
+            'Training and education costs are reimbursed.',
+            'Sick leave must be reported before 9:00.',
+            'The employee may join the group insurance and health insurance.',
+        ], rng.randint(1, 5)))),
+    ]
+    return [(header, f"{content}\n{_filler(rng, FILLER_EN, max_filler)}".strip()) for header, content in clauses]
+
+
+def generate_contract(rng: random.Random, contract_number: int, language: Optional[str] = None,
+                      max_filler: int = 6) -> str:
+    """
+    One synthetic contract
+
+    Args:
+        rng: Random source; the same seed gives the same contract
+        contract_number: Written into the contract so every contract has distinct text
+        language: 'nl' or 'en'; picked at random (80% Dutch) when None
+        max_filler: Upper bound on boilerplate sentences appended to each clause
+    """
+    language = language or ('nl' if rng.random() < 0.8 else 'en')
+    clauses = (_clauses_nl if language == 'nl' else _clauses_en)(rng, contract_number, max_filler)
+    # Drop a few optional clauses and shuffle the middle ones
+    head, middle, tail = clauses[:3], clauses[3:-1], clauses[-1:]
+    middle = [clause for clause in middle if rng.random() < 0.9]
+    rng.shuffle(middle)
+    sections = head + middle + tail
+    sections.append(('Ondertekening' if language == 'nl' else 'Signatures', 'Plaats: ______   Datum: ______'))
+    return '\n\n'.join(f"**{number}. {header}**\n{content}" for number, (header, content) in enumerate(sections, 1))
+
+
+def generate_corpus(count: int, seed: int = 42, language: Optional[str] = None,
+                    max_filler: int = 6) -> Iterator[str]:
+    """Yield count contracts lazily, so corpora of millions never sit in memory"""
+    rng = random.Random(seed)
+    for contract_number in range(count):
+        yield generate_contract(rng, contract_number, language, max_filler)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--count', type=int, default=1000)
+    arg_parser.add_argument('--out', required=True, help='directory to write contract_NNNNNNNN.txt files to')
+    arg_parser.add_argument('--seed', type=int, default=42)
+    arg_parser.add_argument('--language', choices=['nl', 'en'], default=None)
+    args = arg_parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for number, text in enumerate(generate_corpus(args.count, args.seed, args.language)):
+        with open(os.path.join(args.out, f"contract_{number:08d}.txt"), 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(f"Wrote {args.count} contracts to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,463 +1,1883 @@
+import datetime
+import functools
+import hashlib
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+import mmap
 import re
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager, nullcontext
 import psycopg2
 from psycopg2.extras import execute_values
-from dataclasses import dataclass
-from typing import List, Dict, Optional, Any
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Any, Callable, Iterable, Iterator, Sequence, Set, TextIO, Union
 import json
+from src.utils.database_connection import ConnectionPool
+from src.utils.metrics import CountingCursor, PipelineMetrics
+
+_REGEX_METACHARACTERS = frozenset('.^$*+?{}[]\\()')
+_SECTION_PATTERN = re.compile(r'\*\*(\d+)\.?\s+([^\*]+?)\s*\*\*')
+_SECTION_PATTERN_BYTES = re.compile(_SECTION_PATTERN.pattern.encode('ascii'))
+
+
+def _decode_utf8(data: bytes) -> str:
+    return str(data, 'utf-8')
+
+
+_MONTHS = {
+    month: number
+    for number, names in enumerate([
+        ('januari', 'january', 'jan'), ('februari', 'february', 'feb'), ('maart', 'march', 'mrt', 'mar'),
+        ('april', 'apr'), ('mei', 'may'), ('juni', 'june', 'jun'), ('juli', 'july', 'jul'),
+        ('augustus', 'august', 'aug'), ('september', 'sep', 'sept'), ('oktober', 'october', 'okt', 'oct'),
+        ('november', 'nov'), ('december', 'dec'),
+    ], 1)
+    for month in names
+}
+_DATE_VALUE = re.compile(r'(\d{1,2})(?:[-/](\d{1,2})[-/]|\s+([^\W\d]+)\s+)(\d{4})')
+
+
+def parse_date(text: str) -> Optional[datetime.date]:
+    """Date written as 1 oktober 2025, 1 October 2025 or 01-10-2025 (day first), else None"""
+    match = _DATE_VALUE.fullmatch(text.strip())
+    if not match:
+        return None
+    day, month, month_name, year = match.groups()
+    month = int(month) if month else _MONTHS.get(month_name.lower())
+    try:
+        return datetime.date(int(year), month, int(day)) if month else None
+    except ValueError:
+        return None
+
+
+def parse_amount(text: str) -> Optional[Decimal]:
+    """
+    Amount written Dutch or English style (3.200, 3,200.50, 3.200,50, €0,23,
+    3.200,-), else None. A single separator followed by exactly three digits
+    is read as a thousands separator. Separators after the last digit, like
+    the Dutch ",-" or the full stop ending a sentence, are ignored.
+    """
+    digits = text.strip().lstrip('€').strip().rstrip('-').rstrip('.,')
+    if not digits or not re.fullmatch(r'\d[\d.,]*', digits):
+        return None
+    separators = [i for i, char in enumerate(digits) if char in '.,']
+    if separators:
+        last = separators[-1]
+        decimal_places = len(digits) - last - 1
+        if len({digits[i] for i in separators}) == 1 and (len(separators) > 1 or decimal_places == 3):
+            digits = digits.replace(digits[last], '')
+        else:
+            digits = digits[:last].replace('.', '').replace(',', '') + '.' + digits[last + 1:]
+    try:
+        return Decimal(digits)
+    except InvalidOperation:
+        return None
+
+
+def content_hash(contract_text: str) -> str:
+    """
+    SHA-256 of the contract text with line endings normalised to \\n, used to
+    recognise contracts that were already ingested. DatabaseManager.CONTENT_HASH_SQL
+    is the same digest in SQL.
+    """
+    if '\r' in contract_text:
+        contract_text = contract_text.replace('\r\n', '\n').replace('\r', '\n')
+    return hashlib.sha256(contract_text.encode('utf-8')).hexdigest()
+
+
+class ExtractedData(Mapping):
+    """
+    Read-only mapping of extracted fields, stored as two tuples. The key tuple
+    is interned, so clauses with the same fields share it; a clause holds just
+    its values tuple instead of a dict.
+    """
+    __slots__ = ('_keys', '_values')
+    _key_tuples: Dict[tuple, tuple] = {}
+
+    def __init__(self, data: Mapping):
+        keys = tuple(data)
+        self._keys = self._key_tuples.setdefault(keys, keys)
+        self._values = tuple(data.values())
+
+    def __getitem__(self, key):
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __reduce__(self):
+        return ExtractedData, (dict(zip(self._keys, self._values)),)
+
+    def __repr__(self):
+        return repr(dict(zip(self._keys, self._values)))
 
 
-@dataclass
 class Clause:
-    """Represents an extracted contract clause"""
-    section_number: str
-    header: str
-    content: str
-    clause_type: Optional[str] = None
-    extracted_data: Optional[Dict[str, Any]] = None
+    """
+    Represents an extracted contract clause
+    
+    Clauses parsed from a str keep (start, end) spans into the contract text
+    instead of copies of their header and content; the strings are sliced out
+    when read. Assigning header or content stores the string itself.
+    extracted_data is held as an ExtractedData.
+    """
+    __slots__ = ('section_number', 'clause_type', 'skipped_rules', '_source', '_spans', '_header', '_content',
+                 '_extracted_data')
+
+    def __init__(self, section_number: str, header: str, content: str, clause_type: Optional[str] = None,
+                 extracted_data: Optional[Mapping] = None, skipped_rules: Sequence[str] = ()):
+        self.section_number = section_number
+        self.clause_type = clause_type
+        self.skipped_rules = skipped_rules  # rules cut off by the extraction time budget
+        self._source = None
+        self._spans = None
+        self._header = header
+        self._content = content
+        self.extracted_data = extracted_data
+
+    @classmethod
+    def from_spans(cls, source: str, section_number: str, header_span: tuple, content_span: tuple) -> 'Clause':
+        """Clause whose header and content are source[start:end] for the given spans"""
+        clause = cls(section_number, None, None)
+        clause._source = source
+        clause._spans = header_span + content_span
+        return clause
+
+    @property
+    def header(self) -> str:
+        if self._header is not None:
+            return self._header
+        return self._source[self._spans[0]:self._spans[1]]
+
+    @header.setter
+    def header(self, value: str):
+        self._header = value
+
+    @property
+    def content(self) -> str:
+        if self._content is not None:
+            return self._content
+        return self._source[self._spans[2]:self._spans[3]]
+
+    @content.setter
+    def content(self, value: str):
+        self._content = value
+
+    @property
+    def content_span(self) -> Optional[tuple]:
+        """(start, end) of content in the contract text, or None when content is a string of its own"""
+        if self._content is not None or self._spans is None:
+            return None
+        return self._spans[2:4]
+
+    @property
+    def extracted_data(self) -> Optional[ExtractedData]:
+        return self._extracted_data
+
+    @extracted_data.setter
+    def extracted_data(self, value: Optional[Mapping]):
+        self._extracted_data = ExtractedData(value) if value is not None else None
+
+    def _fields(self) -> tuple:
+        return (self.section_number, self.header, self.content, self.clause_type, self.extracted_data,
+                self.skipped_rules)
+
+    def __eq__(self, other):
+        if not isinstance(other, Clause):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __repr__(self):
+        return (f"Clause(section_number={self.section_number!r}, header={self.header!r}, "
+                f"content={self.content!r}, clause_type={self.clause_type!r}, "
+                f"extracted_data={self.extracted_data!r})")
+
+
+def first_group(match: 're.Match') -> str:
+    """Default rule value: the first capture group that took part in the match, stripped"""
+    return next(group for group in match.groups() if group is not None).strip()
+
+
+@dataclass(frozen=True)
+class ExtractionRule:
+    """
+    Declarative extraction rule for one field of a clause type.
+
+    The first rule that matches for a given key wins, so alternatives for the
+    same key are listed in order of preference. `value` is either a constant
+    or a callable that receives the match object; `extra` holds further fields
+    set by the same match. A rule without a pattern always applies and acts as
+    the fallback for its key. `requires` is checked against the data
+    extracted so far by earlier rules of the same clause.
+    """
+    key: str
+    pattern: Optional[str] = None
+    value: Any = first_group
+    extra: Dict[str, Any] = field(default_factory=dict)
+    requires: Optional[Callable[[Dict[str, Any]], bool]] = None
+    flags: int = re.IGNORECASE
+
+
+def _resolve(value: Any, match: Optional['re.Match']) -> Any:
+    return value(match) if callable(value) else value
+
+
+def bound_pattern(pattern: str, max_repeat: int) -> str:
+    """
+    Rewrite every unbounded quantifier (*, +, *?, +?) in pattern to at most
+    max_repeat repetitions, e.g. kunnen.*niet -> kunnen.{0,200}niet.
+    
+    Python's re backtracks, so gaps like kunnen.*niet.*opzeggen cost time
+    polynomial in the line length when the tail does not match. With every
+    repetition bounded, each attempt explores a window of constant size and a
+    search is linear in the clause length. Matches only change where a gap
+    would have to be longer than max_repeat characters.
+    """
+    out = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            out.append(pattern[i:i + 2])
+            i += 2
+            continue
+        if char == '[':
+            # copy the character class verbatim; a ] right after [ or [^ is literal
+            end = i + 1
+            if end < len(pattern) and pattern[end] == '^':
+                end += 1
+            if end < len(pattern) and pattern[end] == ']':
+                end += 1
+            while end < len(pattern) and pattern[end] != ']':
+                end += 2 if pattern[end] == '\\' else 1
+            out.append(pattern[i:end + 1])
+            i = end + 1
+            continue
+        if char in '*+':
+            out.append(f"{{{0 if char == '*' else 1},{max_repeat}}}")
+        else:
+            out.append(char)
+        i += 1
+    return ''.join(out)
+
+
+def split_alternatives(pattern: str) -> List[str]:
+    """The top-level | alternatives of pattern; alternations inside groups and classes stay whole"""
+    alternatives = []
+    depth = 0
+    start = i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '[':
+            end = i + 1
+            if end < len(pattern) and pattern[end] == '^':
+                end += 1
+            if end < len(pattern) and pattern[end] == ']':
+                end += 1
+            while end < len(pattern) and pattern[end] != ']':
+                end += 2 if pattern[end] == '\\' else 1
+            i = end + 1
+            continue
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            alternatives.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    alternatives.append(pattern[start:])
+    return alternatives
+
+
+def _skip_class(pattern: str, i: int) -> int:
+    """Index just past the character class opening at pattern[i]"""
+    i += 1
+    if i < len(pattern) and pattern[i] == '^':
+        i += 1
+    if i < len(pattern) and pattern[i] == ']':
+        i += 1
+    while i < len(pattern) and pattern[i] != ']':
+        i += 2 if pattern[i] == '\\' else 1
+    return i + 1
+
+
+def _top_level_tokens(pattern: str) -> Iterator[tuple]:
+    """
+    (literal character or None, quantified) for each top-level atom of an
+    alternative; groups, classes, escapes like \\d and anchors are None
+    """
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        literal = None
+        if char == '\\':
+            escaped = pattern[i + 1:i + 2]
+            literal = escaped if escaped and not escaped.isalnum() else None
+            i += 2
+        elif char == '[':
+            i = _skip_class(pattern, i)
+        elif char == '(':
+            depth = 0
+            while i < len(pattern):
+                if pattern[i] == '[':
+                    i = _skip_class(pattern, i)
+                    continue
+                if pattern[i] == '\\':
+                    i += 1
+                elif pattern[i] == '(':
+                    depth += 1
+                elif pattern[i] == ')':
+                    depth -= 1
+                    if depth == 0:
+                        break
+                i += 1
+            i += 1
+        elif char in '.^$':
+            i += 1
+        else:
+            literal = char
+            i += 1
+        quantifier = re.match(r'(?:[*+?]|\{\d*,?\d*\})\??', pattern[i:])
+        if quantifier:
+            i += quantifier.end()
+        yield literal, bool(quantifier)
+
+
+def required_literals(pattern: str) -> Optional[frozenset]:
+    """
+    Lower-cased words of which at least one occurs (ignoring case) in any
+    text the pattern matches: the longest literal run of each top-level
+    alternative, outside groups, classes and quantified atoms. None when an
+    alternative has no literal, so the pattern can match without any.
+    """
+    literals = set()
+    for alternative in split_alternatives(pattern):
+        runs, run = [], ''
+        for literal, quantified in _top_level_tokens(alternative):
+            if literal is None or quantified:
+                runs.append(run)
+                run = ''
+            else:
+                run += literal
+        runs.append(run)
+        longest = max(runs, key=len).lower()
+        if not longest.strip():
+            return None
+        literals.add(longest)
+    return frozenset(literals)
+
+
+class KeywordScanner:
+    """
+    Finds which of a fixed set of trigger words occur in a text, ignoring
+    case. The text is lower-cased once and each word checked with a
+    substring search; a word containing a shorter one that is absent is
+    known absent without a search.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(sorted(set(keywords), key=len))
+        self._contains = {keyword: tuple(other for other in self.keywords if other != keyword and other in keyword)
+                          for keyword in self.keywords}
+
+    def scan(self, text: str) -> Set[str]:
+        lowered = text.lower()
+        found = set()
+        for keyword in self.keywords:
+            contained = self._contains[keyword]
+            if (not contained or found.issuperset(contained)) and keyword in lowered:
+                found.add(keyword)
+        return found
+
+
+def _work_days(match: 're.Match') -> str:
+    start_day = match.group(1).capitalize()
+    end_day = match.group(2).capitalize()
+    if start_day.lower() != end_day.lower():
+        return f"{start_day} to {end_day}"
+    return start_day
+
+
+def _notice_is_weeks(match: 're.Match') -> bool:
+    return 'week' in match.group(2).lower()
+
+
+def _termination_allowed(data: Dict[str, Any]) -> bool:
+    return data.get('early_termination_allowed') is True
+
+
+# How far before "<Word> Pensioenfonds" _pension_fund looks for more words of the fund name
+_FUND_NAME_LOOKBACK = 100
+_CAPITALIZED_WORD = re.compile(r'[A-Z][a-zA-Z]*')
+
+
+def _pension_fund(match: 're.Match') -> str:
+    """
+    The capitalized word matched before "Pensioenfonds", extended with the
+    run of capitalized words right before it, up to _FUND_NAME_LOOKBACK
+    characters back. Looking back from the trigger keeps the search linear,
+    where a pattern matching the whole run would rescan it from every capital.
+    """
+    start = match.start(1)
+    window_start = max(0, start - _FUND_NAME_LOOKBACK)
+    before = match.string[window_start:start]
+    words = [match.group(1)]
+    if before and before[-1].isspace():
+        tokens = before.split()
+        if window_start > 0 and not before[0].isspace():
+            tokens = tokens[1:]  # cut off by the window
+        for token in reversed(tokens):
+            if _CAPITALIZED_WORD.fullmatch(token):
+                words.append(token)
+                continue
+            # a word can end in a capitalized part, e.g. the ABP of xABP
+            tail = _CAPITALIZED_WORD.search(token)
+            while tail is not None and tail.end() != len(token):
+                tail = _CAPITALIZED_WORD.search(token, tail.end())
+            if tail is not None:
+                words.append(tail.group())
+            break
+    return ' '.join(reversed(words))
+
+
+_WEEKDAY = (
+    r"maandag|dinsdag|woensdag|donderdag|vrijdag|zaterdag|zondag|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday"
+)
+_DATE_PATTERNS = [
+    r'(\d{1,2}\s+\w+\s+\d{4})',
+    r'(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
+]
+_NOTICE_PATTERN = r'opzegtermijn.*?(\d+)\s+(maand|maanden|month|months|week|weken|weeks)'
+
+EXTRACTION_RULES: Dict[str, List[ExtractionRule]] = {
+    'employee_info': [
+        ExtractionRule('employee_birth_date', r'(?:Geboortedatum|Date of birth|Birth date):\s*([^\n]+)'),
+    ],
+    'salary': [
+        ExtractionRule('salary_amount', r'€\s*([\d.,]+)', flags=0),
+        ExtractionRule('salary_period', r'per\s+maand|per\s+month', 'monthly'),
+        ExtractionRule('salary_period', r'per\s+jaar|per\s+year', 'yearly'),
+        ExtractionRule('salary_period', r'per\s+week', 'weekly'),
+        ExtractionRule('salary_period', r'per\s+uur|per\s+hour', 'hourly'),
+    ],
+    'vacation': [
+        ExtractionRule('vacation_days', r'(\d+)\s+vakantiedagen|(\d+)\s+vacation days',
+                       lambda m: int(first_group(m))),
+        ExtractionRule('vacation_hours', r'(\d+)\s+vakantie-uren|(\d+)\s+vacation hours',
+                       lambda m: int(first_group(m))),
+    ],
+    'working_hours': [
+        ExtractionRule('hours_per_week', r'(\d+)\s+uur per week|(\d+)\s+hours per week',
+                       lambda m: int(first_group(m))),
+        ExtractionRule('employment_type', r'\bfulltime\b|\bfull-time\b|\bvoltijd\b', 'fulltime'),
+        ExtractionRule('employment_type', r'\bparttime\b|\bpart-time\b|\bdeeltijd\b', 'parttime'),
+        # e.g. dinsdag tot vrijdag, woensdag t/m vrijdag
+        ExtractionRule('work_days',
+                       rf"\b({_WEEKDAY})\b\s*(?:tot(?:\s+en\s+met)?|t\/m|to|–|-|—)\s*\b({_WEEKDAY})\b",
+                       _work_days),
+        ExtractionRule('work_hours', r'(\d{1,2}:\d{2})\s*(?:tot|to)\s*(\d{1,2}:\d{2})',
+                       lambda m: f"{m.group(1)} - {m.group(2)}", flags=0),
+        # "te" or "in" followed by a capitalized city name
+        ExtractionRule('work_location', r'(?:\bte\b|\bin\b)\s+([A-Z][a-zA-Zé-]+(?:\s+[A-Z][a-zA-Zé-]+)?)',
+                       flags=0),
+        ExtractionRule('remote_work_possible', r'thuiswerken|remote|work from home|hybrid', True),
+    ],
+    'probation': [
+        ExtractionRule('probation_period', r'geen proeftijd|no probation|no trial', 'No',
+                       extra={'probation_months': 0}),
+        ExtractionRule('probation_period', r'(\d+)\s+(maand|maanden|month|months)', 'Yes',
+                       extra={'probation_months': lambda m: int(m.group(1))}),
+        ExtractionRule('probation_period', None, 'Unknown', extra={'probation_months': None}),
+    ],
+    'contract_details': [
+        ExtractionRule('contract_type', r'bepaalde tijd|fixed term|temporary', 'fixed_term'),
+        ExtractionRule('contract_type', r'onbepaalde tijd|permanent|indefinite', 'permanent'),
+        ExtractionRule('job_title', r'functie van\s+([^\n\.]+)|position of\s+([^\n\.]+)'),
+        *[ExtractionRule('start_date', r'(?:treedt.*?op|in dienst|start|from).+?' + pattern)
+          for pattern in _DATE_PATTERNS],
+        ExtractionRule('contract_duration', r'duur van\s+([^\n]+?)\s+(?:en|\.)'),
+        *[ExtractionRule('end_date', r'(?:tot|until|to)\s+' + pattern,
+                         requires=lambda data: data.get('contract_type') == 'fixed_term')
+          for pattern in _DATE_PATTERNS],
+        # CAO (collective labor agreement) status
+        ExtractionRule('cao_applicable',
+                       r'geen cao|geen collectieve|no cao|no collective|niet van toepassing', False),
+        ExtractionRule('cao_applicable',
+                       r'(?:cao|collectieve arbeidsovereenkomst).*(?:is|wordt)\s+van toepassing'
+                       r'|collective.*agreement.*(?:is\s+)?applicable', True),
+        ExtractionRule('cao_name', r'cao\s+([^\n\.]+?)(?:\s+(?:is|wordt)\s+van toepassing|\.|$)',
+                       requires=lambda data: data.get('cao_applicable') is True),
+    ],
+    'pension': [
+        ExtractionRule('pension_scheme', r'geen.*pensioen|no.*pension', 'None'),
+        ExtractionRule('pension_scheme', r'verplicht.*pensioen|mandatory pension|required', 'mandatory'),
+        # assume voluntary if a pension is present but not mandatory
+        ExtractionRule('pension_scheme', None, 'voluntary'),
+        # only the fund name: capitalized words just before "Pensioenfonds"
+        ExtractionRule('pension_fund', r'([A-Z][a-zA-Z]*)\s+Pensioenfonds', _pension_fund,
+                       requires=lambda data: data.get('pension_scheme') != 'None', flags=0),
+    ],
+    'termination': [
+        ExtractionRule('early_termination_allowed', r'kunnen.*niet.*opzeggen|cannot.*terminate|not.*terminable',
+                       False),
+        ExtractionRule('early_termination_allowed', r'kunnen.*opzeggen|can.*terminate|may.*terminate', True),
+        ExtractionRule('notice_period', _NOTICE_PATTERN,
+                       lambda m: f"{int(m.group(1))} {'weeks' if _notice_is_weeks(m) else 'months'}",
+                       requires=_termination_allowed),
+        ExtractionRule('notice_period_weeks', _NOTICE_PATTERN, lambda m: int(m.group(1)),
+                       requires=lambda data: _termination_allowed(data)
+                       and data.get('notice_period', '').endswith('weeks')),
+        ExtractionRule('notice_period_months', _NOTICE_PATTERN, lambda m: int(m.group(1)),
+                       requires=lambda data: _termination_allowed(data)
+                       and data.get('notice_period', '').endswith('months')),
+        ExtractionRule('statutory_notice', r'wettelijke.*opzegtermijn|statutory.*notice|legal.*notice', True,
+                       requires=_termination_allowed),
+        ExtractionRule('notice_timing', r'tegen.*einde.*maand|end of.*month', 'end_of_month',
+                       requires=_termination_allowed),
+    ],
+    'confidentiality': [
+        ExtractionRule('confidentiality_required',
+                       r'verplicht tot geheimhouding|confidentiality obligation|required.*confidential', True),
+        ExtractionRule('confidentiality_scope_company', r'bedrijf|company|business', True),
+        ExtractionRule('confidentiality_scope_operations', r'bedrijfsvoering|operations', True),
+        ExtractionRule('confidentiality_scope_clients', r'klanten|clients|customers', True),
+        ExtractionRule('confidentiality_post_employment', r'na beëindiging|after.*termination|post-employment',
+                       True),
+    ],
+    'other': [
+        ExtractionRule('travel_allowance',
+                       r'reiskostenvergoeding.*?€\s*([\d.,]+)|travel allowance.*?€\s*([\d.,]+)',
+                       lambda m: f"€{first_group(m)}"),
+        ExtractionRule('travel_allowance_available', r'reiskostenvergoeding|travel allowance', True,
+                       requires=lambda data: 'travel_allowance' not in data),
+        ExtractionRule('expense_allowance', r'onkostenvergoeding|expense allowance|expenses', True),
+        ExtractionRule('laptop_provided', r'laptop|notebook', True),
+        ExtractionRule('phone_provided', r'mobiele telefoon|mobile phone|smartphone', True),
+        ExtractionRule('company_equipment_provided', r'bedrijfsmiddelen|company equipment|tools', True),
+        ExtractionRule('company_car', r'leaseauto|company car|lease car', True),
+        ExtractionRule('non_compete_clause', r'concurrentiebeding|non-compete|competition clause', True),
+        ExtractionRule('relation_clause', r'relatiebeding|client clause|non-solicitation', True),
+        ExtractionRule('training_available', r'opleidingen|cursussen|training|education|course', True),
+        ExtractionRule('sick_leave_procedure', r'ziekmelding|sick leave|illness reporting', True),
+        ExtractionRule('sick_leave_controls', r'controlevoorschriften|control.*provisions|monitoring', True),
+        ExtractionRule('collective_insurance',
+                       r'collectieve verzekeringen|collective insurance|group insurance', True),
+        ExtractionRule('health_insurance_contribution', r'ziektekostenverzekering|health insurance', True),
+    ],
+}
+
+# Columns of the contract_facts table: one row per contract, one typed column
+# per extracted key (every key EXTRACTION_RULES can produce). Values come from the typed data point columns; NUMERIC
+# columns also accept amounts written as text, e.g. salary_amount "3.200".
+CONTRACT_FACT_COLUMNS: Dict[str, str] = {
+    'employee_birth_date': 'DATE',
+    'contract_type': 'TEXT',
+    'job_title': 'TEXT',
+    'start_date': 'DATE',
+    'contract_duration': 'TEXT',
+    'end_date': 'DATE',
+    'cao_applicable': 'BOOLEAN',
+    'cao_name': 'TEXT',
+    'probation_period': 'TEXT',
+    'probation_months': 'INTEGER',
+    'hours_per_week': 'INTEGER',
+    'employment_type': 'TEXT',
+    'work_days': 'TEXT',
+    'work_hours': 'TEXT',
+    'work_location': 'TEXT',
+    'remote_work_possible': 'BOOLEAN',
+    'salary_amount': 'NUMERIC',
+    'salary_period': 'TEXT',
+    'vacation_days': 'INTEGER',
+    'vacation_hours': 'INTEGER',
+    'pension_scheme': 'TEXT',
+    'pension_fund': 'TEXT',
+    'early_termination_allowed': 'BOOLEAN',
+    'notice_period': 'TEXT',
+    'notice_period_weeks': 'INTEGER',
+    'notice_period_months': 'INTEGER',
+    'statutory_notice': 'BOOLEAN',
+    'notice_timing': 'TEXT',
+    'confidentiality_required': 'BOOLEAN',
+    'confidentiality_scope_company': 'BOOLEAN',
+    'confidentiality_scope_operations': 'BOOLEAN',
+    'confidentiality_scope_clients': 'BOOLEAN',
+    'confidentiality_post_employment': 'BOOLEAN',
+    'travel_allowance': 'NUMERIC',
+    'travel_allowance_available': 'BOOLEAN',
+    'expense_allowance': 'BOOLEAN',
+    'laptop_provided': 'BOOLEAN',
+    'phone_provided': 'BOOLEAN',
+    'company_equipment_provided': 'BOOLEAN',
+    'company_car': 'BOOLEAN',
+    'non_compete_clause': 'BOOLEAN',
+    'relation_clause': 'BOOLEAN',
+    'training_available': 'BOOLEAN',
+    'sick_leave_procedure': 'BOOLEAN',
+    'sick_leave_controls': 'BOOLEAN',
+    'collective_insurance': 'BOOLEAN',
+    'health_insurance_contribution': 'BOOLEAN',
+    # Derived from salary_amount, salary_period and hours_per_week (see annual_salary)
+    'annual_salary_eur': 'NUMERIC',
+}
+
+# contract_facts column type -> typed data_points column holding values of that type
+VALUE_COLUMNS: Dict[str, str] = {
+    'INTEGER': 'value_int',
+    'NUMERIC': 'value_num',
+    'BOOLEAN': 'value_bool',
+    'DATE': 'value_date',
+}
+# Column type of keys missing from CONTRACT_FACT_COLUMNS, by Python type; other strings may be dates
+_PYTHON_COLUMN_TYPES = {bool: 'BOOLEAN', int: 'INTEGER', float: 'NUMERIC'}
+
+
+def value_column(data_key: str) -> Optional[str]:
+    """Typed data_points column of data_key, from its declared type; None for text and undeclared keys"""
+    return VALUE_COLUMNS.get(CONTRACT_FACT_COLUMNS.get(data_key))
+
+
+def typed_value(column_type: str, value: Any) -> tuple:
+    """
+    (value_int, value_num, value_bool, value_date) of a data point value
+    stored in a column of column_type. Only that type's slot is set, and only
+    when the value is of, or parses as, that type.
+    """
+    value_int = value_num = value_bool = value_date = None
+    is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+    if column_type == 'INTEGER':
+        value_int = value if is_number and isinstance(value, int) else None
+    elif column_type == 'NUMERIC':
+        value_num = value if is_number else parse_amount(value) if isinstance(value, str) else None
+    elif column_type == 'BOOLEAN':
+        value_bool = value if isinstance(value, bool) else None
+    elif column_type == 'DATE':
+        value_date = parse_date(value) if isinstance(value, str) else None
+    return value_int, value_num, value_bool, value_date
+
+
+# salary_period -> pay periods per year; hourly pay is multiplied by the weekly hours too
+SALARY_PERIODS_PER_YEAR: Dict[str, int] = {
+    'yearly': 1,
+    'monthly': 12,
+    'weekly': 52,
+    'hourly': 52,
+}
+
+
+def annual_salary(amount: Optional[Decimal], period: Optional[str],
+                  hours_per_week: Optional[int] = None) -> Optional[Decimal]:
+    """
+    Gross salary per year in euros, rounded to cents, from the amount per pay
+    period. None when the amount or period is missing, or for hourly pay
+    without hours_per_week.
+    """
+    if amount is None or period not in SALARY_PERIODS_PER_YEAR:
+        return None
+    annual = amount * SALARY_PERIODS_PER_YEAR[period]
+    if period == 'hourly':
+        if not hours_per_week:
+            return None
+        annual *= hours_per_week
+    return annual.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _fact_value(column_type: str, row: tuple) -> Any:
+    """Value for a contract_facts column from a data point row (see DatabaseManager._data_point_rows)"""
+    value_str, _, value_int, value_num, value_bool, value_date = row[3:9]
+    if column_type == 'INTEGER':
+        return value_int
+    if column_type == 'NUMERIC':
+        if value_num is not None:
+            return value_num
+        return value_int if value_int is not None else parse_amount(value_str)
+    if column_type == 'BOOLEAN':
+        return value_bool
+    if column_type == 'DATE':
+        return value_date
+    return value_str
+
+
+def contract_fact_row(contract_id: int, data_point_rows: List[tuple]) -> tuple:
+    """contract_facts row (contract_id, *CONTRACT_FACT_COLUMNS) for the data points of one contract"""
+    by_key = {row[2]: row for row in data_point_rows}
+    facts = {
+        key: _fact_value(column_type, by_key[key]) if key in by_key else None
+        for key, column_type in CONTRACT_FACT_COLUMNS.items()
+    }
+    facts['annual_salary_eur'] = annual_salary(facts['salary_amount'], facts['salary_period'],
+                                               facts['hours_per_week'])
+    return (contract_id, *facts.values())
+
+
+# Clause type -> header pattern, in priority order; clauses matching none are 'unclassified'
+CLAUSE_PATTERNS: Dict[str, str] = {
+    'employee_info': r'gegevens werknemer|employee information|werknemer gegevens',
+    'contract_details': r'gegevens arbeidsovereenkomst|contract details|arbeidsovereenkomst',
+    'probation': r'proeftijd|probation|trial period',
+    'working_hours': r'werktijden|working hours|plaats werkzaamheden|work location',
+    'salary': r'loon|salaris|vakantietoeslag|salary|wage|compensation',
+    'vacation': r'vakantiedagen|vacation days|leave|verlof',
+    'pension': r'pensioen|pension|retirement',
+    'termination': r'opzegging|termination|notice|beëindiging',
+    'confidentiality': r'geheimhouding|confidentiality|nda|non-disclosure',
+    'other': r'overige|other|additional|aanvullend',
+}
+CLAUSE_TYPES = (*CLAUSE_PATTERNS, 'unclassified')
+
+
+def data_key_clause_types(rules: Dict[str, List[ExtractionRule]] = EXTRACTION_RULES) -> Dict[str, tuple]:
+    """data_key -> the clause types whose rules can produce it"""
+    clause_types = {}
+    for clause_type, clause_rules in rules.items():
+        for rule in clause_rules:
+            for key in (rule.key, *rule.extra):
+                if clause_type not in clause_types.setdefault(key, ()):
+                    clause_types[key] += (clause_type,)
+    return clause_types
+
+
+DATA_KEY_CLAUSE_TYPES = data_key_clause_types()
+
+
+# Returned by ContractParser._search_until when the time budget ran out mid-search
+_OUT_OF_TIME = object()
 
 
 class ContractParser:
     """Parses employment contracts and extracts structured clauses"""
     
-    def __init__(self):
-        self.clause_patterns = {
-            'employee_info': r'gegevens werknemer|employee information|werknemer gegevens',
-            'contract_details': r'gegevens arbeidsovereenkomst|contract details|arbeidsovereenkomst',
-            'probation': r'proeftijd|probation|trial period',
-            'working_hours': r'werktijden|working hours|plaats werkzaamheden|work location',
-            'salary': r'loon|salaris|vakantietoeslag|salary|wage|compensation',
-            'vacation': r'vakantiedagen|vacation days|leave|verlof',
-            'pension': r'pensioen|pension|retirement',
-            'termination': r'opzegging|termination|notice|beëindiging',
-            'confidentiality': r'geheimhouding|confidentiality|nda|non-disclosure',
-            'other': r'overige|other|additional|aanvullend',
-        }
+    # Characters searched between two time budget checks (see _search_until)
+    SEARCH_WINDOW = 1024
+    
+    def __init__(self, extraction_rules: Optional[Dict[str, List[ExtractionRule]]] = None,
+                 metrics: Optional[PipelineMetrics] = None, max_repeat: Optional[int] = None,
+                 time_budget_ms: Optional[float] = None):
+        """
+        Args:
+            extraction_rules: Rules per clause type, EXTRACTION_RULES by default
+            metrics: When set, stage latencies and per-rule regex cost are recorded
+            max_repeat: Linear-time mode; every unbounded quantifier in the rule
+                patterns is capped at this many repetitions (see bound_pattern)
+            time_budget_ms: Per-clause extraction budget; rules still pending when
+                it runs out are skipped and listed in Clause.skipped_rules
+        """
+        self.metrics = metrics
+        self.max_repeat = max_repeat
+        self.time_budget = time_budget_ms / 1000 if time_budget_ms is not None else None
+        self.clause_patterns = dict(CLAUSE_PATTERNS)
+        self._clause_matchers = self._compile_clause_matchers()
+        self._extraction_rules = self._compile_extraction_rules(
+            EXTRACTION_RULES if extraction_rules is None else extraction_rules
+        )
+        self._scanners = self._keyword_scanners(self._extraction_rules)
+    
+    def _compile_clause_matchers(self) -> List[tuple]:
+        """
+        Flatten clause_patterns into an ordered (keyword, regex, clause_type) table.
+        Patterns that are plain keyword alternations become substring checks,
+        anything else is compiled once. Order is kept, so the first hit is the
+        same label the per-pattern re.search loop would return.
+        """
+        matchers = []
+        for clause_type, pattern in self.clause_patterns.items():
+            if _REGEX_METACHARACTERS.isdisjoint(pattern):
+                for keyword in pattern.split('|'):
+                    matchers.append((keyword.lower(), None, clause_type))
+            else:
+                matchers.append((None, re.compile(pattern, re.IGNORECASE), clause_type))
+        return matchers
+    
+    def _compile_extraction_rules(self, rules: Dict[str, List[ExtractionRule]]) -> Dict[str, List[tuple]]:
+        """
+        Compile every rule pattern once into (rule, regex, label, triggers);
+        rules sharing a pattern share the compiled regex. triggers are the
+        required_literals of the pattern, None when it has none.
+        """
+        compiled = {}
+        regex_cache = {}
+        trigger_cache = {}
+        for clause_type, clause_rules in rules.items():
+            compiled[clause_type] = []
+            for index, rule in enumerate(clause_rules):
+                regex = triggers = None
+                if rule.pattern is not None:
+                    cache_key = (rule.pattern, rule.flags)
+                    if cache_key not in regex_cache:
+                        pattern = rule.pattern
+                        trigger_cache[cache_key] = required_literals(pattern)
+                        if self.max_repeat is not None:
+                            pattern = bound_pattern(pattern, self.max_repeat)
+                        regex_cache[cache_key] = re.compile(pattern, rule.flags)
+                    regex = regex_cache[cache_key]
+                    triggers = trigger_cache[cache_key]
+                compiled[clause_type].append((rule, regex, f"{rule.key}#{index}", triggers))
+        return compiled
+    
+    @staticmethod
+    def _keyword_scanners(compiled: Dict[str, List[tuple]]) -> Dict[str, KeywordScanner]:
+        """One scanner per clause type over the triggers of all its rules"""
+        scanners = {}
+        for clause_type, rules in compiled.items():
+            keywords = set().union(*(triggers for _, _, _, triggers in rules if triggers is not None))
+            if keywords:
+                scanners[clause_type] = KeywordScanner(keywords)
+        return scanners
     
     def parse_contract(self, contract_text: str) -> List[Clause]:
         """Parse contract text into structured clauses"""
-        clauses = []
-        section_pattern = r'\*\*(\d+)\.?\s+([^\*]+?)\s*\*\*'
-        sections = re.split(section_pattern, contract_text)
-        
-        for i in range(1, len(sections), 3):
-            if i + 1 < len(sections):
-                section_num = sections[i].strip()
-                header = sections[i + 1].strip()
-                content = sections[i + 2].strip() if i + 2 < len(sections) else ""
-                
-                if content:
-                    clause = Clause(
-                        section_number=section_num,
-                        header=header,
-                        content=content
-                    )
-                    clauses.append(clause)
+        return list(self.iter_clauses(contract_text))
+    
+    def iter_clauses(self, source: Union[str, bytes, mmap.mmap, TextIO],
+                     chunk_size: int = 1 << 16) -> Iterator[Clause]:
+        """
+        Yield clauses one at a time, walking the **N. Header** markers incrementally.
         
-        return clauses
+        source may be the contract text, a bytes-like object such as an mmap of
+        a UTF-8 file (scanned in place, only clause slices are decoded), or a
+        text file object, read chunk_size characters at a time. Apart from the
+        clause being yielded, at most one chunk of text is held in memory.
+        """
+        if isinstance(source, str):
+            yield from self._iter_buffer_clauses(source, _SECTION_PATTERN, str)
+        elif isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+            yield from self._iter_buffer_clauses(source, _SECTION_PATTERN_BYTES, _decode_utf8)
+        else:
+            yield from self._iter_stream_clauses(source, chunk_size)
+    
+    @staticmethod
+    def _build_clause(section_number: str, header: str, content: str) -> Optional[Clause]:
+        content = content.strip()
+        if not content:
+            return None
+        return Clause(section_number=section_number.strip(), header=header.strip(), content=content)
+    
+    @staticmethod
+    def _strip_span(text: str, start: int, end: int) -> tuple:
+        """(start, end) of text[start:end].strip(), without copying the slice"""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return start, end
+    
+    def _build_span_clause(self, text: str, marker: 're.Match', end: int) -> Optional[Clause]:
+        content_span = self._strip_span(text, marker.end(), end)
+        if content_span[0] == content_span[1]:
+            return None
+        return Clause.from_spans(text, marker.group(1).strip(), self._strip_span(text, *marker.span(2)),
+                                 content_span)
+    
+    def _iter_buffer_clauses(self, buffer, pattern: 're.Pattern', decode: Callable) -> Iterator[Clause]:
+        # A str is immutable and already held by the caller, so clauses point
+        # into it; bytes-like buffers (mmaps may be closed) are decoded per clause
+        spans = isinstance(buffer, str)
+        marker = None
+        for match in pattern.finditer(buffer):
+            if marker is not None:
+                if spans:
+                    clause = self._build_span_clause(buffer, marker, match.start())
+                else:
+                    clause = self._build_clause(decode(marker.group(1)), decode(marker.group(2)),
+                                                decode(buffer[marker.end():match.start()]))
+                if clause:
+                    yield clause
+            marker = match
+        if marker is not None:
+            if spans:
+                clause = self._build_span_clause(buffer, marker, len(buffer))
+            else:
+                clause = self._build_clause(decode(marker.group(1)), decode(marker.group(2)),
+                                            decode(buffer[marker.end():]))
+            if clause:
+                yield clause
+    
+    def _iter_stream_clauses(self, stream: TextIO, chunk_size: int) -> Iterator[Clause]:
+        buffer = ''
+        marker = None       # (section_number, header) of the clause being read
+        content_start = 0   # where that clause's content begins in buffer
+        scan_from = 0       # no unseen marker can start before this position
+        while True:
+            chunk = stream.read(chunk_size)
+            buffer += chunk
+            for match in _SECTION_PATTERN.finditer(buffer, scan_from):
+                if marker is not None:
+                    clause = self._build_clause(*marker, buffer[content_start:match.start()])
+                    if clause:
+                        yield clause
+                marker = match.groups()
+                content_start = scan_from = match.end()
+            if not chunk:
+                break
+            # A header cannot contain '*', so a marker cut off by the chunk
+            # boundary starts at the last '**' (or a lone trailing '*')
+            tail = buffer.rfind('**', scan_from)
+            scan_from = tail if tail != -1 else max(scan_from, len(buffer) - 1)
+            keep_from = content_start if marker is not None else scan_from
+            buffer = buffer[keep_from:]
+            content_start -= keep_from
+            scan_from -= keep_from
+        if marker is not None:
+            clause = self._build_clause(*marker, buffer[content_start:])
+            if clause:
+                yield clause
     
     def classify_clause(self, clause: Clause) -> str:
         """Classify clause type based on header content"""
         header_lower = clause.header.lower()
         
-        for clause_type, pattern in self.clause_patterns.items():
-            if re.search(pattern, header_lower, re.IGNORECASE):
+        for keyword, regex, clause_type in self._clause_matchers:
+            if regex is None:
+                if keyword in header_lower:
+                    return clause_type
+            elif regex.search(header_lower):
                 return clause_type
         
         return 'unclassified'
     
     def extract_structured_data(self, clause: Clause) -> Dict[str, Any]:
-        """Extract structured data based on clause type using regex patterns"""
-        data = {}
-        content = clause.content
+        """
+        Extract structured data by running the extraction rules registered for the clause type
         
-        if clause.clause_type == 'employee_info':
-            # Extract birth date
-            birth_match = re.search(r'(?:Geboortedatum|Date of birth|Birth date):\s*([^\n]+)', content, re.IGNORECASE)
-            if birth_match:
-                data['employee_birth_date'] = birth_match.group(1).strip()
+        With a time budget, each search runs over SEARCH_WINDOW-sized stretches
+        of the clause and the budget is checked before every stretch; once it
+        is spent, the rule being searched and the remaining rules are not run
+        and their labels are stored in clause.skipped_rules, so the clause
+        keeps what was found so far.
         
-        elif clause.clause_type == 'salary':
-            # Extract salary amount
-            salary_match = re.search(r'€\s*([\d.,]+)', content)
-            if salary_match:
-                data['salary_amount'] = salary_match.group(1)
-            
-            # Extract salary period
-            if re.search(r'per\s+maand|per\s+month', content, re.IGNORECASE):
-                data['salary_period'] = 'monthly'
-            elif re.search(r'per\s+jaar|per\s+year', content, re.IGNORECASE):
-                data['salary_period'] = 'yearly'
-            elif re.search(r'per\s+week|per\s+week', content, re.IGNORECASE):
-                data['salary_period'] = 'weekly'
-            elif re.search(r'per\s+uur|per\s+hour', content, re.IGNORECASE):
-                data['salary_period'] = 'hourly'
+        The clause is scanned once for the trigger words of all its rules; a
+        rule none of whose triggers occur cannot match and is not searched.
+        """
+        data = {}
+        content = clause.content
+        matches = {}
+        # (clause_type, rule label) -> [searches, matches, seconds], only with metrics
+        rule_stats = {} if self.metrics is not None else None
+        deadline = time.perf_counter() + self.time_budget if self.time_budget is not None else None
+        clause.skipped_rules = ()
+        rules = self._extraction_rules.get(clause.clause_type, ())
+        scanner = self._scanners.get(clause.clause_type)
+        present = scanner.scan(content) if scanner is not None else None
         
-        elif clause.clause_type == 'vacation':
-            # Extract vacation days
-            days_match = re.search(r'(\d+)\s+vakantiedagen|(\d+)\s+vacation days', content, re.IGNORECASE)
-            if days_match:
-                days = days_match.group(1) or days_match.group(2)
-                data['vacation_days'] = int(days)
-            
-            # Extract vacation hours
-            hours_match = re.search(r'(\d+)\s+vakantie-uren|(\d+)\s+vacation hours', content, re.IGNORECASE)
-            if hours_match:
-                hours = hours_match.group(1) or hours_match.group(2)
-                data['vacation_hours'] = int(hours)
+        for index, (rule, regex, label, triggers) in enumerate(rules):
+            if rule.key in data:
+                continue
+            if rule.requires is not None and not rule.requires(data):
+                continue
+            match = None
+            if regex is not None:
+                if regex not in matches and triggers is not None and triggers.isdisjoint(present):
+                    matches[regex] = None
+                if regex not in matches:
+                    start = time.perf_counter() if rule_stats is not None else None
+                    if deadline is None:
+                        match = regex.search(content)
+                    else:
+                        match = self._search_until(regex, content, deadline)
+                        if match is _OUT_OF_TIME:
+                            clause.skipped_rules = [later_label for later_rule, _, later_label, _ in rules[index:]
+                                                    if later_rule.key not in data]
+                            break
+                    matches[regex] = match
+                    if rule_stats is not None:
+                        rule_stats[(clause.clause_type, label)] = [1, match is not None, time.perf_counter() - start]
+                match = matches[regex]
+                if match is None:
+                    continue
+            data[rule.key] = _resolve(rule.value, match)
+            for key, value in rule.extra.items():
+                data[key] = _resolve(value, match)
         
-        elif clause.clause_type == 'working_hours':
-            # Extract hours per week
-            hours_match = re.search(r'(\d+)\s+uur per week|(\d+)\s+hours per week', content, re.IGNORECASE)
-            if hours_match:
-                hours = hours_match.group(1) or hours_match.group(2)
-                data['hours_per_week'] = int(hours)
-            
-            # Determine employment type
-            if re.search(r'\bfulltime\b|\bfull-time\b|\bvoltijd\b', content, re.IGNORECASE):
-                data['employment_type'] = 'fulltime'
-            elif re.search(r'\bparttime\b|\bpart-time\b|\bdeeltijd\b', content, re.IGNORECASE):
-                data['employment_type'] = 'parttime'
-            
-            # Extract work days (e.g., dinsdag tot vrijdag, woensdag t/m vrijdag, etc.)
-            weekday = (
-                r"maandag|dinsdag|woensdag|donderdag|vrijdag|zaterdag|zondag|"
-                r"monday|tuesday|wednesday|thursday|friday|saturday|sunday"
-            )
+        if self.metrics is not None:
+            if rule_stats:
+                self.metrics.observe_rules(rule_stats)
+            if clause.skipped_rules:
+                self.metrics.observe_budget_skip(clause.clause_type)
+        return data
+    
+    def _search_until(self, regex: 're.Pattern', content: str, deadline: float) -> Optional['re.Match']:
+        """
+        regex.search(content), but giving up with _OUT_OF_TIME once the
+        deadline has passed. Each step searches 2 * SEARCH_WINDOW characters
+        for a match starting in the first half, so one step costs a bounded
+        amount of time (with max_repeat set) and a match up to SEARCH_WINDOW
+        characters long is always found. A match is confirmed on the whole
+        clause, since the end of a stretch can satisfy $ or \\b where the
+        clause does not.
+        """
+        window = self.SEARCH_WINDOW
+        position = 0
+        while True:
+            if time.perf_counter() > deadline:
+                return _OUT_OF_TIME
+            end = position + 2 * window
+            if end >= len(content):
+                return regex.search(content, position)
+            match = regex.search(content, position, end)
+            if match is None or match.start() >= position + window:
+                position += window
+                continue
+            confirmed = regex.match(content, match.start())
+            if confirmed is not None:
+                return confirmed
+            position = match.start() + 1
+    
+    def _stage(self, name: str):
+        return self.metrics.time_stage(name) if self.metrics is not None else nullcontext()
+    
+    def analyze_contract(self, contract_text: str) -> List[Clause]:
+        """Parse, classify and extract a contract without touching the database"""
+        with self._stage('parse_contract'):
+            clauses = self.parse_contract(contract_text)
+        with self._stage('classify_clause'):
+            for clause in clauses:
+                clause.clause_type = self.classify_clause(clause)
+        with self._stage('extract_structured_data'):
+            for clause in clauses:
+                clause.extracted_data = self.extract_structured_data(clause)
+        return clauses
 
-            range_pattern = (
-                rf"\b({weekday})\b\s*(?:tot(?:\s+en\s+met)?|t\/m|to|–|-|—)\s*\b({weekday})\b"
-            )
+# Where contracts keep their full text: in contracts.raw_text ('inline'), or
+# in the contract_texts table as TEXT ('blob') or zlib-compressed BYTEA ('compressed')
+TEXT_STORAGE_MODES = ('inline', 'blob', 'compressed')
+# none: plain tables; hash: clauses and data_points hash-partitioned on contract_id;
+# clause_type: both list-partitioned with one partition per clause type
+PARTITIONING_MODES = ('none', 'hash', 'clause_type')
 
-            days_match = re.search(range_pattern, content, re.IGNORECASE)
-            if days_match:
-                start_day = days_match.group(1).capitalize()
-                end_day = days_match.group(2).capitalize()
-                if start_day.lower() != end_day.lower():
-                    data['work_days'] = f"{start_day} to {end_day}"
-                else:
-                    data['work_days'] = start_day
-
-            # Extract work hours
-            time_match = re.search(r'(\d{1,2}:\d{2})\s*(?:tot|to)\s*(\d{1,2}:\d{2})', content)
-            if time_match:
-                start_time = time_match.group(1)
-                end_time = time_match.group(2)
-                data['work_hours'] = f"{start_time} - {end_time}"
-            
-            # Extract work location - looks for "te" or "in" followed by capitalized city name
-            location_match = re.search(r'(?:\bte\b|\bin\b)\s+([A-Z][a-zA-Zé-]+(?:\s+[A-Z][a-zA-Zé-]+)?)', content)
-            if location_match:
-                data['work_location'] = location_match.group(1).strip()
-            
-            # Check for remote work
-            if re.search(r'thuiswerken|remote|work from home|hybrid', content, re.IGNORECASE):
-                data['remote_work_possible'] = True
-        
-        elif clause.clause_type == 'probation':
-            # Check if there's a probation period (Y/N)
-            if re.search(r'geen proeftijd|no probation|no trial', content, re.IGNORECASE):
-                data['probation_period'] = 'No'
-                data['probation_months'] = 0
-            else:
-                # Look for probation duration
-                period_match = re.search(r'(\d+)\s+(maand|maanden|month|months)', content, re.IGNORECASE)
-                if period_match:
-                    data['probation_period'] = 'Yes'
-                    data['probation_months'] = int(period_match.group(1))
-                else:
-                    data['probation_period'] = 'Unknown'
-                    data['probation_months'] = None
-            
-        elif clause.clause_type == 'contract_details':
-            # Determine contract type
-            if re.search(r'bepaalde tijd|fixed term|temporary', content, re.IGNORECASE):
-                data['contract_type'] = 'fixed_term'
-            elif re.search(r'onbepaalde tijd|permanent|indefinite', content, re.IGNORECASE):
-                data['contract_type'] = 'permanent'
-            
-            # Extract job title/function
-            function_match = re.search(r'functie van\s+([^\n\.]+)|position of\s+([^\n\.]+)', content, re.IGNORECASE)
-            if function_match:
-                function = function_match.group(1) or function_match.group(2)
-                data['job_title'] = function.strip()
-            
-            # Extract start date
-            date_patterns = [
-                r'(\d{1,2}\s+\w+\s+\d{4})',
-                r'(\d{1,2}[-/]\d{1,2}[-/]\d{4})',
-            ]
-            for pattern in date_patterns:
-                start_match = re.search(r'(?:treedt.*?op|in dienst|start|from).+?' + pattern, content, re.IGNORECASE)
-                if start_match:
-                    data['start_date'] = start_match.group(1)
-                    break
-            
-            # Extract contract duration
-            duration_match = re.search(r'duur van\s+([^\n]+?)\s+(?:en|\.)', content, re.IGNORECASE)
-            if duration_match:
-                data['contract_duration'] = duration_match.group(1).strip()
-            
-            # Extract end date for fixed term
-            if data.get('contract_type') == 'fixed_term':
-                for pattern in date_patterns:
-                    end_match = re.search(r'(?:tot|until|to)\s+' + pattern, content, re.IGNORECASE)
-                    if end_match:
-                        data['end_date'] = end_match.group(1)
-                        break
-            
-            # CAO (collective labor agreement) status
-            if re.search(r'geen cao|geen collectieve|no cao|no collective|niet van toepassing', content, re.IGNORECASE):
-                data['cao_applicable'] = False
-            elif re.search(r'(?:cao|collectieve arbeidsovereenkomst).*(?:is|wordt)\s+van toepassing|collective.*agreement.*(?:is\s+)?applicable', content, re.IGNORECASE):
-                data['cao_applicable'] = True
-                # Extract CAO name
-                cao_match = re.search(r'cao\s+([^\n\.]+?)(?:\s+(?:is|wordt)\s+van toepassing|\.|$)', content, re.IGNORECASE)
-                if cao_match:
-                    data['cao_name'] = cao_match.group(1).strip()
-        
-        elif clause.clause_type == 'pension':
-            # check if there is a pension (true/false)
-            if re.search(r'geen.*pensioen|no.*pension', content, re.IGNORECASE):
-                data['pension_scheme'] = 'None'  # no pension
-            else:
-                # pension present
-                # check if pension is mandatory
-                if re.search(r'verplicht.*pensioen|mandatory pension|required', content, re.IGNORECASE):
-                    data['pension_scheme'] = 'mandatory'
-                else:
-                    data['pension_scheme'] = 'voluntary'  # assume voluntary if not mandatory
 
-                # extract only the pension fund name: look for capitalized words with optional spaces just before "Pensioenfonds"
-                fund_match = re.search(r'([A-Z][a-zA-Z]*?(?:\s+[A-Z][a-zA-Z]*?)*?)\s+Pensioenfonds', content)
-                if fund_match:
-                    data['pension_fund'] = fund_match.group(1).strip()
-        
-        elif clause.clause_type == 'termination':
-            # Check if termination is not allowed
-            if re.search(r'kunnen.*niet.*opzeggen|cannot.*terminate|not.*terminable', content, re.IGNORECASE):
-                data['early_termination_allowed'] = False
-            
-            # Check if termination is allowed
-            elif re.search(r'kunnen.*opzeggen|can.*terminate|may.*terminate', content, re.IGNORECASE):
-                data['early_termination_allowed'] = True
-                
-                # Extract notice period
-                notice_match = re.search(r'opzegtermijn.*?(\d+)\s+(maand|maanden|month|months|week|weken|weeks)', content, re.IGNORECASE)
-                if notice_match:
-                    duration = int(notice_match.group(1))
-                    unit = notice_match.group(2).lower()
-                    if 'week' in unit:
-                        data['notice_period'] = f"{duration} weeks"
-                        data['notice_period_weeks'] = duration
-                    else:
-                        data['notice_period'] = f"{duration} months"
-                        data['notice_period_months'] = duration
-                
-                # Check for statutory notice period
-                if re.search(r'wettelijke.*opzegtermijn|statutory.*notice|legal.*notice', content, re.IGNORECASE):
-                    data['statutory_notice'] = True
-                
-                # Extract notice timing (end of month, etc.)
-                if re.search(r'tegen.*einde.*maand|end of.*month', content, re.IGNORECASE):
-                    data['notice_timing'] = 'end_of_month'
-        
-        elif clause.clause_type == 'confidentiality':
-            # Check for confidentiality obligation
-            if re.search(r'verplicht tot geheimhouding|confidentiality obligation|required.*confidential', content, re.IGNORECASE):
-                data['confidentiality_required'] = True
-            
-            # Check what is covered
-            if re.search(r'bedrijf|company|business', content, re.IGNORECASE):
-                data['confidentiality_scope_company'] = True
-            if re.search(r'bedrijfsvoering|operations', content, re.IGNORECASE):
-                data['confidentiality_scope_operations'] = True
-            if re.search(r'klanten|clients|customers', content, re.IGNORECASE):
-                data['confidentiality_scope_clients'] = True
-            
-            # Check if continues after employment
-            if re.search(r'na beëindiging|after.*termination|post-employment', content, re.IGNORECASE):
-                data['confidentiality_post_employment'] = True
-        
-        elif clause.clause_type == 'other':
-            # Travel allowance
-            travel_match = re.search(r'reiskostenvergoeding.*?€\s*([\d.,]+)|travel allowance.*?€\s*([\d.,]+)', content, re.IGNORECASE)
-            if travel_match:
-                amount = travel_match.group(1) or travel_match.group(2)
-                data['travel_allowance'] = f"€{amount}"
-            elif re.search(r'reiskostenvergoeding|travel allowance', content, re.IGNORECASE):
-                data['travel_allowance_available'] = True
-            
-            # Expense allowance
-            if re.search(r'onkostenvergoeding|expense allowance|expenses', content, re.IGNORECASE):
-                data['expense_allowance'] = True
-            
-            # Equipment provision
-            if re.search(r'laptop|notebook', content, re.IGNORECASE):
-                data['laptop_provided'] = True
-            if re.search(r'mobiele telefoon|mobile phone|smartphone', content, re.IGNORECASE):
-                data['phone_provided'] = True
-            if re.search(r'bedrijfsmiddelen|company equipment|tools', content, re.IGNORECASE):
-                data['company_equipment_provided'] = True
-            
-            # Company car
-            if re.search(r'leaseauto|company car|lease car', content, re.IGNORECASE):
-                data['company_car'] = True
-            
-            # Non-compete clause
-            if re.search(r'concurrentiebeding|non-compete|competition clause', content, re.IGNORECASE):
-                data['non_compete_clause'] = True
-            
-            # Client/relation clause
-            if re.search(r'relatiebeding|client clause|non-solicitation', content, re.IGNORECASE):
-                data['relation_clause'] = True
-            
-            # Training/education
-            if re.search(r'opleidingen|cursussen|training|education|course', content, re.IGNORECASE):
-                data['training_available'] = True
-            
-            # Sick leave reporting
-            if re.search(r'ziekmelding|sick leave|illness reporting', content, re.IGNORECASE):
-                data['sick_leave_procedure'] = True
-            if re.search(r'controlevoorschriften|control.*provisions|monitoring', content, re.IGNORECASE):
-                data['sick_leave_controls'] = True
-            
-            # Insurance
-            if re.search(r'collectieve verzekeringen|collective insurance|group insurance', content, re.IGNORECASE):
-                data['collective_insurance'] = True
-            if re.search(r'ziektekostenverzekering|health insurance', content, re.IGNORECASE):
-                data['health_insurance_contribution'] = True
-        
-        return data
+def _read_through(method):
+    """
+    Serve a DatabaseManager query from its LRU query cache when it is enabled,
+    for at most query_cache_ttl seconds after the query ran
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._query_cache is None:
+            return method(self, *args, **kwargs)
+        freeze = lambda value: tuple(value) if isinstance(value, list) else value  # noqa: E731
+        key = (method.__name__, tuple(map(freeze, args)),
+               tuple((name, freeze(value)) for name, value in sorted(kwargs.items())))
+        now = time.monotonic()
+        if key in self._query_cache:
+            expires, result = self._query_cache[key]
+            if now < expires:
+                self._query_cache.move_to_end(key)
+                return result
+            del self._query_cache[key]
+        result = method(self, *args, **kwargs)
+        self._query_cache[key] = (now + self.query_cache_ttl, result)
+        if len(self._query_cache) > self.query_cache_size:
+            self._query_cache.popitem(last=False)
+        return result
+    return wrapper
+
+
+def _invalidates_cache(method):
+    """Drop every cached query result when a DatabaseManager write method runs"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._query_cache:
+            self._query_cache.clear()
+        return method(self, *args, **kwargs)
+    return wrapper
+
 
 class DatabaseManager:
     """Manages PostgreSQL database operations"""
-    def __init__(self, db_config: Dict[str, str]):
+    def __init__(self, db_config: Dict[str, str], batch_size: int = 1000,
+                 pool: Optional[ConnectionPool] = None, group_commit_size: Optional[int] = None,
+                 group_commit_interval_ms: Optional[float] = None, metrics: Optional[PipelineMetrics] = None,
+                 query_cache_size: Optional[int] = None, text_storage: str = 'inline',
+                 partitioning: str = 'none', hash_partitions: int = 16, query_cache_ttl: float = 30.0):
+        if text_storage not in TEXT_STORAGE_MODES:
+            raise ValueError(f"text_storage must be one of {TEXT_STORAGE_MODES}, not {text_storage!r}")
+        if partitioning not in PARTITIONING_MODES:
+            raise ValueError(f"partitioning must be one of {PARTITIONING_MODES}, not {partitioning!r}")
         self.db_config = db_config
+        self.text_storage = text_storage
+        # Layout of clauses and data_points created by initialize_schema; the
+        # number of hash partitions is fixed once the tables exist
+        self.partitioning = partitioning
+        self.hash_partitions = hash_partitions
+        # Clause types searched for a data key under clause_type partitioning;
+        # replace with data_key_clause_types(rules) when ingesting with custom rules
+        self.data_key_clause_types = DATA_KEY_CLAUSE_TYPES
+        self.metrics = metrics  # when set, statements and rows are counted on a CountingCursor
+        self.batch_size = batch_size  # rows per multi-row INSERT statement
+        self.pool = pool  # when set, connect/disconnect borrow and return pooled connections
+        # Group commit: contracts share one transaction, committed every
+        # group_commit_size contracts or group_commit_interval_ms milliseconds
+        self.group_commit_size = group_commit_size
+        self.group_commit_interval_ms = group_commit_interval_ms
         self.conn = None
         self.cur = None
+        self._transaction_depth = 0
+        self._pending_contracts = 0
+        self._group_started = None
+        self._on_commit = []
+        # Read-through LRU cache of query results (get_* and compare_* methods),
+        # cleared by every write through this manager; results are shared, so
+        # callers must not mutate them. Writes by other managers, processes or
+        # backfill.py are not seen, so entries expire after query_cache_ttl seconds
+        self.query_cache_size = query_cache_size
+        self.query_cache_ttl = query_cache_ttl
+        self._query_cache = OrderedDict() if query_cache_size else None
+
+    @property
+    def group_commit(self) -> bool:
+        return bool(self.group_commit_size or self.group_commit_interval_ms)
 
     def connect(self):
-        self.conn = psycopg2.connect(**self.db_config)
+        self.conn = self.pool.getconn() if self.pool else psycopg2.connect(**self.db_config)
         self.cur = self.conn.cursor()
+        if self.metrics is not None:
+            self.cur = CountingCursor(self.cur)
 
     def disconnect(self):
         if self.cur:
             self.cur.close()
         if self.conn:
-            self.conn.close()
+            if self.pool:
+                self.pool.putconn(self.conn)
+            else:
+                self.conn.close()
+        self.conn = None
+        self.cur = None
+        self._pending_contracts = 0
+        self._group_started = None
+        self._on_commit = []
+
+    def commit(self):
+        """Commit the open transaction and run the callbacks of the contracts it contained"""
+        self.conn.commit()
+        if isinstance(self.cur, CountingCursor):
+            self.cur.round_trips += 1
+        callbacks, self._on_commit = self._on_commit, []
+        self._pending_contracts = 0
+        self._group_started = None
+        for callback in callbacks:
+            callback()
+
+    def _commit(self):
+        # Writes inside contract_transaction() are committed by it
+        if self._transaction_depth == 0:
+            self.commit()
+
+    def after_commit(self, callback: Callable[[], None]):
+        """Run callback once everything written so far is committed"""
+        if self._pending_contracts:
+            self._on_commit.append(callback)
+        else:
+            callback()
+
+    def flush_if_due(self) -> bool:
+        """
+        Commit the open group once it is group_commit_interval_ms old.
+        contract_transaction only checks the age when the next contract is
+        written, so callers that can go idle (a quiet inbox, a writer waiting
+        for work) call this to keep contracts from staying uncommitted.
+        Returns: whether a group was committed
+        """
+        if (self._transaction_depth or not self._pending_contracts or not self.group_commit_interval_ms
+                or (time.monotonic() - self._group_started) * 1000 < self.group_commit_interval_ms):
+            return False
+        self.commit()
+        return True
+
+    def transaction_lost(self) -> bool:
+        """
+        Whether a failed statement or commit left the connection unable to
+        carry on: closed, in an aborted transaction, or no longer in the
+        transaction holding the open group because its commit failed
+        """
+        if self.conn is None:
+            return False
+        if self.conn.closed:
+            return True
+        status = self.conn.get_transaction_status()
+        if status == psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return self._pending_contracts > 0
+        return status != psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+    def abandon(self):
+        """
+        Give up the connection after transaction_lost(): what it had not
+        committed is rolled back, a broken connection is dropped instead of
+        returned to the pool, and the contracts of the lost group never get
+        their on_commit callbacks. The next contract connects afresh.
+        """
+        try:
+            if self.cur:
+                self.cur.close()
+        except psycopg2.Error:
+            pass
+        self.cur = None
+        self._transaction_depth = 0
+        if self._query_cache:
+            self._query_cache.clear()
+        self.disconnect()
+
+    @contextmanager
+    def contract_transaction(self, on_commit: Optional[Callable[[], None]] = None):
+        """
+        Write one contract atomically. Without group commit the contract is
+        committed on exit; with it the contract is released into the open
+        group, which is committed once it is large or old enough. A failing
+        contract is rolled back to its savepoint and leaves the group intact.
+        on_commit runs after the contract is durably committed.
+        """
+        if self.group_commit:
+            self.cur.execute("SAVEPOINT contract")
+        self._transaction_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._transaction_depth -= 1
+            if self._query_cache:
+                self._query_cache.clear()
+            if self.group_commit:
+                self.cur.execute("ROLLBACK TO SAVEPOINT contract")
+            else:
+                self.conn.rollback()
+            raise
+        self._transaction_depth -= 1
+        if self.group_commit:
+            self.cur.execute("RELEASE SAVEPOINT contract")
+        if on_commit:
+            self._on_commit.append(on_commit)
+        self._pending_contracts += 1
+        if self._group_started is None:
+            self._group_started = time.monotonic()
+        elapsed_ms = (time.monotonic() - self._group_started) * 1000
+        if (not self.group_commit
+                or (self.group_commit_size and self._pending_contracts >= self.group_commit_size)
+                or (self.group_commit_interval_ms and elapsed_ms >= self.group_commit_interval_ms)):
+            self.commit()
 
+    # Columns added after the first release, so existing databases get them too
+    UPGRADE_COLUMNS_SQL = """
+        ALTER TABLE contracts ADD COLUMN IF NOT EXISTS content_hash CHAR(64);
+        -- content is NULL when the clause is stored as [content_start, content_end) of the contract text
+        ALTER TABLE clauses
+            ADD COLUMN IF NOT EXISTS content_start INTEGER,
+            ADD COLUMN IF NOT EXISTS content_end INTEGER;
+        ALTER TABLE data_points
+            ADD COLUMN IF NOT EXISTS value_int BIGINT,
+            ADD COLUMN IF NOT EXISTS value_num NUMERIC,
+            ADD COLUMN IF NOT EXISTS value_bool BOOLEAN,
+            ADD COLUMN IF NOT EXISTS value_date DATE;
+    """
+
+    # content_hash() as a SQL expression over the text column(s) given as {text}
+    CONTENT_HASH_SQL = "encode(sha256(convert_to(regexp_replace({text}, E'\\r\\n?', E'\\n', 'g'), 'UTF8')), 'hex')"
+
+    # Hashes contracts stored before content_hash existed, so that ingesting them again hits the unique
+    # index instead of adding a duplicate. Of contracts with the same text only the first gets the hash.
+    # Compressed texts are hashed in Python (see _backfill_compressed_content_hashes).
+    BACKFILL_CONTENT_HASH_SQL = f"""
+        UPDATE contracts ct SET content_hash = h.digest
+        FROM (
+            SELECT DISTINCT ON (digest) contract_id, digest FROM (
+                SELECT c.contract_id, {CONTENT_HASH_SQL.format(text='COALESCE(c.raw_text, tx.raw_text)')} AS digest
+                FROM contracts c LEFT JOIN contract_texts tx ON tx.contract_id = c.contract_id
+                WHERE c.content_hash IS NULL AND COALESCE(c.raw_text, tx.raw_text) IS NOT NULL
+            ) hashed
+            ORDER BY digest, contract_id
+        ) h
+        WHERE ct.contract_id = h.contract_id
+            AND NOT EXISTS (SELECT 1 FROM contracts other WHERE other.content_hash = h.digest);
+    """
+
+    CLAUSE_COLUMNS = ('contract_id', 'section_number', 'header', 'content', 'clause_type',
+                      'content_start', 'content_end', 'created_at')
+    DATA_POINT_COLUMNS = ('contract_id', 'clause_type', 'data_key', 'data_value', 'data_type',
+                          'value_int', 'value_num', 'value_bool', 'value_date', 'created_at')
+
+    @_invalidates_cache
     def initialize_schema(self):
+        if self.partitioning != 'none' and self._relkind('clauses') == 'r':
+            raise RuntimeError(f"clauses and data_points are not partitioned; "
+                               f"move them to {self.partitioning!r} partitions with migrate_partitioning()")
         schema_sql = """
         CREATE TABLE IF NOT EXISTS contracts (
             contract_id SERIAL PRIMARY KEY,
             contract_name VARCHAR(255),
             upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             raw_text TEXT,
+            content_hash CHAR(64),
             processed BOOLEAN DEFAULT FALSE
         );
-        CREATE TABLE IF NOT EXISTS clauses (
+        CREATE TABLE IF NOT EXISTS contract_texts (
+            contract_id INTEGER PRIMARY KEY REFERENCES contracts(contract_id) ON DELETE CASCADE,
+            raw_text TEXT,
+            raw_text_z BYTEA
+        );
+        """
+        schema_sql += self._clause_tables_sql()
+        schema_sql += self.UPGRADE_COLUMNS_SQL
+        schema_sql += self.BACKFILL_CONTENT_HASH_SQL
+        schema_sql += """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_contracts_content_hash ON contracts(content_hash);
+        CREATE INDEX IF NOT EXISTS idx_contract_id ON clauses(contract_id);
+        CREATE INDEX IF NOT EXISTS idx_clause_type ON clauses(clause_type);
+        CREATE INDEX IF NOT EXISTS idx_data_points_contract ON data_points(contract_id);
+        CREATE INDEX IF NOT EXISTS idx_data_points_clause_type ON data_points(clause_type);
+        CREATE INDEX IF NOT EXISTS idx_data_points_key ON data_points(data_key);
+        -- one partial index per value type: "top N by key" is an ordered scan of a single index
+        CREATE INDEX IF NOT EXISTS idx_data_points_key_int
+            ON data_points(data_key, value_int DESC, contract_id) WHERE value_int IS NOT NULL;
+        CREATE INDEX IF NOT EXISTS idx_data_points_key_num
+            ON data_points(data_key, value_num DESC, contract_id) WHERE value_num IS NOT NULL;
+        CREATE INDEX IF NOT EXISTS idx_data_points_key_date
+            ON data_points(data_key, value_date DESC, contract_id) WHERE value_date IS NOT NULL;
+        CREATE INDEX IF NOT EXISTS idx_data_points_key_bool
+            ON data_points(data_key, value_bool, contract_id) WHERE value_bool IS NOT NULL;
+        CREATE TABLE IF NOT EXISTS contract_facts (
+            contract_id INTEGER PRIMARY KEY REFERENCES contracts(contract_id) ON DELETE CASCADE,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+        # Fact columns are added one by one, so new keys reach existing databases too
+        schema_sql += ''.join(
+            f"ALTER TABLE contract_facts ADD COLUMN IF NOT EXISTS {key} {column_type};\n"
+            for key, column_type in CONTRACT_FACT_COLUMNS.items())
+        schema_sql += "CREATE INDEX IF NOT EXISTS idx_contract_facts_contract_type ON contract_facts(contract_type);\n"
+        schema_sql += ("CREATE INDEX IF NOT EXISTS idx_contract_facts_annual_salary "
+                       "ON contract_facts(annual_salary_eur) WHERE annual_salary_eur IS NOT NULL;\n")
+        self.cur.execute(schema_sql)
+        self._backfill_compressed_content_hashes()
+        self._commit()
+
+    def _backfill_compressed_content_hashes(self):
+        """
+        BACKFILL_CONTENT_HASH_SQL for texts stored zlib-compressed, which
+        PostgreSQL cannot inflate: batch_size contracts at a time
+        """
+        seen = set()
+        last_id = 0
+        while True:
+            self.cur.execute("""
+            SELECT ct.contract_id, tx.raw_text_z
+            FROM contracts ct JOIN contract_texts tx ON tx.contract_id = ct.contract_id
+            WHERE ct.content_hash IS NULL AND tx.raw_text_z IS NOT NULL AND ct.contract_id > %s
+            ORDER BY ct.contract_id
+            LIMIT %s
+            """, (last_id, self.batch_size))
+            rows = self.cur.fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            digests = []
+            for contract_id, blob_z in rows:
+                digest = content_hash(zlib.decompress(blob_z).decode('utf-8'))
+                if digest not in seen:
+                    seen.add(digest)
+                    digests.append((digest, contract_id))
+            if not digests:
+                continue
+            execute_values(self.cur, """
+            UPDATE contracts ct SET content_hash = v.digest
+            FROM (VALUES %s) AS v(digest, contract_id)
+            WHERE ct.contract_id = v.contract_id
+                AND NOT EXISTS (SELECT 1 FROM contracts other WHERE other.content_hash = v.digest)
+            """, digests, page_size=self.batch_size)
+
+    def _clause_tables_sql(self, suffix: str = '') -> str:
+        """
+        CREATE TABLE statements for clauses and data_points (named with suffix
+        appended), partitioned as configured, and for their partitions. The
+        partition names always derive from the final table names.
+        """
+        partition_by = {
+            'none': '',
+            'hash': ' PARTITION BY HASH (contract_id)',
+            'clause_type': ' PARTITION BY LIST (clause_type)',
+        }[self.partitioning]
+        sql = f"""
+        CREATE TABLE IF NOT EXISTS clauses{suffix} (
             contract_id INTEGER REFERENCES contracts(contract_id) ON DELETE CASCADE,
             section_number VARCHAR(10),
             header TEXT,
             content TEXT,
             clause_type VARCHAR(50),
+            content_start INTEGER,
+            content_end INTEGER,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             PRIMARY KEY (contract_id, clause_type)
-        );
-        CREATE TABLE IF NOT EXISTS data_points (
+        ){partition_by};
+        CREATE TABLE IF NOT EXISTS data_points{suffix} (
             contract_id INTEGER REFERENCES contracts(contract_id) ON DELETE CASCADE,
             clause_type VARCHAR(50),
             data_key VARCHAR(100) NOT NULL,
             data_value TEXT,
             data_type VARCHAR(20),
+            value_int BIGINT,
+            value_num NUMERIC,
+            value_bool BOOLEAN,
+            value_date DATE,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             PRIMARY KEY (contract_id, clause_type, data_key),
-            FOREIGN KEY (contract_id, clause_type) REFERENCES clauses(contract_id, clause_type) ON DELETE CASCADE
-        );
-        CREATE INDEX IF NOT EXISTS idx_contract_id ON clauses(contract_id);
-        CREATE INDEX IF NOT EXISTS idx_clause_type ON clauses(clause_type);
-        CREATE INDEX IF NOT EXISTS idx_data_points_contract ON data_points(contract_id);
-        CREATE INDEX IF NOT EXISTS idx_data_points_clause_type ON data_points(clause_type);
-        CREATE INDEX IF NOT EXISTS idx_data_points_key ON data_points(data_key);
+            FOREIGN KEY (contract_id, clause_type) REFERENCES clauses{suffix}(contract_id, clause_type) ON DELETE CASCADE
+        ){partition_by};
         """
-        self.cur.execute(schema_sql)
-        self.conn.commit()
+        for table in ('clauses', 'data_points'):
+            if self.partitioning == 'hash':
+                sql += ''.join(
+                    f"CREATE TABLE IF NOT EXISTS {table}_p{remainder} PARTITION OF {table}{suffix} "
+                    f"FOR VALUES WITH (MODULUS {self.hash_partitions}, REMAINDER {remainder});\n"
+                    for remainder in range(self.hash_partitions))
+            elif self.partitioning == 'clause_type':
+                sql += ''.join(
+                    f"CREATE TABLE IF NOT EXISTS {table}_{clause_type} PARTITION OF {table}{suffix} "
+                    f"FOR VALUES IN ('{clause_type}');\n"
+                    for clause_type in CLAUSE_TYPES)
+                # Clause types from custom rules land here
+                sql += f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table}{suffix} DEFAULT;\n"
+        return sql
 
-    def insert_contract(self, contract_name: str, raw_text: str) -> int:
-        sql = """
-        INSERT INTO contracts (contract_name, raw_text) VALUES (%s, %s)
-        RETURNING contract_id
+    def _relkind(self, table: str) -> Optional[str]:
+        """'r' for a plain table, 'p' for a partitioned one, None when it does not exist"""
+        self.cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+        row = self.cur.fetchone()
+        return row[0] if row else None
+
+    @_invalidates_cache
+    def migrate_partitioning(self) -> bool:
         """
-        self.cur.execute(sql, (contract_name, raw_text))
-        contract_id = self.cur.fetchone()[0]
-        self.conn.commit()
-        return contract_id
+        Move existing plain clauses and data_points tables into partitioned
+        ones: create the partitioned tables alongside, copy every row, drop
+        the old tables and take over their names, then build the indexes with
+        initialize_schema(). Runs in one transaction that locks both tables
+        for its whole duration, so schedule it in a maintenance window.
+        Returns: False when there was nothing to migrate
+        """
+        if self.partitioning == 'none':
+            raise ValueError("migrate_partitioning needs partitioning='hash' or 'clause_type'")
+        if self._relkind('clauses') != 'r':
+            return False
+        clause_columns = ', '.join(self.CLAUSE_COLUMNS)
+        data_point_columns = ', '.join(self.DATA_POINT_COLUMNS)
+        sql = "LOCK TABLE clauses, data_points IN ACCESS EXCLUSIVE MODE;\n"
+        sql += self.UPGRADE_COLUMNS_SQL
+        sql += self._clause_tables_sql(suffix='_partitioned')
+        sql += f"""
+        INSERT INTO clauses_partitioned ({clause_columns}) SELECT {clause_columns} FROM clauses;
+        INSERT INTO data_points_partitioned ({data_point_columns}) SELECT {data_point_columns} FROM data_points;
+        DROP TABLE data_points;
+        DROP TABLE clauses;
+        ALTER TABLE clauses_partitioned RENAME TO clauses;
+        ALTER TABLE data_points_partitioned RENAME TO data_points;
+        ALTER TABLE clauses RENAME CONSTRAINT clauses_partitioned_pkey TO clauses_pkey;
+        ALTER TABLE data_points RENAME CONSTRAINT data_points_partitioned_pkey TO data_points_pkey;
+        """
+        self.cur.execute(sql)
+        self.initialize_schema()
+        return True
+
+    # Indexes that only serve reads; initialize_schema creates them, bulk loads may drop them first
+    SECONDARY_INDEXES = (
+        'idx_contract_id', 'idx_clause_type', 'idx_data_points_contract', 'idx_data_points_clause_type',
+        'idx_data_points_key', 'idx_data_points_key_int', 'idx_data_points_key_num', 'idx_data_points_key_date',
+        'idx_data_points_key_bool', 'idx_contract_facts_contract_type', 'idx_contract_facts_annual_salary',
+    )
+
+    def drop_secondary_indexes(self):
+        """
+        Drop SECONDARY_INDEXES, so a bulk load does not maintain them row by
+        row. Primary keys and the content_hash index stay, since the load's
+        upserts rely on them; initialize_schema() builds the rest again.
+        """
+        self.cur.execute(''.join(f"DROP INDEX IF EXISTS {name};\n" for name in self.SECONDARY_INDEXES))
+        self._commit()
 
+    @_invalidates_cache
+    def backfill_typed_values(self) -> int:
+        """
+        Fill the typed value columns of data points stored before they existed
+        or before their key had a declared type (see value_column), and drop
+        rows that stored a missing value as the text 'None'. Amounts and dates
+        are parsed in Python, since they are written Dutch or English style.
+        Returns: number of rows updated or removed
+        """
+        typed_keys = [key for key, column_type in CONTRACT_FACT_COLUMNS.items() if column_type != 'TEXT']
+        self.cur.execute("DELETE FROM data_points WHERE data_value = 'None' AND data_key = ANY(%s)",
+                         (typed_keys,))
+        updated = self.cur.rowcount
+        sql_typed = """
+        UPDATE data_points SET
+            value_int = CASE WHEN data_type = 'integer' THEN data_value::BIGINT END,
+            value_num = CASE WHEN data_type = 'float' THEN data_value::NUMERIC END,
+            value_bool = CASE WHEN data_type = 'boolean' THEN data_value::BOOLEAN END
+        WHERE data_type IN ('integer', 'float', 'boolean')
+            AND value_int IS NULL AND value_num IS NULL AND value_bool IS NULL
+        """
+        self.cur.execute(sql_typed)
+        updated += self.cur.rowcount
+        parsed_keys = [key for key, column_type in CONTRACT_FACT_COLUMNS.items() if column_type in ('NUMERIC', 'DATE')]
+        self.cur.execute("""
+        SELECT contract_id, clause_type, data_key, data_value FROM data_points
+        WHERE data_type = 'string' AND value_num IS NULL AND value_date IS NULL
+            AND (data_key = ANY(%s) OR data_value ~ '^\\s*\\d{1,2}[-/ ]')
+        """, (parsed_keys,))
+        values = []
+        for contract_id, clause_type, key, value in self.cur.fetchall():
+            _, value_num, _, value_date = typed_value(CONTRACT_FACT_COLUMNS.get(key, 'DATE'), value)
+            if value_num is not None or value_date is not None:
+                values.append((value_num, value_date, contract_id, clause_type, key))
+        if values:
+            execute_values(self.cur, """
+            UPDATE data_points dp SET value_num = v.value_num, value_date = v.value_date,
+                data_type = CASE WHEN v.value_date IS NULL THEN dp.data_type ELSE 'date' END
+            FROM (VALUES %s) AS v(value_num, value_date, contract_id, clause_type, data_key)
+            WHERE dp.contract_id = v.contract_id AND dp.clause_type = v.clause_type AND dp.data_key = v.data_key
+            """, values, template='(%s::NUMERIC, %s::DATE, %s, %s, %s)', page_size=self.batch_size)
+            updated += len(values)
+        self._commit()
+        return updated
+
+    def find_contract_by_hash(self, digest: str) -> Optional[Dict]:
+        sql = "SELECT contract_id, contract_name, processed FROM contracts WHERE content_hash = %s"
+        self.cur.execute(sql, (digest,))
+        row = self.cur.fetchone()
+        if not row:
+            return None
+        columns = [desc[0] for desc in self.cur.description]
+        return dict(zip(columns, row))
+
+    @staticmethod
+    def text_columns(raw_text: str, text_storage: str) -> tuple:
+        """(contracts.raw_text, contract_texts.raw_text, contract_texts.raw_text_z) for a contract"""
+        if text_storage == 'blob':
+            return None, raw_text, None
+        if text_storage == 'compressed':
+            return None, None, zlib.compress(raw_text.encode('utf-8'))
+        return raw_text, None, None
+
+    @_invalidates_cache
+    def insert_contract(self, contract_name: str, raw_text: str, digest: Optional[str] = None) -> int:
+        """Insert a contract, or return the existing contract_id when the same text is already stored"""
+        digest = digest or content_hash(raw_text)
+        inline_text, blob_text, blob_z = self.text_columns(raw_text, self.text_storage)
+        if self.text_storage == 'inline':
+            sql = """
+            INSERT INTO contracts (contract_name, raw_text, content_hash) VALUES (%s, %s, %s)
+            ON CONFLICT (content_hash) DO NOTHING
+            RETURNING contract_id
+            """
+            params = (contract_name, inline_text, digest)
+        else:
+            sql = """
+            WITH contract AS (
+                INSERT INTO contracts (contract_name, content_hash) VALUES (%s, %s)
+                ON CONFLICT (content_hash) DO NOTHING
+                RETURNING contract_id
+            ), stored_text AS (
+                INSERT INTO contract_texts (contract_id, raw_text, raw_text_z)
+                SELECT contract_id, %s, %s FROM contract
+            )
+            SELECT contract_id FROM contract
+            """
+            params = (contract_name, digest, blob_text, blob_z)
+        self.cur.execute(sql, params)
+        row = self.cur.fetchone()
+        self._commit()
+        if row is None:
+            return self.find_contract_by_hash(digest)['contract_id']
+        return row[0]
+
+    @_invalidates_cache
     def insert_clauses(self, contract_id: int, clauses: List[Clause]):
-        for clause in clauses:
+        """
+        Upsert all clauses of a contract and their data points, one multi-row
+        statement per table (per batch_size rows). A later clause of the same
+        type replaces an earlier one, as the row-by-row upsert did.
+        """
+        clause_rows, data_point_rows = self.contract_rows(contract_id, clauses)
+        if clause_rows:
             sql_clause = """
-            INSERT INTO clauses (contract_id, section_number, header, content, clause_type)
-            VALUES (%s, %s, %s, %s, %s)
+            INSERT INTO clauses (contract_id, section_number, header, content, clause_type,
+                                 content_start, content_end)
+            VALUES %s
             ON CONFLICT (contract_id, clause_type) DO UPDATE SET
                 section_number = EXCLUDED.section_number,
                 header = EXCLUDED.header,
                 content = EXCLUDED.content,
+                content_start = EXCLUDED.content_start,
+                content_end = EXCLUDED.content_end,
                 created_at = EXCLUDED.created_at
             """
-            self.cur.execute(sql_clause, (
-                contract_id, clause.section_number, clause.header, clause.content, clause.clause_type))
+            execute_values(self.cur, sql_clause, clause_rows, page_size=self.batch_size)
+        self._upsert_data_point_rows(data_point_rows)
+        self._upsert_contract_facts([contract_fact_row(contract_id, data_point_rows)])
+        self._commit()
+
+    @classmethod
+    def contract_rows(cls, contract_id: int, clauses: List[Clause]) -> tuple:
+        """
+        Clause and data point rows for one contract, deduplicated on their keys.
+        A later clause of the same type replaces an earlier one. Clauses that
+        are spans of the contract text are stored as offsets, with no content.
+        """
+        clause_rows = {}
+        data_point_rows = {}
+        for clause in clauses:
+            span = clause.content_span
+            clause_rows[clause.clause_type] = (
+                contract_id, clause.section_number, clause.header, clause.content if span is None else None,
+                clause.clause_type, *(span or (None, None)))
             if clause.extracted_data:
-                self.insert_data_points(contract_id, clause.clause_type, clause.extracted_data)
-        self.conn.commit()
+                for row in cls._data_point_rows(contract_id, clause.clause_type, clause.extracted_data):
+                    data_point_rows[row[1:3]] = row
+        return list(clause_rows.values()), list(data_point_rows.values())
 
+    @_invalidates_cache
     def insert_data_points(self, contract_id: int, clause_type: str, data_dict: Dict[str, Any]):
+        self._upsert_data_point_rows(self._data_point_rows(contract_id, clause_type, data_dict))
+
+    @staticmethod
+    def _data_point_rows(contract_id: int, clause_type: str, data_dict: Dict[str, Any]) -> List[tuple]:
+        """
+        Rows of (contract_id, clause_type, data_key, data_value, data_type,
+        value_int, value_num, value_bool, value_date). data_value keeps the
+        text form. The typed column is the one of the key's declared type in
+        CONTRACT_FACT_COLUMNS, so every row of a key uses the same column and
+        comparisons can use its partial index instead of casting; it stays
+        NULL when the value does not parse, e.g. an unreadable date. Keys
+        without a declared type are typed by their value. A None value (a
+        field the clause leaves open) gets no row.
+        """
+        rows = []
         for key, value in data_dict.items():
+            if value is None:
+                continue
             if isinstance(value, bool):
-                data_type = 'boolean'
-                value_str = str(value).lower()
+                data_type, value_str = 'boolean', str(value).lower()
             elif isinstance(value, int):
-                data_type = 'integer'
-                value_str = str(value)
+                data_type, value_str = 'integer', str(value)
             elif isinstance(value, float):
-                data_type = 'float'
-                value_str = str(value)
+                data_type, value_str = 'float', str(value)
             else:
-                data_type = 'string'
-                value_str = str(value)
-            sql = """
-            INSERT INTO data_points (contract_id, clause_type, data_key, data_value, data_type)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (contract_id, clause_type, data_key) DO UPDATE SET
-                data_value = EXCLUDED.data_value,
-                data_type = EXCLUDED.data_type,
-                created_at = EXCLUDED.created_at
-            """
-            self.cur.execute(sql, (contract_id, clause_type, key, value_str, data_type))
+                data_type, value_str = 'string', str(value)
+            column_type = CONTRACT_FACT_COLUMNS.get(key) or _PYTHON_COLUMN_TYPES.get(type(value), 'DATE')
+            typed = typed_value(column_type, value)
+            if typed[3] is not None:
+                data_type = 'date'
+            rows.append((contract_id, clause_type, key, value_str, data_type, *typed))
+        return rows
+
+    def _upsert_data_point_rows(self, rows: List[tuple]):
+        if not rows:
+            return
+        sql = """
+        INSERT INTO data_points (contract_id, clause_type, data_key, data_value, data_type,
+                                 value_int, value_num, value_bool, value_date)
+        VALUES %s
+        ON CONFLICT (contract_id, clause_type, data_key) DO UPDATE SET
+            data_value = EXCLUDED.data_value,
+            data_type = EXCLUDED.data_type,
+            value_int = EXCLUDED.value_int,
+            value_num = EXCLUDED.value_num,
+            value_bool = EXCLUDED.value_bool,
+            value_date = EXCLUDED.value_date,
+            created_at = EXCLUDED.created_at
+        """
+        execute_values(self.cur, sql, rows, page_size=self.batch_size)
+
+    CONTRACT_FACTS_UPSERT = f"""
+    INSERT INTO contract_facts (contract_id, {', '.join(CONTRACT_FACT_COLUMNS)})
+    VALUES %s
+    ON CONFLICT (contract_id) DO UPDATE SET
+        {', '.join(f'{key} = EXCLUDED.{key}' for key in CONTRACT_FACT_COLUMNS)},
+        updated_at = CURRENT_TIMESTAMP
+    """
+
+    def _upsert_contract_facts(self, rows: List[tuple]):
+        """Replace the contract_facts rows of the given contracts, as part of the current transaction"""
+        if rows:
+            execute_values(self.cur, self.CONTRACT_FACTS_UPSERT, rows, page_size=self.batch_size)
+
+    @_invalidates_cache
+    def rebuild_contract_facts(self, refresh: bool = False) -> int:
+        """
+        Fill contract_facts from data_points for contracts stored before the
+        table existed, batch_size contracts at a time. Ingest keeps the table
+        current afterwards. With refresh, every processed contract's row is
+        rewritten, which fills columns added to CONTRACT_FACT_COLUMNS since
+        the row was stored.
+        Returns: number of contracts written
+        """
+        missing_filter = "" if refresh else (
+            "AND NOT EXISTS (SELECT 1 FROM contract_facts cf WHERE cf.contract_id = ct.contract_id)")
+        self.cur.execute(f"""
+        SELECT ct.contract_id FROM contracts ct
+        WHERE ct.processed {missing_filter}
+        ORDER BY ct.contract_id
+        """)
+        contract_ids = [row[0] for row in self.cur.fetchall()]
+        for start in range(0, len(contract_ids), self.batch_size):
+            batch = contract_ids[start:start + self.batch_size]
+            self.cur.execute("""
+            SELECT contract_id, clause_type, data_key, data_value, data_type,
+                value_int, value_num, value_bool, value_date
+            FROM data_points WHERE contract_id = ANY(%s) AND data_key = ANY(%s)
+            """, (batch, list(CONTRACT_FACT_COLUMNS)))
+            rows_by_contract = {contract_id: [] for contract_id in batch}
+            for row in self.cur.fetchall():
+                rows_by_contract[row[0]].append(row)
+            self._upsert_contract_facts([contract_fact_row(contract_id, rows)
+                                         for contract_id, rows in rows_by_contract.items()])
+            self._commit()
+        return len(contract_ids)
+
+    # annual_salary as a SQL expression over the contract_facts columns; ROUND rounds half away from zero too
+    ANNUAL_SALARY_SQL = (
+        "ROUND(salary_amount * CASE salary_period "
+        + ' '.join(f"WHEN '{period}' THEN {count}" for period, count in SALARY_PERIODS_PER_YEAR.items())
+        + " END * CASE WHEN salary_period = 'hourly' THEN NULLIF(hours_per_week, 0) ELSE 1 END, 2)"
+    )
+
+    @_invalidates_cache
+    def normalize_contract_facts(self) -> int:
+        """
+        Derive annual_salary_eur for every stored contract_facts row in one
+        set-based UPDATE, for rows written before the column existed. Ingest
+        fills it per contract (see contract_fact_row).
+        Returns: number of rows changed
+        """
+        self.cur.execute(f"""
+        UPDATE contract_facts SET annual_salary_eur = {self.ANNUAL_SALARY_SQL}, updated_at = CURRENT_TIMESTAMP
+        WHERE annual_salary_eur IS DISTINCT FROM {self.ANNUAL_SALARY_SQL}
+        """)
+        changed = self.cur.rowcount
+        self._commit()
+        return changed
 
+    @_read_through
+    def get_contract_facts(self, contract_ids: Optional[List[int]] = None) -> List[Dict]:
+        """One dict per contract from contract_facts, optionally limited to contract_ids"""
+        sql = "SELECT ct.contract_name, cf.* FROM contract_facts cf JOIN contracts ct USING (contract_id)"
+        if contract_ids is not None:
+            self.cur.execute(sql + " WHERE cf.contract_id = ANY(%s) ORDER BY cf.contract_id", (list(contract_ids),))
+        else:
+            self.cur.execute(sql + " ORDER BY cf.contract_id")
+        columns = [desc[0] for desc in self.cur.description]
+        return [dict(zip(columns, row)) for row in self.cur.fetchall()]
+
+    @_invalidates_cache
     def mark_contract_processed(self, contract_id: int):
         sql = "UPDATE contracts SET processed = TRUE WHERE contract_id = %s"
         self.cur.execute(sql, (contract_id,))
-        self.conn.commit()
+        self._commit()
+
+    # Clause content, cut out of the uncompressed contract text when it is stored as offsets
+    CLAUSE_CONTENT_SQL = """
+        COALESCE(c.content, substr(COALESCE(ct.raw_text, tx.raw_text), c.content_start + 1,
+                                   c.content_end - c.content_start))
+    """
 
+    @_read_through
     def get_clauses_by_type(self, clause_type: str) -> List[Dict]:
-        sql = """
-        SELECT c.contract_id, ct.contract_name, c.section_number, c.header, c.content,
+        sql = f"""
+        SELECT c.contract_id, ct.contract_name, c.section_number, c.header,
+        {self.CLAUSE_CONTENT_SQL} AS content, c.content_start, c.content_end,
         COALESCE(
             json_object_agg(dp.data_key, dp.data_value)
-            FILTER (WHERE dp.data_key IS NOT NULL), '{}'::json
+            FILTER (WHERE dp.data_key IS NOT NULL), '{{}}'::json
         ) as extracted_data
         FROM clauses c
         JOIN contracts ct ON c.contract_id = ct.contract_id
+        LEFT JOIN contract_texts tx ON c.contract_id = tx.contract_id
         LEFT JOIN data_points dp
             ON c.contract_id = dp.contract_id AND c.clause_type = dp.clause_type
         WHERE c.clause_type = %s
-        GROUP BY c.contract_id, ct.contract_name, c.section_number, c.header, c.content
+        GROUP BY c.contract_id, c.clause_type, ct.contract_id, tx.contract_id
         ORDER BY c.contract_id, c.section_number
         """
         self.cur.execute(sql, (clause_type,))
         columns = [desc[0] for desc in self.cur.description]
-        return [dict(zip(columns, row)) for row in self.cur.fetchall()]
+        results = [dict(zip(columns, row)) for row in self.cur.fetchall()]
+        # Compressed texts are decompressed here, one query for all of them
+        missing = [result for result in results if result['content'] is None and result['content_start'] is not None]
+        texts = self.get_contract_texts([result['contract_id'] for result in missing]) if missing else {}
+        for result in results:
+            start, end = result.pop('content_start'), result.pop('content_end')
+            if result['content'] is None and start is not None:
+                result['content'] = texts[result['contract_id']][start:end]
+        return results
+
+    def get_contract_texts(self, contract_ids: List[int]) -> Dict[int, str]:
+        """Full text of each contract, wherever and however it is stored"""
+        self.cur.execute("""
+        SELECT ct.contract_id, ct.raw_text, tx.raw_text, tx.raw_text_z
+        FROM contracts ct
+        LEFT JOIN contract_texts tx ON ct.contract_id = tx.contract_id
+        WHERE ct.contract_id = ANY(%s)
+        """, (list(contract_ids),))
+        texts = {}
+        for contract_id, inline_text, blob_text, blob_z in self.cur.fetchall():
+            if blob_z is not None:
+                texts[contract_id] = zlib.decompress(blob_z).decode('utf-8')
+            else:
+                texts[contract_id] = inline_text if inline_text is not None else blob_text
+        return texts
+
+    def get_contract_text(self, contract_id: int) -> Optional[str]:
+        """Full text of one contract, loaded (and decompressed) only when asked for"""
+        return self.get_contract_texts([contract_id]).get(contract_id)
 
+    def get_clause_texts(self, contract_id: int) -> Dict[str, str]:
+        """Content of each clause of a contract by clause type, rebuilt from the contract text where needed"""
+        self.cur.execute(
+            "SELECT clause_type, content, content_start, content_end FROM clauses WHERE contract_id = %s",
+            (contract_id,))
+        rows = self.cur.fetchall()
+        text = None
+        if any(content is None and start is not None for _, content, start, _ in rows):
+            text = self.get_contract_text(contract_id)
+        return {clause_type: content if content is not None or start is None else text[start:end]
+                for clause_type, content, start, end in rows}
+
+    @_invalidates_cache
+    def compact_clause_content(self) -> int:
+        """
+        Convert clauses stored with their own content into offsets, for
+        contracts whose text is held uncompressed (inline or blob) and
+        contains the clause content verbatim.
+        Returns: number of clauses converted
+        """
+        self.cur.execute("""
+        UPDATE clauses c SET
+            content_start = t.position - 1,
+            content_end = t.position - 1 + length(c.content),
+            content = NULL
+        FROM (
+            SELECT c2.contract_id, c2.clause_type,
+                strpos(COALESCE(ct.raw_text, tx.raw_text), c2.content) AS position
+            FROM clauses c2
+            JOIN contracts ct ON c2.contract_id = ct.contract_id
+            LEFT JOIN contract_texts tx ON c2.contract_id = tx.contract_id
+            WHERE c2.content IS NOT NULL
+        ) t
+        WHERE c.contract_id = t.contract_id AND c.clause_type = t.clause_type AND t.position > 0
+        """)
+        converted = self.cur.rowcount
+        self._commit()
+        return converted
+
+    @_read_through
     def get_contract_summary(self, contract_id: int) -> Dict:
         sql_basic = """
         SELECT contract_name, upload_date,
@@ -498,99 +1918,228 @@ class DatabaseManager:
             'summary': summary if summary else None
         }
 
+    @_read_through
     def get_all_data_points_by_key(self, data_key: str) -> List[Dict]:
-        sql = """
-        SELECT ct.contract_name, c.clause_type, dp.data_value, dp.data_type
+        """Every value stored for data_key; 'value' is the typed value where there is one"""
+        clause_type_filter, filter_params = self._clause_type_filter(data_key)
+        sql = f"""
+        SELECT ct.contract_name, dp.clause_type, dp.data_value, dp.data_type,
+            dp.value_int, dp.value_num, dp.value_bool, dp.value_date
         FROM data_points dp
-        JOIN clauses c
-            ON dp.contract_id = c.contract_id AND dp.clause_type = c.clause_type
         JOIN contracts ct
-            ON c.contract_id = ct.contract_id
-        WHERE dp.data_key = %s
+            ON dp.contract_id = ct.contract_id
+        WHERE dp.data_key = %s {clause_type_filter}
         ORDER BY ct.contract_name
         """
-        self.cur.execute(sql, (data_key,))
-        columns = [desc[0] for desc in self.cur.description]
-        return [dict(zip(columns, row)) for row in self.cur.fetchall()]
+        self.cur.execute(sql, (data_key, *filter_params))
+        results = []
+        for name, clause_type, value_str, data_type, *typed in self.cur.fetchall():
+            value = next((v for v in typed if v is not None), value_str)
+            results.append({'contract_name': name, 'clause_type': clause_type, 'data_value': value_str,
+                            'data_type': data_type, 'value': value})
+        return results
 
-    def compare_data_points(self, data_key: str) -> List[Dict]:
-        sql = """
-        SELECT ct.contract_name, ct.contract_id, dp.data_value, dp.data_type
+    def _clause_type_filter(self, data_key: str) -> tuple:
+        """
+        (SQL, params) restricting a data_points lookup by key to the clause
+        types that can hold the key, so that under clause_type partitioning
+        only their partitions are scanned. Empty in the other layouts.
+        """
+        clause_types = self.data_key_clause_types.get(data_key) if self.partitioning == 'clause_type' else None
+        if not clause_types:
+            return "", ()
+        return "AND dp.clause_type = ANY(%s)", (list(clause_types),)
+
+    @_read_through
+    def compare_data_points(self, data_key: str, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Contracts ranked by their value for data_key, highest first (ties by
+        contract_id). Numbers and dates are read in order from the partial
+        index on the key's typed column (see value_column), so a top-N stays
+        an index scan however many data points there are; values that did not
+        parse as the key's type are left out. Text keys are listed by contract
+        name.
+        """
+        column = value_column(data_key)
+        if column is None:
+            value, typed_filter, order_by = "dp.data_value", "", "ct.contract_name"
+        else:
+            value = f"dp.{column}"
+            typed_filter = f"AND {value} IS NOT NULL"
+            order_by = f"{value} DESC, dp.contract_id"
+        clause_type_filter, filter_params = self._clause_type_filter(data_key)
+        sql = f"""
+        SELECT ct.contract_name, ct.contract_id, dp.data_value, dp.data_type, {value} AS value
         FROM data_points dp
-        JOIN clauses c
-            ON dp.contract_id = c.contract_id AND dp.clause_type = c.clause_type
         JOIN contracts ct
-            ON c.contract_id = ct.contract_id
-        WHERE dp.data_key = %s
-        ORDER BY CASE WHEN dp.data_type = 'integer' THEN dp.data_value::INTEGER ELSE 0 END DESC, ct.contract_name
+            ON dp.contract_id = ct.contract_id
+        WHERE dp.data_key = %s {typed_filter} {clause_type_filter}
+        ORDER BY {order_by}
+        LIMIT %s
         """
-        self.cur.execute(sql, (data_key,))
+        self.cur.execute(sql, (data_key, *filter_params, limit))
         columns = [desc[0] for desc in self.cur.description]
         return [dict(zip(columns, row)) for row in self.cur.fetchall()]
 
 class ContractPipeline:
     """Main pipeline orchestrator"""
     
-    def __init__(self, db_config: Dict[str, str]):
-        self.parser = ContractParser()
-        self.db = DatabaseManager(db_config)
+    def __init__(self, db_config: Dict[str, str], batch_size: int = 1000,
+                 pool: Optional[ConnectionPool] = None, group_commit_size: Optional[int] = None,
+                 group_commit_interval_ms: Optional[float] = None, metrics: Optional[PipelineMetrics] = None,
+                 max_repeat: Optional[int] = None, time_budget_ms: Optional[float] = None,
+                 query_cache_size: Optional[int] = None, text_storage: str = 'inline',
+                 query_cache_ttl: float = 30.0):
+        self.metrics = metrics
+        self.parser = ContractParser(metrics=metrics, max_repeat=max_repeat, time_budget_ms=time_budget_ms)
+        self.pool = pool or ConnectionPool(db_config)
+        self.db = DatabaseManager(db_config, batch_size=batch_size, pool=self.pool,
+                                  group_commit_size=group_commit_size,
+                                  group_commit_interval_ms=group_commit_interval_ms, metrics=metrics,
+                                  query_cache_size=query_cache_size, text_storage=text_storage,
+                                  query_cache_ttl=query_cache_ttl)
     
-    def process_contract(self, contract_text: str, contract_name: str) -> int:
+    def process_contract(self, contract_text: str, contract_name: str,
+                         clauses: Optional[List[Clause]] = None, out: Optional[TextIO] = None,
+                         on_committed: Optional[Callable[[], None]] = None) -> int:
         """
         Main pipeline: parse, classify, extract, and store contract data
+        Pass clauses already produced by ContractParser.analyze_contract to skip
+        the parsing step, and out to write the progress report somewhere other
+        than stdout. The contract is written in a single transaction;
+        on_committed runs once that transaction is committed, which in group
+        commit mode may be after later contracts were processed.
         Returns: contract_id
         """
-        self.db.connect()
+        if self.db.conn is None:
+            self.db.connect()
+        counted = isinstance(self.db.cur, CountingCursor)
+        if counted:
+            round_trips, rows = self.db.cur.round_trips, self.db.cur.rows
         
         try:
-            print(f"\n{'='*60}")
-            print(f"Processing: {contract_name}")
-            print(f"{'='*60}\n")
-            
-            contract_id = self.db.insert_contract(contract_name, contract_text)
-            print(f"✓ Contract stored with ID: {contract_id}")
-            
-            clauses = self.parser.parse_contract(contract_text)
-            print(f"✓ Extracted {len(clauses)} clauses")
+            with self.parser._stage('process_contract'):
+                return self._process_contract(contract_text, contract_name, clauses, out, on_committed)
+        finally:
+            if counted:
+                self.metrics.observe_contract(self.db.cur.round_trips - round_trips, self.db.cur.rows - rows)
+            if not self.db.group_commit:
+                self.db.disconnect()
+    
+    def _process_contract(self, contract_text: str, contract_name: str, clauses: Optional[List[Clause]],
+                          out: Optional[TextIO], on_committed: Optional[Callable[[], None]]) -> int:
+        stage = self.parser._stage
+        print(f"\n{'='*60}", file=out)
+        print(f"Processing: {contract_name}", file=out)
+        print(f"{'='*60}\n", file=out)
+        
+        digest = content_hash(contract_text)
+        existing = self.db.find_contract_by_hash(digest)
+        if existing and existing['processed']:
+            print(f"✓ Unchanged, already stored with ID: {existing['contract_id']}", file=out)
+            if on_committed:
+                self.db.after_commit(on_committed)
+            return existing['contract_id']
+        
+        if clauses is None:
+            clauses = self.parser.analyze_contract(contract_text)
+        
+        with self.db.contract_transaction(on_commit=on_committed):
+            with stage('insert_contract'):
+                contract_id = self.db.insert_contract(contract_name, contract_text, digest)
+            print(f"✓ Contract stored with ID: {contract_id}", file=out)
+            print(f"✓ Extracted {len(clauses)} clauses", file=out)
             
-            print(f"\nClassifying and extracting data...")
+            print(f"\nClassifying and extracting data...", file=out)
             for clause in clauses:
-                clause.clause_type = self.parser.classify_clause(clause)
-                clause.extracted_data = self.parser.extract_structured_data(clause)
-                
                 if clause.extracted_data:
-                    print(f"  [{clause.clause_type}] {clause.header}: {len(clause.extracted_data)} fields")
+                    print(f"  [{clause.clause_type}] {clause.header}: {len(clause.extracted_data)} fields",
+                          file=out)
+                if clause.skipped_rules:
+                    print(f"  ⚠ [{clause.clause_type}] {clause.header}: time budget exceeded, "
+                          f"skipped {', '.join(clause.skipped_rules)}", file=out)
             
-            self.db.insert_clauses(contract_id, clauses)
-            self.db.mark_contract_processed(contract_id)
-            print(f"\n✓ All clauses stored in database")
-            
-            self.print_summary(contract_id)
-            
-            return contract_id
-            
-        finally:
-            self.db.disconnect()
+            with stage('insert_clauses'):
+                self.db.insert_clauses(contract_id, clauses)
+            with stage('mark_contract_processed'):
+                self.db.mark_contract_processed(contract_id)
+        print(f"\n✓ All clauses stored in database", file=out)
+        
+        with stage('print_summary'):
+            self.print_summary(contract_id, out=out, summary=self.build_summary(contract_name, clauses))
+        
+        return contract_id
+    
+    def flush(self):
+        """Commit the open group of contracts, if any"""
+        if self.db.conn is not None and self.db.group_commit:
+            self.db.commit()
+    
+    def flush_if_due(self) -> bool:
+        """Commit the open group if its group_commit_interval_ms deadline has passed"""
+        return self.db.conn is not None and self.db.flush_if_due()
+    
+    def recover(self) -> bool:
+        """
+        Call after process_contract, flush or flush_if_due raised. When the
+        error left the connection unusable or lost the open group, the
+        connection is rolled back and dropped so the next contract starts on
+        a fresh one; otherwise the failed contract was rolled back to its
+        savepoint and the group carries on.
+        Returns: whether the contracts written since the last commit were lost
+        and must be processed again
+        """
+        if not self.db.transaction_lost():
+            return False
+        self.db.abandon()
+        return True
+    
+    def close(self):
+        """Commit outstanding work and return the connection"""
+        if self.db.conn is not None:
+            try:
+                self.flush()
+            finally:
+                self.db.disconnect()
     
-    def print_summary(self, contract_id: int):
-        """Print a formatted summary of the contract"""
-        summary = self.db.get_contract_summary(contract_id)
+    @staticmethod
+    def build_summary(contract_name: str, clauses: List[Clause]) -> Dict:
+        """
+        The get_contract_summary result for a contract that was just stored,
+        built from its clauses instead of aggregating the rows back out of the
+        database. Values are the text stored in data_points.data_value.
+        """
+        clause_rows, data_point_rows = DatabaseManager.contract_rows(None, clauses)
+        summary = {}
+        for _, clause_type, key, value_str, *_ in data_point_rows:
+            summary.setdefault(clause_type, {'count': 1, 'data': [{}]})['data'][0][key] = value_str
+        return {
+            'contract_name': contract_name,
+            'upload_date': datetime.datetime.now(),
+            'total_clauses': len(clause_rows),
+            'summary': summary if summary else None
+        }
+
+    def print_summary(self, contract_id: int, out: Optional[TextIO] = None, summary: Optional[Dict] = None):
+        """Print a formatted summary of the contract, from summary when given, else from the database"""
+        if summary is None:
+            summary = self.db.get_contract_summary(contract_id)
         
-        print(f"\n{'='*60}")
-        print(f"CONTRACT SUMMARY")
-        print(f"{'='*60}")
-        print(f"Name: {summary.get('contract_name', 'N/A')}")
-        print(f"Processed: {summary.get('upload_date', 'N/A')}")
-        print(f"Total Clauses: {summary.get('total_clauses', 0)}")
+        print(f"\n{'='*60}", file=out)
+        print(f"CONTRACT SUMMARY", file=out)
+        print(f"{'='*60}", file=out)
+        print(f"Name: {summary.get('contract_name', 'N/A')}", file=out)
+        print(f"Processed: {summary.get('upload_date', 'N/A')}", file=out)
+        print(f"Total Clauses: {summary.get('total_clauses', 0)}", file=out)
         
         if summary.get('summary'):
-            print(f"\nExtracted Data by Type:")
-            print(f"{'-'*60}")
+            print(f"\nExtracted Data by Type:", file=out)
+            print(f"{'-'*60}", file=out)
             for clause_type, data in summary['summary'].items():
-                print(f"\n{clause_type.upper().replace('_', ' ')}:")
+                print(f"\n{clause_type.upper().replace('_', ' ')}:", file=out)
                 for item in data['data']:
                     if item:
                         for key, value in item.items():
-                            print(f"  • {key}: {value}")
+                            print(f"  • {key}: {value}", file=out)
         
-        print(f"\n{'='*60}\n")
\ No newline at end of file
+        print(f"\n{'='*60}\n", file=out)
@@ -0,0 +1,333 @@
+"""
+Columnar snapshot of contract_facts for portfolio statistics
+
+Loads the selected contract_facts columns once, with a single ordered scan,
+into NumPy arrays aligned by contract_id: one values array and one null mask
+per key. TEXT keys are stored as category codes, which makes group-by on
+contract_type or employment_type a bincount. Means, percentiles, histograms
+and per-group statistics are then vectorized over the whole portfolio
+instead of looping over dicts per data point. A snapshot can be cached in a
+local .npz file and reloaded without touching the database.
+
+Usage:
+    python fact_snapshot.py [--config config/config.json] [--keys salary_amount,hours_per_week]
+        [--group-by contract_type] [--cache data/facts.npz] [--max-age 3600]
+"""
+
+import argparse
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from contract_pipeline import CONTRACT_FACT_COLUMNS, DatabaseManager
+from src.utils.config import load_db_config
+from src.utils.database_connection import ConnectionPool
+
+# contract_facts column type -> dtype of the values array; TEXT holds category codes
+_DTYPES = {
+    'INTEGER': np.int64,
+    'NUMERIC': np.float64,
+    'BOOLEAN': np.bool_,
+    'DATE': 'datetime64[D]',
+    'TEXT': np.int32,
+}
+_NUMERIC_TYPES = ('INTEGER', 'NUMERIC', 'BOOLEAN')
+
+
+class FactColumn:
+    """
+    One key of the snapshot: values, a null mask (True where the contract has
+    no value) and, for TEXT keys, the categories the codes index into.
+    Null entries hold 0 (NaT for dates, -1 for category codes).
+    """
+
+    __slots__ = ('column_type', 'values', 'mask', 'categories')
+
+    def __init__(self, column_type: str, values: np.ndarray, mask: np.ndarray,
+                 categories: Optional[np.ndarray] = None):
+        self.column_type = column_type
+        self.values = values
+        self.mask = mask
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def masked(self) -> np.ma.MaskedArray:
+        return np.ma.MaskedArray(self.values, self.mask)
+
+
+class _ColumnBuilder:
+    """Converts batches of Python values (None for NULL) into one FactColumn"""
+
+    def __init__(self, column_type: str):
+        self.column_type = column_type
+        self.parts: List[np.ndarray] = []
+        self.masks: List[np.ndarray] = []
+        self.codes: Dict[str, int] = {}
+
+    def add(self, values: Sequence):
+        mask = np.fromiter((value is None for value in values), np.bool_, len(values))
+        if self.column_type == 'TEXT':
+            codes = self.codes
+            converted = np.fromiter(
+                (-1 if value is None else codes.setdefault(value, len(codes)) for value in values),
+                np.int32, len(values))
+        elif self.column_type == 'DATE':
+            converted = np.array(values, dtype='datetime64[D]')  # None becomes NaT
+        else:
+            fill = False if self.column_type == 'BOOLEAN' else 0
+            converted = np.array([fill if value is None else value for value in values],
+                                 dtype=_DTYPES[self.column_type])
+        self.parts.append(converted)
+        self.masks.append(mask)
+
+    def build(self) -> FactColumn:
+        dtype = _DTYPES[self.column_type]
+        values = np.concatenate(self.parts) if self.parts else np.empty(0, dtype)
+        mask = np.concatenate(self.masks) if self.masks else np.empty(0, np.bool_)
+        categories = np.array(list(self.codes), dtype=str) if self.column_type == 'TEXT' else None
+        return FactColumn(self.column_type, values, mask, categories)
+
+
+class FactSnapshot:
+    """
+    contract_facts keys as NumPy columns aligned with contract_ids (ascending).
+    Every statistic takes an optional where, a boolean array over the
+    contracts (see matches), and ignores nulls.
+    """
+
+    def __init__(self, contract_ids: np.ndarray, columns: Dict[str, FactColumn], loaded_at: Optional[float] = None):
+        self.contract_ids = contract_ids
+        self.columns = columns
+        self.loaded_at = time.time() if loaded_at is None else loaded_at
+
+    def __len__(self) -> int:
+        return len(self.contract_ids)
+
+    @staticmethod
+    def _check_keys(keys: Optional[Iterable[str]]) -> List[str]:
+        keys = list(CONTRACT_FACT_COLUMNS) if keys is None else list(dict.fromkeys(keys))
+        unknown = [key for key in keys if key not in CONTRACT_FACT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Not contract_facts columns: {', '.join(unknown)}")
+        return keys
+
+    @classmethod
+    def from_rows(cls, keys: Optional[Iterable[str]], batches: Iterable[Sequence[tuple]]) -> 'FactSnapshot':
+        """Build from batches of (contract_id, *values of keys) rows in contract_id order"""
+        keys = cls._check_keys(keys)
+        builders = {key: _ColumnBuilder(CONTRACT_FACT_COLUMNS[key]) for key in keys}
+        id_parts = []
+        for rows in batches:
+            if not rows:
+                continue
+            columns = list(zip(*rows))
+            id_parts.append(np.array(columns[0], dtype=np.int64))
+            for builder, values in zip(builders.values(), columns[1:]):
+                builder.add(values)
+        contract_ids = np.concatenate(id_parts) if id_parts else np.empty(0, np.int64)
+        return cls(contract_ids, {key: builder.build() for key, builder in builders.items()})
+
+    @classmethod
+    def from_database(cls, db: DatabaseManager, keys: Optional[Iterable[str]] = None,
+                      fetch_size: int = 100000) -> 'FactSnapshot':
+        """
+        Load keys (all contract_facts columns by default) in one scan through
+        a server-side cursor, fetch_size rows at a time, so the rows never
+        exist as one Python list
+        """
+        keys = cls._check_keys(keys)
+        if db.conn is None:
+            db.connect()
+        with db.conn.cursor(name='fact_snapshot') as cur:
+            cur.itersize = fetch_size
+            cur.execute(f"SELECT {', '.join(['contract_id', *keys])} FROM contract_facts ORDER BY contract_id")
+            snapshot = cls.from_rows(keys, iter(lambda: cur.fetchmany(fetch_size), []))
+        db.commit()
+        return snapshot
+
+    # --- caching -------------------------------------------------------
+
+    def save(self, path: str):
+        """Write the snapshot to a .npz file, atomically"""
+        arrays = {'contract_ids': self.contract_ids, 'loaded_at': np.array(self.loaded_at),
+                  'keys': np.array(list(self.columns), dtype=str),
+                  'column_types': np.array([column.column_type for column in self.columns.values()], dtype=str)}
+        for index, column in enumerate(self.columns.values()):
+            arrays[f'values_{index}'] = column.values
+            arrays[f'mask_{index}'] = column.mask
+            if column.categories is not None:
+                arrays[f'categories_{index}'] = column.categories
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'FactSnapshot':
+        with np.load(path, allow_pickle=False) as data:
+            columns = {}
+            for index, (key, column_type) in enumerate(zip(data['keys'].tolist(), data['column_types'].tolist())):
+                categories = data[f'categories_{index}'] if f'categories_{index}' in data else None
+                columns[key] = FactColumn(column_type, data[f'values_{index}'], data[f'mask_{index}'], categories)
+            return cls(data['contract_ids'], columns, float(data['loaded_at']))
+
+    @classmethod
+    def cached(cls, db: DatabaseManager, path: str, keys: Optional[Iterable[str]] = None,
+               max_age: Optional[float] = None) -> 'FactSnapshot':
+        """
+        The snapshot cached at path when it holds keys and is at most
+        max_age seconds old (any age when None); otherwise loaded from the
+        database and written to path
+        """
+        keys = cls._check_keys(keys)
+        if os.path.exists(path):
+            snapshot = cls.load(path)
+            fresh = max_age is None or time.time() - snapshot.loaded_at <= max_age
+            if fresh and set(keys) <= set(snapshot.columns):
+                return snapshot
+        snapshot = cls.from_database(db, keys)
+        snapshot.save(path)
+        return snapshot
+
+    # --- statistics ----------------------------------------------------
+
+    def column(self, key: str) -> FactColumn:
+        try:
+            return self.columns[key]
+        except KeyError:
+            raise KeyError(f"{key} is not in this snapshot") from None
+
+    def _numeric(self, key: str, where: Optional[np.ndarray]) -> np.ndarray:
+        """Non-null values of a numeric or boolean key as float64, within where"""
+        column = self.column(key)
+        if column.column_type not in _NUMERIC_TYPES:
+            raise TypeError(f"{key} is {column.column_type}, not numeric")
+        valid = ~column.mask if where is None else ~column.mask & where
+        return column.values[valid].astype(np.float64, copy=False)
+
+    def matches(self, key: str, *values) -> np.ndarray:
+        """Boolean array: contracts whose value for key is one of values"""
+        column = self.column(key)
+        if column.column_type == 'TEXT':
+            codes = [index for index, category in enumerate(column.categories.tolist()) if category in values]
+            return np.isin(column.values, codes)
+        return ~column.mask & np.isin(column.values, values)
+
+    def count(self, key: str, where: Optional[np.ndarray] = None) -> int:
+        """Contracts with a value for key"""
+        valid = ~self.column(key).mask
+        return int(np.count_nonzero(valid if where is None else valid & where))
+
+    def mean(self, key: str, where: Optional[np.ndarray] = None) -> Optional[float]:
+        """Mean of key; for booleans the share that is true. None without values."""
+        values = self._numeric(key, where)
+        return float(values.mean()) if len(values) else None
+
+    def percentiles(self, key: str, q: Sequence[float] = (25, 50, 75),
+                    where: Optional[np.ndarray] = None) -> Dict[float, Optional[float]]:
+        """{q: percentile} of key, linearly interpolated"""
+        values = self._numeric(key, where)
+        if not len(values):
+            return {p: None for p in q}
+        return dict(zip(q, np.percentile(values, q).tolist()))
+
+    def histogram(self, key: str, bins=10, range=None, where: Optional[np.ndarray] = None):
+        """(counts, bin edges) of key, as numpy.histogram"""
+        return np.histogram(self._numeric(key, where), bins=bins, range=range)
+
+    def value_counts(self, key: str, where: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """Contracts per category of a TEXT key, most frequent first"""
+        column = self.column(key)
+        if column.categories is None:
+            raise TypeError(f"{key} is {column.column_type}, not TEXT")
+        codes = column.values[~column.mask if where is None else ~column.mask & where]
+        counts = np.bincount(codes, minlength=len(column.categories))
+        order = np.argsort(-counts, kind='stable')
+        categories = column.categories.tolist()
+        return {categories[i]: int(counts[i]) for i in order if counts[i]}
+
+    def group_by(self, by: str, key: str, q: Sequence[float] = (50,),
+                 where: Optional[np.ndarray] = None) -> Dict[str, Dict[str, float]]:
+        """
+        {category of by: {'count', 'mean', 'p<q>'...}} for key, one entry per
+        category of the TEXT key by (e.g. contract_type, employment_type)
+        that has values. Contracts without a by value are left out.
+        """
+        group = self.column(by)
+        if group.categories is None:
+            raise TypeError(f"{by} is {group.column_type}, not TEXT")
+        column = self.column(key)
+        if column.column_type not in _NUMERIC_TYPES:
+            raise TypeError(f"{key} is {column.column_type}, not numeric")
+        valid = ~column.mask & ~group.mask
+        if where is not None:
+            valid &= where
+        codes = group.values[valid]
+        values = column.values[valid].astype(np.float64, copy=False)
+        groups = len(group.categories)
+        counts = np.bincount(codes, minlength=groups)
+        sums = np.bincount(codes, weights=values, minlength=groups)
+        # Sorted by group, then value: each group's values are one contiguous sorted
+        # slice, so every group's percentiles are interpolated at once
+        order = np.argsort(values)
+        order = order[np.argsort(codes[order], kind='stable')]
+        sorted_values = values[order]
+        starts = np.cumsum(counts) - counts
+        present = np.flatnonzero(counts)
+        stats = {'count': counts[present].tolist(), 'mean': (sums[present] / counts[present]).tolist()}
+        for p in q:
+            position = starts[present] + p / 100 * (counts[present] - 1)
+            low = np.floor(position).astype(np.int64)
+            high = np.ceil(position).astype(np.int64)
+            lower, upper = sorted_values[low], sorted_values[high]
+            stats[f'p{p:g}'] = (lower + (upper - lower) * (position - low)).tolist()
+        categories = group.categories.tolist()
+        result = {}
+        for row, index in enumerate(present.tolist()):
+            result[categories[index]] = {name: column_values[row] for name, column_values in stats.items()}
+        return result
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Portfolio statistics from a columnar contract_facts snapshot")
+    arg_parser.add_argument("--config", default="config/config.json", help="JSON file with DB connection settings")
+    arg_parser.add_argument("--keys", default="salary_amount,hours_per_week,vacation_days",
+                            help="comma-separated numeric contract_facts keys to report on")
+    arg_parser.add_argument("--group-by", default="contract_type", help="TEXT key to group by")
+    arg_parser.add_argument("--cache", default=None, metavar="PATH", help=".npz file to cache the snapshot in")
+    arg_parser.add_argument("--max-age", type=float, default=None, metavar="SECONDS",
+                            help="reload from the database when the cached snapshot is older")
+    args = arg_parser.parse_args(argv)
+
+    keys = [key for key in args.keys.split(",") if key]
+    db_config, pool_config = load_db_config(args.config)
+    pool = ConnectionPool(db_config, **pool_config)
+    db = DatabaseManager(db_config, pool=pool)
+    start = time.perf_counter()
+    try:
+        if args.cache:
+            snapshot = FactSnapshot.cached(db, args.cache, keys + [args.group_by], args.max_age)
+        else:
+            snapshot = FactSnapshot.from_database(db, keys + [args.group_by])
+    finally:
+        db.disconnect()
+        pool.closeall()
+    print(f"{len(snapshot):,} contracts loaded in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    for key in keys:
+        quartiles = snapshot.percentiles(key)
+        print(f"\n{key}: {snapshot.count(key):,} values, mean {snapshot.mean(key)}, "
+              f"quartiles {[quartiles[p] for p in (25, 50, 75)]}")
+        for category, stats in snapshot.group_by(args.group_by, key, q=(25, 50, 75)).items():
+            print(f"  {category}: {stats}")
+    print(f"\nStatistics computed in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
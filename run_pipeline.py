@@ -1,20 +1,414 @@
-import json
+import argparse
+import asyncio
+import io
 import os
-from contract_pipeline import ContractPipeline
-
-# Load DB config
-with open("config/config.json", "r", encoding="utf-8") as f:
-    db_config = json.load(f)
-
-pipeline = ContractPipeline(db_config)
-
-# Process all .txt files in the contracts folder
-folder = "data/raw"
-for filename in sorted(os.listdir(folder)):
-    if not filename.lower().endswith(".txt"):
-        continue
-    path = os.path.join(folder, filename)
-    with open(path, "r", encoding="utf-8") as f:
-        text = f.read()
-    print(f"\n--- Processing file: {filename}")
-    pipeline.process_contract(text, filename)
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from multiprocessing import Pool
+import psycopg2
+from contract_pipeline import TEXT_STORAGE_MODES, ContractPipeline, content_hash
+from src.data_ingestion.archive import ARCHIVE_SUFFIXES, is_archive, iter_archive
+from src.data_ingestion.contract_files import (list_archives, list_contract_files, read_contract,
+                                               select_changed_files)
+from src.data_ingestion.inbox import InboxWatcher
+from src.data_ingestion.manifest import IngestManifest
+from src.data_processing.parse_workers import analyze_file, analyze_text, init_worker
+from src.utils.config import load_db_config
+from src.utils.database_connection import ConnectionPool
+from src.utils.metrics import PipelineMetrics
+
+
+class ArchiveProgress:
+    """
+    Records an archive in the manifest once every contract streamed from it
+    is committed. With group commit or writer threads that can happen after
+    the archive was read to the end, and on another thread.
+    """
+
+    def __init__(self, manifest, path, stat):
+        self.manifest = manifest
+        self.path = path
+        self.stat = stat
+        self.members = 0
+        self._digests = []
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def add(self, digest):
+        """Count one more contract from the archive; returns its on_committed callback"""
+        self.members += 1
+
+        def committed():
+            with self._lock:
+                self._digests.append(digest)
+                self._record_when_complete()
+        return committed
+
+    def finish(self):
+        """The archive was read to the end, no more contracts will be added"""
+        with self._lock:
+            self._finished = True
+            self._record_when_complete()
+
+    def _record_when_complete(self):
+        if self._finished and len(self._digests) == self.members:
+            # The archive's hash covers its members, independent of commit order
+            self.manifest.record(self.path, content_hash("".join(sorted(self._digests))), self.stat)
+
+
+def ingest_archive(pipeline, path, stat, manifest):
+    """
+    Process every contract in an archive through pipeline, streamed member by
+    member; each is stored as "<archive>/<member>". Returns the ArchiveProgress.
+    """
+    progress = ArchiveProgress(manifest, path, stat)
+    for name, text in iter_archive(path):
+        print(f"\n--- Processing file: {name}")
+        pipeline.process_contract(text, name, on_committed=progress.add(content_hash(text)))
+    progress.finish()
+    return progress
+
+
+def run_sequential(db_config, pool, files, pipeline_options, manifest, archives=()):
+    pipeline = ContractPipeline(db_config, pool=pool, **pipeline_options)
+    try:
+        for path, stat in files:
+            text = read_contract(path)
+            print(f"\n--- Processing file: {os.path.basename(path)}")
+            digest = content_hash(text)
+            pipeline.process_contract(
+                text, os.path.basename(path),
+                on_committed=lambda path=path, digest=digest, stat=stat: manifest.record(path, digest, stat),
+            )
+        for path, stat in archives:
+            ingest_archive(pipeline, path, stat, manifest)
+    finally:
+        pipeline.close()
+
+
+def run_parallel(db_config, pool, files, workers, writers, pipeline_options, manifest, archives=()):
+    """
+    Parse, classify and extract in a pool of worker processes and store the
+    results through a few writer threads, each with its own pipeline and a
+    connection from the shared pool. Reports are buffered per contract and
+    printed in input order. Parser metrics collected by the workers are
+    merged into pipeline_options["metrics"]. Archives are read in this
+    process and their contracts sent to the workers a chunk at a time.
+    Each contract goes to the writer picked by its content hash, so copies of
+    one text share a writer and never wait on a content_hash row another
+    writer holds in an open group. With a group commit deadline, a flusher
+    thread commits the open group of a writer that received no contract
+    before the deadline.
+    """
+    metrics = pipeline_options.get("metrics")
+    local = threading.local()
+    pipelines = []  # (pipeline, lock held while its writer thread uses it)
+    stop_flushing = threading.Event()
+
+    def store(name, text, clauses, on_committed):
+        if not hasattr(local, "pipeline"):
+            local.pipeline = ContractPipeline(db_config, pool=pool, **pipeline_options)
+            local.lock = threading.Lock()
+            pipelines.append((local.pipeline, local.lock))
+        out = io.StringIO()
+        print(f"\n--- Processing file: {name}", file=out)
+        with local.lock:
+            local.pipeline.process_contract(text, name, clauses=clauses, out=out, on_committed=on_committed)
+        return out.getvalue()
+
+    def flush_idle_writers(interval):
+        while not stop_flushing.wait(interval):
+            for pipeline, lock in list(pipelines):
+                if lock.acquire(blocking=False):
+                    try:
+                        pipeline.flush_if_due()
+                    finally:
+                        lock.release()
+
+    def submit(name, text, digest, clauses, worker_metrics, on_committed):
+        if worker_metrics is not None:
+            metrics.merge(worker_metrics)
+        executor = executors[int(digest[:8], 16) % writers]
+        pending.append(executor.submit(store, name, text, clauses, on_committed))
+        while len(pending) > max_pending or (pending and pending[0].done()):
+            print(pending.popleft().result(), end="")
+
+    stats = dict(files)
+    max_pending = writers * 4
+    pending = deque()
+    # one single-threaded executor per writer, so a contract's writer is chosen by submit
+    executors = [ThreadPoolExecutor(1) for _ in range(writers)]
+    flusher = None
+    if pipeline_options.get("group_commit_interval_ms"):
+        flusher = threading.Thread(target=flush_idle_writers, daemon=True,
+                                   args=(pipeline_options["group_commit_interval_ms"] / 2000,))
+        flusher.start()
+    try:
+        worker_args = (metrics is not None, pipeline_options.get("max_repeat"), pipeline_options.get("time_budget_ms"))
+        with Pool(workers, initializer=init_worker, initargs=worker_args) as process_pool:
+            for path, text, clauses, worker_metrics in process_pool.imap(analyze_file, list(stats), chunksize=8):
+                digest = content_hash(text)
+                submit(os.path.basename(path), text, digest, clauses, worker_metrics,
+                       lambda path=path, digest=digest: manifest.record(path, digest, stats[path]))
+            for path, stat in archives:
+                progress = ArchiveProgress(manifest, path, stat)
+                members = iter_archive(path)
+                # Bounded chunks, so a large archive is never read into memory as a whole
+                while chunk := list(islice(members, workers * 32)):
+                    analyzed = process_pool.imap(analyze_text, [text for _, text in chunk], chunksize=8)
+                    for (name, text), (clauses, worker_metrics) in zip(chunk, analyzed):
+                        digest = content_hash(text)
+                        submit(name, text, digest, clauses, worker_metrics, progress.add(digest))
+                progress.finish()
+            while pending:
+                print(pending.popleft().result(), end="")
+    finally:
+        for executor in executors:
+            executor.shutdown()
+        stop_flushing.set()
+        if flusher is not None:
+            flusher.join()
+        for pipeline, _ in pipelines:
+            pipeline.close()
+
+
+def run_async(db_config, files, workers, writers, pipeline_options, manifest):
+    """
+    Reader, parser and writer stages overlapping on one event loop, writing
+    through asyncpg. Each contract is committed on its own, so the group
+    commit options do not apply.
+    """
+    from async_pipeline import AsyncContractPipeline
+
+    stats = dict(files)
+    pipeline = AsyncContractPipeline(
+        db_config, parser_workers=workers, writers=writers,
+        text_storage=pipeline_options.get("text_storage", "inline"),
+        batch_size=pipeline_options.get("batch_size", 1000),
+        metrics=pipeline_options.get("metrics"),
+        max_repeat=pipeline_options.get("max_repeat"),
+        time_budget_ms=pipeline_options.get("time_budget_ms"),
+    )
+    asyncio.run(pipeline.run(
+        list(stats),
+        on_stored=lambda path, digest, contract_id, stored: manifest.record(path, digest, stats[path]),
+    ))
+
+
+def run_watch(db_config, pool, directories, pipeline_options, manifest, settle_ms=500, poll_interval=1.0,
+              use_inotify=None, metrics_path=None):
+    """
+    Daemon mode: ingest contracts as they land in the inbox directories,
+    through one warm pipeline (compiled parser, pooled connections) that lives
+    as long as the process. Reports the latency of each contract from the
+    moment the watcher first saw the file to its commit, also as the
+    "ingest_latency" stage when metrics are collected.
+    Zip and tar archives dropped in the inbox are ingested member by member.
+    With a group commit deadline a group stays open across polls while
+    contracts keep landing and is committed at its deadline, also when the
+    inbox goes quiet; otherwise each batch of arrivals is committed at once.
+    A contract that fails on a lost connection, and every contract of a group
+    lost with it or with a failed commit, is processed again on the next
+    poll; one that fails on its own content is retried once its file changes.
+    Runs until interrupted or terminated.
+    """
+    metrics = pipeline_options.get("metrics")
+    group_commit_ms = pipeline_options.get("group_commit_interval_ms")
+    pipeline = ContractPipeline(db_config, pool=pool, **pipeline_options)
+    watcher = InboxWatcher(directories, suffixes=(".txt",) + ARCHIVE_SUFFIXES, settle_seconds=settle_ms / 1000,
+                           poll_interval=poll_interval, use_inotify=use_inotify)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Watching {', '.join(watcher.directories)} ({watcher.mode}), Ctrl+C to stop")
+    uncommitted = {}  # path -> landing time, for files written since the last commit
+    retry = {}  # path -> landing time, for files to process again on the next poll
+
+    def committed(path, digest, stat, landed):
+        uncommitted.pop(path, None)
+        manifest.record(path, digest, stat)
+        latency = time.time() - landed
+        if metrics is not None:
+            metrics.observe_stage("ingest_latency", latency)
+        print(f"✓ {os.path.basename(path)} queryable {latency:.2f}s after landing")
+
+    def requeue_lost_group():
+        """Reset the pipeline if the error lost its connection or group; True if it did"""
+        if not pipeline.recover():
+            return False
+        retry.update(uncommitted)
+        uncommitted.clear()
+        return True
+
+    try:
+        while True:
+            ready = watcher.poll(min(poll_interval, group_commit_ms / 1000) if group_commit_ms else None)
+            batch = list(retry.items()) + [(path, watcher.landed_at(path)) for path in ready if path not in retry]
+            retry.clear()
+            for path, landed in batch:
+                try:
+                    stat = os.stat(path)
+                    if manifest.is_unchanged(path, stat):
+                        continue
+                    uncommitted[path] = landed
+                    if is_archive(path):
+                        progress = ingest_archive(pipeline, path, stat, manifest)
+                        print(f"✓ {os.path.basename(path)}: {progress.members} contracts")
+                        continue
+                    text = read_contract(path)
+                    digest = content_hash(text)
+                    print(f"\n--- Processing file: {os.path.basename(path)}")
+                    pipeline.process_contract(
+                        text, os.path.basename(path),
+                        on_committed=lambda path=path, digest=digest, stat=stat, landed=landed:
+                        committed(path, digest, stat, landed),
+                    )
+                except FileNotFoundError:
+                    uncommitted.pop(path, None)  # moved away before it was read
+                except Exception as e:
+                    if requeue_lost_group() or isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                        retry[path] = landed
+                        print(f"✗ {os.path.basename(path)} failed: {e}; retrying {len(retry)} files")
+                    else:
+                        # One bad contract must not stop the daemon; it is retried once the file changes
+                        uncommitted.pop(path, None)
+                        print(f"✗ {os.path.basename(path)} failed: {e}")
+            try:
+                if group_commit_ms:
+                    flushed = pipeline.flush_if_due()
+                else:
+                    flushed = bool(batch)
+                    if batch:
+                        pipeline.flush()
+            except Exception as e:
+                flushed = False
+                if requeue_lost_group():
+                    print(f"✗ commit failed: {e}; retrying {len(retry)} files")
+                else:
+                    print(f"✗ commit failed: {e}")
+            if flushed:
+                uncommitted.clear()
+                manifest.save()
+                if metrics_path:
+                    metrics.dump(metrics_path)
+    finally:
+        watcher.close()
+        try:
+            pipeline.close()
+        except Exception as e:
+            # Files of the lost group are not in the manifest, so the next start ingests them
+            print(f"✗ final commit failed: {e}")
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Process employment contracts into PostgreSQL")
+    arg_parser.add_argument("--config", default="config/config.json", help="JSON file with DB connection settings")
+    arg_parser.add_argument("--folder", default="data/raw",
+                            help="folder with .txt contracts and zip/tar.gz archives of them")
+    arg_parser.add_argument("--archive", action="append", default=[], metavar="PATH",
+                            help="also ingest the contracts in this zip or tar archive (repeatable)")
+    arg_parser.add_argument("--workers", type=int, default=1,
+                            help="parser processes; 1 processes contracts one at a time")
+    arg_parser.add_argument("--writers", type=int, default=None,
+                            help="DB writer connections in --workers/--async mode "
+                                 "(default: min(4, workers), at least 2 with --async)")
+    arg_parser.add_argument("--async", dest="async_mode", action="store_true",
+                            help="staged asyncio pipeline with bounded queues and asyncpg writers")
+    arg_parser.add_argument("--batch-size", type=int, default=1000, help="rows per multi-row INSERT")
+    arg_parser.add_argument("--group-commit", type=int, default=None, metavar="N",
+                            help="commit every N contracts instead of after each one")
+    arg_parser.add_argument("--group-commit-ms", type=float, default=None, metavar="T",
+                            help="commit a group once it is T milliseconds old")
+    arg_parser.add_argument("--manifest", default="data/ingest_manifest.json",
+                            help="record of ingested files used to skip unchanged ones")
+    arg_parser.add_argument("--full", action="store_true", help="reprocess files even if the manifest says unchanged")
+    arg_parser.add_argument("--regex-max-repeat", type=int, default=None, metavar="N",
+                            help="linear-time extraction: cap unbounded regex repetitions at N characters")
+    arg_parser.add_argument("--extract-budget-ms", type=float, default=None, metavar="T",
+                            help="per-clause extraction budget; rules left when it runs out are skipped")
+    arg_parser.add_argument("--text-storage", choices=TEXT_STORAGE_MODES, default="inline",
+                            help="keep contract text in contracts.raw_text (inline) or in contract_texts, "
+                                 "as TEXT (blob) or zlib-compressed (compressed)")
+    arg_parser.add_argument("--watch", action="append", default=None, metavar="DIR",
+                            help="run as a daemon, ingesting contracts as they land in DIR (repeatable)")
+    arg_parser.add_argument("--settle-ms", type=float, default=500,
+                            help="--watch: a file is complete once unchanged for this long")
+    arg_parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="--watch: rescan interval in seconds (with inotify, catches missed events)")
+    arg_parser.add_argument("--no-inotify", action="store_true", help="--watch: always poll")
+    arg_parser.add_argument("--metrics", default=None, metavar="PATH",
+                            help="collect stage, rule and DB metrics and write them to PATH "
+                                 "(Prometheus text for .prom/.txt, JSON otherwise; "
+                                 "no DB round-trip counts with --async)")
+    args = arg_parser.parse_args(argv)
+    if args.async_mode and (args.group_commit or args.group_commit_ms):
+        arg_parser.error("--group-commit/--group-commit-ms are not supported with --async, "
+                         "which commits each contract on its own")
+
+    db_config, pool_config = load_db_config(args.config)
+    manifest = IngestManifest(args.manifest)
+    if args.watch:
+        pool = ConnectionPool(db_config, **pool_config)
+        pipeline_options = {
+            "batch_size": args.batch_size,
+            "group_commit_size": args.group_commit,
+            "group_commit_interval_ms": args.group_commit_ms,
+            "metrics": PipelineMetrics() if args.metrics else None,
+            "max_repeat": args.regex_max_repeat,
+            "time_budget_ms": args.extract_budget_ms,
+            "text_storage": args.text_storage,
+        }
+        try:
+            run_watch(db_config, pool, args.watch, pipeline_options, manifest, args.settle_ms,
+                      args.poll_interval, False if args.no_inotify else None, args.metrics)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            manifest.save()
+            pool.closeall()
+            if args.metrics:
+                pipeline_options["metrics"].dump(args.metrics)
+        return
+    if args.async_mode and (args.archive or list_archives(args.folder)):
+        arg_parser.error("archives are not supported with --async")
+    paths = list_contract_files(args.folder)
+    files = select_changed_files(paths, manifest, full=args.full)
+    print(f"{len(files)} new or changed contracts, {len(paths) - len(files)} unchanged skipped")
+    archive_paths = list_archives(args.folder) + args.archive
+    archives = select_changed_files(archive_paths, manifest, full=args.full)
+    if archive_paths:
+        print(f"{len(archives)} new or changed archives, {len(archive_paths) - len(archives)} unchanged skipped")
+    writers = args.writers or (max(2, min(4, args.workers)) if args.async_mode else min(4, args.workers))
+    if args.workers > 1:
+        pool_config["max_size"] = max(pool_config.get("max_size", 0), writers)
+    pool = ConnectionPool(db_config, **pool_config)
+    pipeline_options = {
+        "batch_size": args.batch_size,
+        "group_commit_size": args.group_commit,
+        "group_commit_interval_ms": args.group_commit_ms,
+        "metrics": PipelineMetrics() if args.metrics else None,
+        "max_repeat": args.regex_max_repeat,
+        "time_budget_ms": args.extract_budget_ms,
+        "text_storage": args.text_storage,
+    }
+
+    try:
+        if args.async_mode:
+            run_async(db_config, files, args.workers, writers, pipeline_options, manifest)
+        elif args.workers > 1:
+            run_parallel(db_config, pool, files, args.workers, writers, pipeline_options, manifest, archives)
+        else:
+            run_sequential(db_config, pool, files, pipeline_options, manifest, archives)
+    finally:
+        manifest.save()
+        pool.closeall()
+        if args.metrics:
+            pipeline_options["metrics"].dump(args.metrics)
+            print(f"Metrics written to {args.metrics}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Archive Reader
+
+Streams the contract files inside zip and tar archives (optionally gzip,
+bzip2 or xz compressed) member by member, without unpacking them to disk.
+Each member is decoded on its own, so a bundle mixing UTF-8 files with
+files exported by Windows tools is read correctly.
+"""
+
+import codecs
+import os
+import tarfile
+import zipfile
+from typing import Iterator, Tuple
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+# contracts.contract_name is VARCHAR(255)
+MAX_CONTRACT_NAME = 255
+
+_BOMS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+
+# The five bytes Windows-1252 leaves undefined
+_CP1252_UNDEFINED = frozenset(b'\x81\x8d\x8f\x90\x9d')
+
+
+def _cp1252_undefined_as_latin1(error: UnicodeDecodeError) -> Tuple[str, int]:
+    byte = error.object[error.start]
+    if byte not in _CP1252_UNDEFINED:
+        raise error
+    return chr(byte), error.start + 1
+
+
+codecs.register_error('cp1252-latin1', _cp1252_undefined_as_latin1)
+
+
+def is_archive(path: str) -> bool:
+    return path.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def decode_contract(data: bytes) -> str:
+    """
+    Text of a contract file read as bytes: the encoding of a byte order mark,
+    else UTF-8, else Windows-1252 (Latin-1 for its five unmapped bytes).
+    Line endings are normalised to \\n like a file opened in text mode, so a
+    member hashes the same as the unpacked file.
+    """
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            text = data.decode(encoding)
+            break
+    else:
+        try:
+            text = data.decode('utf-8')
+        except UnicodeDecodeError:
+            text = data.decode('cp1252', errors='cp1252-latin1')
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def _is_contract(member_name: str, suffixes: Tuple[str, ...]) -> bool:
+    """Contract files by suffix, leaving out hidden files and macOS resource forks"""
+    parts = [part for part in member_name.split('/') if part not in ('', '.')]
+    return (bool(parts) and parts[-1].lower().endswith(suffixes) and '__MACOSX' not in parts
+            and not any(part.startswith('.') for part in parts))
+
+
+def contract_name(archive_name: str, member_name: str) -> str:
+    """
+    "<archive file name>/<member path>", shortened to MAX_CONTRACT_NAME
+    characters by eliding the start of the member path, which keeps the
+    file name itself
+    """
+    name = f"{archive_name}/{member_name}"
+    if len(name) <= MAX_CONTRACT_NAME:
+        return name
+    keep = MAX_CONTRACT_NAME - len(archive_name) - 2
+    if keep < 1:
+        return '…' + name[-(MAX_CONTRACT_NAME - 1):]
+    return f"{archive_name}/…{member_name[-keep:]}"
+
+
+def iter_archive(path: str, suffixes: Tuple[str, ...] = ('.txt',)) -> Iterator[Tuple[str, str]]:
+    """
+    (contract_name, text) for each contract file in the archive, in archive
+    order. contract_name is "<archive file name>/<member path>" (see
+    contract_name). Tar archives
+    are read as a stream, so compressed tarballs are decompressed once from
+    front to back; only one member is held in memory at a time.
+    """
+    archive_name = os.path.basename(path)
+    if path.lower().endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_contract(info.filename, suffixes):
+                    with archive.open(info) as member:
+                        yield contract_name(archive_name, info.filename), decode_contract(member.read())
+    else:
+        with tarfile.open(path, 'r|*') as archive:
+            for info in archive:
+                if info.isfile() and _is_contract(info.name, suffixes):
+                    member_name = info.name[2:] if info.name.startswith('./') else info.name
+                    yield contract_name(archive_name, member_name), decode_contract(archive.extractfile(info).read())
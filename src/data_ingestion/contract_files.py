@@ -0,0 +1,46 @@
+"""
+Contract Files
+
+Lists and reads the contract files and archives in a contracts folder, and
+selects the ones the ingest manifest does not know yet.
+"""
+
+import os
+from typing import List, Tuple
+
+from src.data_ingestion.archive import is_archive
+from src.data_ingestion.manifest import IngestManifest
+
+
+def list_contract_files(folder: str) -> List[str]:
+    """All .txt files in the contracts folder, in name order"""
+    return [
+        os.path.join(folder, filename)
+        for filename in sorted(os.listdir(folder))
+        if filename.lower().endswith(".txt")
+    ]
+
+
+def list_archives(folder: str) -> List[str]:
+    """All zip and tar archives in the contracts folder, in name order"""
+    return [
+        os.path.join(folder, filename)
+        for filename in sorted(os.listdir(folder))
+        if is_archive(filename)
+    ]
+
+
+def read_contract(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def select_changed_files(paths: List[str], manifest: IngestManifest,
+                         full: bool = False) -> List[Tuple[str, os.stat_result]]:
+    """(path, stat) for every file that is new or changed since the manifest was written"""
+    changed = []
+    for path in paths:
+        stat = os.stat(path)
+        if full or not manifest.is_unchanged(path, stat):
+            changed.append((path, stat))
+    return changed
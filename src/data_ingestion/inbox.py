@@ -0,0 +1,214 @@
+"""
+Inbox Watcher
+
+Watches one or more inbox directories for contract files and reports each
+file once it is complete. Directory changes are picked up with inotify on
+Linux, backed by a rescan every poll interval and whenever the event queue
+overflowed, and by rescanning every poll interval elsewhere. A file counts
+as complete once its size and mtime have not changed for the settle time, so
+a contract that is still being copied in is never read half written.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Names of files that are still being written by common copy tools
+PARTIAL_SUFFIXES = ('.part', '.tmp', '.crdownload', '.partial', '.swp')
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_MODIFY = 0x00000002
+_IN_MOVED_FROM = 0x00000040
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+
+class _Inotify:
+    """Minimal inotify binding through libc; raises OSError when it is not available"""
+
+    def __init__(self, directories: Iterable[str]):
+        if not sys.platform.startswith('linux'):
+            raise OSError('inotify is only available on Linux')
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.directories: Dict[int, str] = {}
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_MODIFY | _IN_MOVED_FROM | _IN_DELETE
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(errno, f'inotify_add_watch failed for {directory}')
+            self.directories[wd] = directory
+
+    def read(self, timeout: float) -> Tuple[List[str], bool]:
+        """
+        (paths with events, whether the kernel's event queue overflowed and
+        dropped events), waiting at most timeout seconds for the first one
+        """
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if not ready:
+            return [], False
+        paths = []
+        overflowed = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & _IN_Q_OVERFLOW:
+                    overflowed = True
+                elif name and wd in self.directories:
+                    paths.append(os.path.join(self.directories[wd], os.fsdecode(name)))
+        return paths, overflowed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class InboxWatcher:
+    """
+    Reports complete contract files landing in the inbox directories. Files
+    present at start-up are reported too, so a restart picks up the backlog.
+    """
+
+    def __init__(self, directories: Iterable[str], suffixes: Tuple[str, ...] = ('.txt',),
+                 settle_seconds: float = 0.5, poll_interval: float = 1.0, use_inotify: Optional[bool] = None):
+        """
+        Args:
+            directories: Inbox directories to watch (not recursive)
+            suffixes: Lower-case file name endings that are contracts
+            settle_seconds: How long size and mtime must stay unchanged
+            poll_interval: Rescan interval; with inotify the rescan catches events it missed
+            use_inotify: Force inotify on or off; by default it is used where available
+        """
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.suffixes = suffixes
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self._inotify = None
+        if use_inotify is not False:
+            try:
+                self._inotify = _Inotify(self.directories)
+            except (OSError, AttributeError):
+                if use_inotify:
+                    raise
+        # path -> ((size, mtime_ns), monotonic time the signature was first seen,
+        #          wall-clock time the file was first seen)
+        self._pending: Dict[str, Tuple[Tuple[int, int], float, float]] = {}
+        # signature last reported per file still in the inbox; dropped once the file is gone
+        self._reported: Dict[str, Tuple[int, int]] = {}
+        self._landed: Dict[str, float] = {}
+        self._last_scan = 0.0
+        self._scan()
+
+    @property
+    def mode(self) -> str:
+        return 'inotify' if self._inotify is not None else 'polling'
+
+    def _is_contract(self, path: str) -> bool:
+        name = os.path.basename(path).lower()
+        return (not name.startswith('.') and name.endswith(self.suffixes)
+                and not name.endswith(PARTIAL_SUFFIXES))
+
+    def _scan(self):
+        present = set()
+        for directory in self.directories:
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                present.add(path)
+                self._touch(path)
+        for entries in (self._pending, self._reported):
+            for path in [path for path in entries if path not in present]:
+                del entries[path]
+        self._last_scan = time.monotonic()
+
+    def _touch(self, path: str):
+        """Note that path may have changed; its settle time restarts when its size or mtime did"""
+        if not self._is_contract(path):
+            return
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._pending.pop(path, None)
+            self._reported.pop(path, None)
+            return
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if self._reported.get(path) == signature:
+            return
+        pending = self._pending.get(path)
+        if pending is None:
+            self._pending[path] = (signature, time.monotonic(), time.time())
+        elif pending[0] != signature:
+            self._pending[path] = (signature, time.monotonic(), pending[2])
+
+    def _settled(self) -> List[str]:
+        """Pending files whose signature held for settle_seconds, re-checked with a fresh stat"""
+        now = time.monotonic()
+        ready = []
+        self._landed = {}
+        for path, (signature, since, first_seen) in list(self._pending.items()):
+            if now - since < self.settle_seconds:
+                continue
+            self._touch(path)
+            current = self._pending.get(path)
+            if current is not None and current[0] == signature:
+                del self._pending[path]
+                self._reported[path] = signature
+                self._landed[path] = first_seen
+                ready.append(path)
+        return sorted(ready)
+
+    def landed_at(self, path: str) -> Optional[float]:
+        """
+        Wall-clock time the watcher first saw a file returned by the last
+        poll. Unlike the mtime, it is when the file landed in the inbox even
+        if the copy kept the original mtime (cp -p, rsync, mv).
+        """
+        return self._landed.get(path)
+
+    def poll(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        Wait up to timeout seconds (poll_interval by default) for changes and
+        return the files that have settled since the last call, in name order.
+        Returns early, possibly empty, as soon as a pending file may settle.
+        """
+        timeout = self.poll_interval if timeout is None else timeout
+        if self._pending:
+            now = time.monotonic()
+            first_due = min(since for _, since, _ in self._pending.values()) + self.settle_seconds
+            timeout = min(timeout, max(first_due - now, 0))
+        if self._inotify is not None:
+            paths, overflowed = self._inotify.read(timeout)
+            for path in paths:
+                self._touch(path)
+            # events dropped by a full queue are only found by listing the directories
+            if overflowed or time.monotonic() - self._last_scan >= self.poll_interval:
+                self._scan()
+        else:
+            time.sleep(timeout)
+            self._scan()
+        return self._settled()
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
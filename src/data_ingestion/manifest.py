@@ -0,0 +1,60 @@
+"""
+Ingest Manifest
+
+Local record of the contract files that were already ingested: path, size,
+modification time and content hash. A rerun compares each file's os.stat()
+against the manifest and skips unchanged files without opening them.
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+
+class IngestManifest:
+    """
+    JSON manifest of ingested files, keyed by absolute path
+    """
+
+    def __init__(self, path: str):
+        """
+        Load the manifest at path, starting empty when it does not exist yet
+
+        Args:
+            path: Location of the manifest JSON file
+        """
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    def is_unchanged(self, file_path: str, stat: Optional[os.stat_result] = None) -> bool:
+        """True when size and mtime match the recorded entry, judged from stat alone"""
+        entry = self.entries.get(self._key(file_path))
+        if entry is None:
+            return False
+        stat = stat or os.stat(file_path)
+        return entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+    def record(self, file_path: str, digest: str, stat: Optional[os.stat_result] = None):
+        """Remember a successfully ingested file"""
+        stat = stat or os.stat(file_path)
+        self.entries[self._key(file_path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "content_hash": digest,
+        }
+
+    def save(self):
+        """Write the manifest atomically, so an interrupted run never leaves it half written"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
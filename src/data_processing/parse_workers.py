@@ -0,0 +1,38 @@
+"""
+Parser Worker Processes
+
+Entry points for multiprocessing pools that parse, classify and extract
+contracts. Pass init_worker as the pool initializer so each process compiles
+its ContractParser once, then map analyze_file or analyze_text over the
+contracts.
+"""
+
+from typing import List, Optional, Tuple
+
+from contract_pipeline import Clause, ContractParser
+from src.data_ingestion.contract_files import read_contract
+from src.utils.metrics import PipelineMetrics
+
+# Parser owned by each worker process, compiled once in init_worker
+_worker_parser: Optional[ContractParser] = None
+
+
+def init_worker(collect_metrics: bool = False, max_repeat: Optional[int] = None,
+                time_budget_ms: Optional[float] = None):
+    global _worker_parser
+    _worker_parser = ContractParser(metrics=PipelineMetrics() if collect_metrics else None,
+                                    max_repeat=max_repeat, time_budget_ms=time_budget_ms)
+
+
+def analyze_file(path: str) -> Tuple[str, str, List[Clause], Optional[PipelineMetrics]]:
+    """(path, text, clauses, metrics collected for this file or None)"""
+    text = read_contract(path)
+    clauses, metrics = analyze_text(text)
+    return path, text, clauses, metrics
+
+
+def analyze_text(text: str) -> Tuple[List[Clause], Optional[PipelineMetrics]]:
+    """(clauses, metrics collected for this text or None)"""
+    clauses = _worker_parser.analyze_contract(text)
+    metrics = _worker_parser.metrics.drain() if _worker_parser.metrics is not None else None
+    return clauses, metrics
@@ -0,0 +1,19 @@
+"""
+Configuration Loading
+
+Reads the JSON database configuration shared by the command-line tools.
+"""
+
+import json
+from typing import Any, Dict, Tuple
+
+
+def load_db_config(path: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Connection settings for psycopg2.connect, plus the optional "pool" section
+    (min_size, max_size, max_lifetime, health_check_interval) returned separately
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        db_config = json.load(f)
+    pool_config = db_config.pop("pool", {})
+    return db_config, pool_config
@@ -5,18 +5,179 @@ Provides connection management for various database systems.
 Include connection pooling, retry logic, and proper error handling.
 """
 
-from typing import Dict, Any
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Optional
+
+import psycopg2
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of warm PostgreSQL connections
+
+    Connections are handed out with getconn() and given back with putconn(),
+    or borrowed for a block with the connection() context manager. Idle
+    connections are kept open between checkouts so back-to-back work does not
+    pay for a new TCP connection, authentication and backend start each time.
+    """
+
+    def __init__(self, connection_params: Dict[str, Any], min_size: int = 0, max_size: int = 4,
+                 max_lifetime: float = 3600.0, health_check_interval: float = 30.0,
+                 connect_timeout: float = 30.0, connect_retries: int = 3,
+                 connect: Optional[Callable[..., Any]] = None):
+        """
+        Initialize connection pool
+
+        Args:
+            connection_params: Keyword arguments for psycopg2.connect
+            min_size: Connections opened up front and kept idle
+            max_size: Upper bound on open connections; getconn() waits when reached
+            max_lifetime: Seconds after which a connection is closed and replaced
+            health_check_interval: Connections idle for longer than this are
+                checked with SELECT 1 before being handed out
+            connect_timeout: Seconds getconn() waits for a free connection
+            connect_retries: Attempts to open a new connection before giving up
+            connect: Connection factory, psycopg2.connect by default
+        """
+        if max_size < 1 or min_size > max_size:
+            raise ValueError(f"invalid pool size: min_size={min_size}, max_size={max_size}")
+        self.connection_params = connection_params
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+        self.connect_retries = connect_retries
+        self._connect = connect or psycopg2.connect
+        self._idle = deque()      # (connection, created_at, last_used)
+        self._created = {}        # id(connection) -> created_at, for checked-out connections
+        self._size = 0
+        self._closed = False
+        self._lock = threading.Condition()
+        for _ in range(min_size):
+            self._idle.append((self._open(), time.monotonic(), time.monotonic()))
+            self._size += 1
+
+    def _open(self):
+        """Open a new connection, retrying with exponential backoff"""
+        for attempt in range(self.connect_retries):
+            try:
+                return self._connect(**self.connection_params)
+            except psycopg2.OperationalError:
+                if attempt == self.connect_retries - 1:
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _is_healthy(self, conn, created_at: float, last_used: float) -> bool:
+        now = time.monotonic()
+        if conn.closed or now - created_at > self.max_lifetime:
+            return False
+        if now - last_used > self.health_check_interval:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def getconn(self):
+        """Check out a healthy connection, opening a new one if none is idle"""
+        deadline = time.monotonic() + self.connect_timeout
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                if self._idle:
+                    conn, created_at, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"no connection available within {self.connect_timeout}s")
+                self._lock.wait(remaining)
+
+        if conn is not None and not self._is_healthy(conn, created_at, last_used):
+            self._close(conn)
+            conn = None
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                    self._lock.notify()
+                raise
+            created_at = time.monotonic()
+        with self._lock:
+            self._created[id(conn)] = created_at
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection; open transactions are rolled back, broken connections dropped"""
+        with self._lock:
+            created_at = self._created.pop(id(conn), time.monotonic())
+        if not discard and not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        with self._lock:
+            if discard or conn.closed or self._closed or time.monotonic() - created_at > self.max_lifetime:
+                self._close(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with-block"""
+        conn = self.getconn()
+        try:
+            yield conn
+        except psycopg2.InterfaceError:
+            self.putconn(conn, discard=True)
+            raise
+        except BaseException:
+            self.putconn(conn)
+            raise
+        else:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Close idle connections; checked-out ones are closed when returned"""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _, _ = self._idle.pop()
+                self._close(conn)
+                self._size -= 1
+            self._lock.notify_all()
 
 
 class DatabaseManager:
     """
     Database connection manager supporting multiple database types
     """
-    
+
     def __init__(self, db_type: str, connection_params: Dict[str, Any]):
         """
         Initialize database manager
-        
+
         Args:
             db_type: Type of database ('postgresql', 'mysql', 'sqlite')
             connection_params: Database connection parameters
@@ -25,29 +186,28 @@ class DatabaseManager:
         self.connection_params = connection_params
         self.engine = None
         self._setup_connection()
-    
+
     def _setup_connection(self):
-        """Write doc string here
+        """Create the connection pool for the configured database type
         """
-        NotImplemented
-    
+        if self.db_type != 'postgresql':
+            raise ValueError(f"Unsupported database type: {self.db_type}")
+        params = dict(self.connection_params)
+        pool_params = params.pop('pool', {})
+        self.engine = ConnectionPool(params, **pool_params)
+
 
 # Example usage for documentation
 if __name__ == "__main__":
     # Example of how to use the database manager
-    # 
-    # # Setup for SQLite (for development)
-    # sqlite_config = {'path': '../data/sample_database.db'}
-    # db_manager = DatabaseManager('sqlite', sqlite_config)
-    # 
-    # # Example queries
-    # customers_query = "SELECT * FROM customers LIMIT 10"
-    # customers_df = db_manager.execute_query(customers_query)
-    # 
-    # # Insert example
-    # sample_data = pd.DataFrame({
-    #     'name': ['John Doe', 'Jane Smith'],
-    #     'email': ['john@example.com', 'jane@example.com']
-    # })
-    # db_manager.insert_dataframe(sample_data, 'customers', if_exists='append')
-    pass
\ No newline at end of file
+    #
+    # # Setup for PostgreSQL with a pool of warm connections
+    # pg_config = {'host': 'localhost', 'dbname': 'contracts', 'user': 'etl', 'password': '...',
+    #              'pool': {'max_size': 8, 'max_lifetime': 1800, 'health_check_interval': 30}}
+    # db_manager = DatabaseManager('postgresql', pg_config)
+    #
+    # # Borrow a connection
+    # with db_manager.engine.connection() as conn:
+    #     with conn.cursor() as cur:
+    #         cur.execute("SELECT COUNT(*) FROM contracts")
+    pass
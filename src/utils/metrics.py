@@ -0,0 +1,236 @@
+"""
+Pipeline Metrics
+
+Lightweight, always-available instrumentation for the contract pipeline:
+latency histograms per stage, call counts and cumulative time per extraction
+rule, and DB round trips and rows per contract. Metrics can be dumped as JSON
+or in the Prometheus text exposition format at the end of a run.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Bucket upper bounds: 100us .. ~13s for latencies, 1 .. 1000 for counts
+LATENCY_BUCKETS = tuple(0.0001 * 2 ** i for i in range(18))
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus semantics (cumulative on export)"""
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: 'Histogram'):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+
+class PipelineMetrics:
+    """
+    Thread-safe metrics registry shared by ContractParser, DatabaseManager
+    and ContractPipeline
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Histogram] = {}
+        self.rules: Dict[Tuple[str, str], List[float]] = {}  # (clause_type, rule) -> [calls, matches, seconds]
+        self.db_round_trips = Histogram(COUNT_BUCKETS)
+        self.db_rows = Histogram(COUNT_BUCKETS)
+        self.budget_skips: Dict[str, int] = {}  # clause_type -> clauses cut off by the time budget
+        self.contracts = 0
+
+    def observe_stage(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time_stage(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+    def observe_rules(self, rule_stats: Dict[Tuple[str, str], List[float]]):
+        """Add per-rule [calls, matches, seconds] gathered for one clause"""
+        with self._lock:
+            for rule, (calls, matches, seconds) in rule_stats.items():
+                totals = self.rules.get(rule)
+                if totals is None:
+                    self.rules[rule] = [calls, matches, seconds]
+                else:
+                    totals[0] += calls
+                    totals[1] += matches
+                    totals[2] += seconds
+
+    def observe_budget_skip(self, clause_type: str, clauses: int = 1):
+        with self._lock:
+            self.budget_skips[clause_type] = self.budget_skips.get(clause_type, 0) + clauses
+
+    def observe_contract(self, round_trips: int, rows: int):
+        with self._lock:
+            self.contracts += 1
+            self.db_round_trips.observe(round_trips)
+            self.db_rows.observe(rows)
+
+    def merge(self, other: 'PipelineMetrics'):
+        """Fold in metrics collected elsewhere, e.g. by a worker process"""
+        for stage, histogram in other.stages.items():
+            with self._lock:
+                if stage not in self.stages:
+                    self.stages[stage] = Histogram(histogram.buckets)
+                self.stages[stage].merge(histogram)
+        self.observe_rules(other.rules)
+        for clause_type, clauses in other.budget_skips.items():
+            self.observe_budget_skip(clause_type, clauses)
+        with self._lock:
+            self.contracts += other.contracts
+            self.db_round_trips.merge(other.db_round_trips)
+            self.db_rows.merge(other.db_rows)
+
+    def drain(self) -> 'PipelineMetrics':
+        """Return the metrics collected so far and start over"""
+        with self._lock:
+            drained = PipelineMetrics()
+            drained.stages, self.stages = self.stages, {}
+            drained.rules, self.rules = self.rules, {}
+            drained.budget_skips, self.budget_skips = self.budget_skips, {}
+            drained.db_round_trips, self.db_round_trips = self.db_round_trips, Histogram(COUNT_BUCKETS)
+            drained.db_rows, self.db_rows = self.db_rows, Histogram(COUNT_BUCKETS)
+            drained.contracts, self.contracts = self.contracts, 0
+        return drained
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'contracts': self.contracts,
+                'stages': {stage: histogram.to_dict() for stage, histogram in sorted(self.stages.items())},
+                'rules': [
+                    {'clause_type': clause_type, 'rule': rule, 'calls': int(calls),
+                     'matches': int(matches), 'seconds': seconds}
+                    for (clause_type, rule), (calls, matches, seconds)
+                    in sorted(self.rules.items(), key=lambda item: -item[1][2])
+                ],
+                'budget_skips': dict(sorted(self.budget_skips.items())),
+                'db_round_trips_per_contract': self.db_round_trips.to_dict(),
+                'db_rows_per_contract': self.db_rows.to_dict(),
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self, prefix: str = 'contract_pipeline') -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def histogram_lines(name: str, histogram: Histogram, labels: str = ''):
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else repr(bound)
+                lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{le}"}} {cumulative}')
+            suffix = f'{{{labels}}}' if labels else ''
+            lines.append(f'{name}_sum{suffix} {histogram.sum}')
+            lines.append(f'{name}_count{suffix} {histogram.count}')
+
+        with self._lock:
+            lines.append(f'# TYPE {prefix}_contracts_total counter')
+            lines.append(f'{prefix}_contracts_total {self.contracts}')
+            lines.append(f'# TYPE {prefix}_stage_seconds histogram')
+            for stage, histogram in sorted(self.stages.items()):
+                histogram_lines(f'{prefix}_stage_seconds', histogram, f'stage="{stage}"')
+            for metric, index in (('calls', 0), ('matches', 1), ('seconds', 2)):
+                lines.append(f'# TYPE {prefix}_rule_{metric}_total counter')
+                for (clause_type, rule), stats in sorted(self.rules.items()):
+                    lines.append(f'{prefix}_rule_{metric}_total{{clause_type="{clause_type}",rule="{rule}"}} '
+                                 f'{stats[index]}')
+            lines.append(f'# TYPE {prefix}_budget_skips_total counter')
+            for clause_type, clauses in sorted(self.budget_skips.items()):
+                lines.append(f'{prefix}_budget_skips_total{{clause_type="{clause_type}"}} {clauses}')
+            lines.append(f'# TYPE {prefix}_db_round_trips_per_contract histogram')
+            histogram_lines(f'{prefix}_db_round_trips_per_contract', self.db_round_trips)
+            lines.append(f'# TYPE {prefix}_db_rows_per_contract histogram')
+            histogram_lines(f'{prefix}_db_rows_per_contract', self.db_rows)
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path: str):
+        """Write metrics to path: Prometheus text for .prom/.txt, JSON otherwise"""
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+class CountingCursor:
+    """Cursor wrapper counting statements sent and rows affected or returned"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.round_trips = 0
+        self.rows = 0
+
+    def execute(self, *args, **kwargs):
+        result = self._cursor.execute(*args, **kwargs)
+        self.round_trips += 1
+        if self._cursor.rowcount > 0:
+            self.rows += self._cursor.rowcount
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
@@ -0,0 +1,110 @@
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+from contract_pipeline import content_hash
+from run_pipeline import ArchiveProgress, ingest_archive
+from src.data_ingestion.archive import MAX_CONTRACT_NAME, contract_name, decode_contract, is_archive, iter_archive
+
+CONTRACT = '**1. Proeftijd**\r\nEr geldt geen proeftijd. Salaris € 3.000 per maand.\r\n'
+
+
+class TestDecodeContract(unittest.TestCase):
+
+    def test_each_member_encoding_is_recognised(self):
+        expected = CONTRACT.replace('\r\n', '\n')
+        for data in (CONTRACT.encode('utf-8'), CONTRACT.encode('utf-8-sig'), CONTRACT.encode('utf-16'),
+                     CONTRACT.encode('cp1252')):
+            self.assertEqual(decode_contract(data), expected)
+        self.assertEqual(decode_contract(b'caf\xe9 \x81'), 'café \x81')
+        # only the five bytes cp1252 leaves undefined fall back to Latin-1
+        self.assertEqual(decode_contract(b'\x93\x80 3.000\x94 \x96 \x8d'), '“€ 3.000” – \x8d')
+
+
+class TestIterArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.members = {
+            'a.txt': CONTRACT.encode('utf-8'),
+            'export/b.TXT': CONTRACT.encode('cp1252'),
+            'export/notes.md': b'not a contract',
+            '.hidden.txt': b'hidden',
+            '__MACOSX/export/._b.TXT': b'resource fork',
+        }
+
+    def test_zip_members_are_streamed_with_archive_names(self):
+        path = os.path.join(self.tmp.name, 'bundle.zip')
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, data in self.members.items():
+                archive.writestr(name, data)
+        self.assert_contracts(path)
+
+    def test_tar_gz_members_are_streamed_with_archive_names(self):
+        path = os.path.join(self.tmp.name, 'bundle.tar.gz')
+        with tarfile.open(path, 'w:gz') as archive:
+            for name, data in self.members.items():
+                info = tarfile.TarInfo('./' + name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        self.assert_contracts(path)
+
+    def test_long_member_paths_fit_contract_name(self):
+        member = '/'.join(['afdeling'] * 40) + '/contract.txt'
+        name = contract_name('bundle.zip', member)
+        self.assertEqual(len(name), MAX_CONTRACT_NAME)
+        self.assertTrue(name.startswith('bundle.zip/…') and name.endswith('/contract.txt'))
+        self.assertEqual(len(contract_name('x' * 300 + '.zip', 'a.txt')), MAX_CONTRACT_NAME)
+        self.assertEqual(contract_name('bundle.zip', 'a.txt'), 'bundle.zip/a.txt')
+
+    def assert_contracts(self, path):
+        self.assertTrue(is_archive(path))
+        contracts = list(iter_archive(path))
+        self.assertEqual([name for name, _ in contracts], [f'{os.path.basename(path)}/a.txt',
+                                                           f'{os.path.basename(path)}/export/b.TXT'])
+        # same text, and so the same content hash, as the unpacked file read in text mode
+        loose = os.path.join(self.tmp.name, 'a.txt')
+        with open(loose, 'wb') as f:
+            f.write(CONTRACT.encode('utf-8'))
+        with open(loose, 'r', encoding='utf-8') as f:
+            self.assertEqual([text for _, text in contracts], [f.read()] * 2)
+
+
+class TestArchiveIngest(unittest.TestCase):
+
+    def test_archive_is_recorded_once_every_member_is_committed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bundle.zip')
+            with zipfile.ZipFile(path, 'w') as archive:
+                archive.writestr('a.txt', 'eerste contract')
+                archive.writestr('b.txt', 'tweede contract')
+            manifest = mock.Mock()
+            pipeline = mock.Mock()
+
+            progress = ingest_archive(pipeline, path, os.stat(path), manifest)
+            self.assertEqual([call.args[1] for call in pipeline.process_contract.call_args_list],
+                             ['bundle.zip/a.txt', 'bundle.zip/b.txt'])
+            self.assertEqual(progress.members, 2)
+
+            callbacks = [call.kwargs['on_committed'] for call in pipeline.process_contract.call_args_list]
+            callbacks[1]()
+            self.assertFalse(manifest.record.called)
+            callbacks[0]()
+            digest = content_hash(''.join(sorted([content_hash('eerste contract'), content_hash('tweede contract')])))
+            manifest.record.assert_called_once_with(path, digest, progress.stat)
+
+    def test_archive_is_not_recorded_before_it_was_read_to_the_end(self):
+        manifest = mock.Mock()
+        progress = ArchiveProgress(manifest, 'bundle.zip', None)
+        progress.add('abc')()
+        self.assertFalse(manifest.record.called)
+        progress.finish()
+        manifest.record.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import datetime
+import os
+import unittest
+import zlib
+from unittest import mock
+from backfill import MERGE_SQL, STAGING_COLUMNS, BulkLoader, copy_line, copy_value
+from contract_pipeline import CONTRACT_FACT_COLUMNS, Clause, ContractParser, DatabaseManager
+
+SAMPLE_CONTRACT = os.path.join(os.path.dirname(__file__), '..', 'data', 'raw', 'sample_contract.txt')
+
+
+class TestCopyFormat(unittest.TestCase):
+
+    def test_values_are_escaped_for_copy_text_format(self):
+        self.assertEqual(copy_value(None), '\\N')
+        self.assertEqual(copy_value(True), 't')
+        self.assertEqual(copy_value(40), '40')
+        self.assertEqual(copy_value(datetime.date(2025, 10, 1)), '2025-10-01')
+        self.assertEqual(copy_value('a\tb\nc\\d\r'), 'a\\tb\\nc\\\\d\\r')
+        self.assertEqual(copy_value(b'\x00\xff'), '\\\\x00ff')
+        self.assertEqual(copy_line((1, None, 'x')), '1\t\\N\tx\n')
+
+
+class TestBulkLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.copied = {table: [] for table in STAGING_COLUMNS}
+
+        def copy_expert(sql, buffer):
+            table = sql.split()[1]
+            self.copied[table].extend(line.split('\t') for line in buffer.read().splitlines())
+
+        self.loader = BulkLoader({}, merge_every=3, copy_every=2)
+        self.loader.db.conn, self.loader.db.cur = mock.Mock(), mock.Mock()
+        self.loader.db.cur.copy_expert.side_effect = copy_expert
+        self.loader.db.cur.fetchall.return_value = []
+        self.clauses = [
+            Clause('3', 'Gegevens arbeidsovereenkomst', 'a', 'contract_details', {'contract_type': 'permanent'}),
+            Clause('5', 'Arbeidsduur', 'b', 'working_hours', {'hours_per_week': 40}),
+        ]
+
+    def executed(self):
+        return [call.args[0] for call in self.loader.db.cur.execute.call_args_list]
+
+    def test_rows_are_copied_into_staging_tables_with_stage_ids(self):
+        self.loader.add('a.txt', 'first', self.clauses)
+        self.assertFalse(self.loader.db.cur.copy_expert.called)
+        self.loader.add('b.txt', 'second', self.clauses)
+
+        self.assertEqual([row[:2] for row in self.copied['staging_contracts']], [['1', 'a.txt'], ['2', 'b.txt']])
+        self.assertEqual([(row[0], row[4]) for row in self.copied['staging_clauses']],
+                         [('1', 'contract_details'), ('1', 'working_hours'),
+                          ('2', 'contract_details'), ('2', 'working_hours')])
+        self.assertIn(['1', 'working_hours', 'hours_per_week', '40', 'integer', '40', '\\N', '\\N', '\\N'],
+                      self.copied['staging_data_points'])
+        facts = self.copied['staging_contract_facts']
+        self.assertEqual(len(facts[0]), len(CONTRACT_FACT_COLUMNS) + 1)
+        self.assertEqual(facts[0][1 + list(CONTRACT_FACT_COLUMNS).index('hours_per_week')], '40')
+        self.assertFalse(self.loader.db.cur.execute.called)
+
+    def test_merge_runs_set_based_statements_then_callbacks(self):
+        merged = []
+        for number in range(3):
+            self.loader.add(f'{number}.txt', f'text {number}', self.clauses, on_merged=lambda n=number: merged.append(n))
+
+        self.assertEqual(self.executed(), list(MERGE_SQL))
+        self.assertEqual(merged, [0, 1, 2])
+        self.assertEqual(self.loader.merges, 1)
+        self.assertEqual(len(self.copied['staging_contracts']), 3)
+        self.loader.db.conn.commit.assert_called_once()
+
+    def test_duplicate_texts_in_a_batch_are_staged_once(self):
+        merged = []
+        self.loader.add('a.txt', 'same', self.clauses, on_merged=lambda: merged.append('a'))
+        self.loader.add('b.txt', 'same', self.clauses, on_merged=lambda: merged.append('b'))
+        self.loader.merge()
+
+        self.assertEqual(len(self.copied['staging_contracts']), 1)
+        self.assertEqual(self.loader.duplicates, 1)
+        self.assertEqual(merged, ['a', 'b'])
+
+    def test_compressed_text_is_staged_as_bytea(self):
+        self.loader.text_storage = 'compressed'
+        self.loader.add('a.txt', 'tekst', self.clauses)
+        self.loader.copy()
+
+        row = self.copied['staging_contracts'][0]
+        self.assertEqual(row[3:5], ['\\N', '\\N'])
+        self.assertEqual(bytes.fromhex(row[5][3:]), zlib.compress('tekst'.encode('utf-8')))
+
+    def test_span_clauses_are_staged_as_offsets(self):
+        with open(SAMPLE_CONTRACT, 'r', encoding='utf-8') as f:
+            text = f.read()
+        clauses = ContractParser().analyze_contract(text)
+        self.loader.add('a.txt', text, clauses)
+        self.loader.copy()
+
+        content = {clause.clause_type: clause.content for clause in clauses}
+        for row in self.copied['staging_clauses']:
+            self.assertEqual(row[3], '\\N')
+            self.assertEqual(text[int(row[5]):int(row[6])], content[row[4]])
+
+    def test_begin_drops_and_finish_rebuilds_secondary_indexes(self):
+        with mock.patch.object(DatabaseManager, 'connect'), mock.patch.object(DatabaseManager, 'disconnect'):
+            self.loader.begin()
+            self.loader.finish()
+        executed = self.executed()
+        drop = next(i for i, sql in enumerate(executed) if 'DROP INDEX' in sql)
+        rebuild = max(i for i, sql in enumerate(executed) if 'CREATE INDEX IF NOT EXISTS idx_data_points_key' in sql)
+        for name in DatabaseManager.SECONDARY_INDEXES:
+            self.assertIn(f"DROP INDEX IF EXISTS {name};", executed[drop])
+            self.assertRegex(executed[rebuild], rf"INDEX IF NOT EXISTS {name}\s")
+        self.assertLess(drop, rebuild)
+        self.assertTrue(any('DROP TABLE IF EXISTS staging_contracts' in sql for sql in executed[drop:rebuild]))
+
+    def test_keep_indexes_leaves_them_in_place(self):
+        with mock.patch.object(DatabaseManager, 'connect'):
+            self.loader.begin(drop_indexes=False)
+        self.assertFalse(any('DROP INDEX' in sql for sql in self.executed()))
+
+
+if __name__ == '__main__':
+    unittest.main()
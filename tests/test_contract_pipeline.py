@@ -0,0 +1,528 @@
+import datetime
+import io
+import os
+import re
+import time
+import unittest
+import zlib
+from unittest import mock
+from decimal import Decimal
+import psycopg2
+from contract_pipeline import (CLAUSE_TYPES, CONTRACT_FACT_COLUMNS, Clause, ContractParser, ContractPipeline,
+                               DatabaseManager, ExtractionRule, KeywordScanner, bound_pattern, contract_fact_row,
+                               annual_salary, data_key_clause_types, content_hash, parse_amount, parse_date, required_literals)
+from src.utils.metrics import PipelineMetrics
+
+SAMPLE_CONTRACT = os.path.join(os.path.dirname(__file__), '..', 'data', 'raw', 'sample_contract.txt')
+
+
+class TestContractParser(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = ContractParser()
+        with open(SAMPLE_CONTRACT, 'r', encoding='utf-8') as f:
+            self.contract_text = f.read()
+
+    def extract_all(self):
+        extracted = {}
+        for clause in self.parser.analyze_contract(self.contract_text):
+            extracted.setdefault(clause.clause_type, {}).update(clause.extracted_data)
+        return extracted
+
+    def test_classify_clause_matches_pattern_priority(self):
+        headers = [
+            'Gegevens werknemer', 'Proeftijd', 'Loon en vakantietoeslag',
+            'Tussentijdse opzegging arbeidsovereenkomst', 'Overige afspraken',
+            'Ondertekening', 'NOTICE AND LEAVE', 'additional salary terms',
+        ]
+        for header in headers:
+            expected = 'unclassified'
+            for clause_type, pattern in self.parser.clause_patterns.items():
+                if re.search(pattern, header.lower(), re.IGNORECASE):
+                    expected = clause_type
+                    break
+            clause = Clause(section_number='1', header=header, content='')
+            self.assertEqual(self.parser.classify_clause(clause), expected, header)
+
+    def test_iter_clauses_streams_same_clauses_as_parse_contract(self):
+        expected = [(c.section_number, c.header, c.content) for c in self.parser.parse_contract(self.contract_text)]
+        self.assertEqual(len(expected), 12)
+        for source in (io.StringIO(self.contract_text), self.contract_text.encode('utf-8')):
+            streamed = [(c.section_number, c.header, c.content)
+                        for c in self.parser.iter_clauses(source, chunk_size=7)]
+            self.assertEqual(streamed, expected)
+
+    def test_clauses_are_slotted_spans_into_the_contract_text(self):
+        clauses = self.parser.analyze_contract(self.contract_text)
+        self.assertFalse(hasattr(clauses[0], '__dict__'))
+        self.assertTrue(all(clause._source is self.contract_text for clause in clauses))
+        self.assertEqual(clauses[0].content, self.contract_text[clauses[0]._spans[2]:clauses[0]._spans[3]])
+
+        clauses[0].content = 'Er geldt geen proeftijd.'
+        self.assertEqual(clauses[0].content, 'Er geldt geen proeftijd.')
+        data = [clause.extracted_data for clause in clauses if clause.clause_type == 'confidentiality']
+        self.assertEqual(data[0]['confidentiality_required'], True)
+        with self.assertRaises(TypeError):
+            data[0]['confidentiality_required'] = False
+
+    def test_extract_structured_data_sample_contract(self):
+        extracted = self.extract_all()
+        self.assertEqual(extracted['contract_details']['contract_type'], 'fixed_term')
+        self.assertEqual(extracted['contract_details']['start_date'], '1 oktober 2025')
+        self.assertEqual(extracted['contract_details']['end_date'], '30 september 2026')
+        self.assertIs(extracted['contract_details']['cao_applicable'], False)
+        self.assertEqual(extracted['probation'], {'probation_period': 'Yes', 'probation_months': 1})
+        self.assertEqual(extracted['working_hours']['hours_per_week'], 40)
+        self.assertEqual(extracted['working_hours']['work_days'], 'Maandag to Vrijdag')
+        self.assertEqual(extracted['salary'], {'salary_amount': '3.200', 'salary_period': 'monthly'})
+        self.assertEqual(extracted['pension'], {'pension_scheme': 'mandatory', 'pension_fund': 'StiPP'})
+        self.assertEqual(extracted['other']['travel_allowance'], '€0,23')
+
+    def test_extraction_rules_first_match_wins_per_key(self):
+        parser = ContractParser(extraction_rules={
+            'salary': [
+                ExtractionRule('bonus', r'bonus van (\d+)%', lambda m: int(m.group(1))),
+                ExtractionRule('bonus', None, 0),
+            ],
+        })
+        clause = Clause(section_number='1', header='Salaris', content='Bonus van 10% en bonus van 5%',
+                        clause_type='salary')
+        self.assertEqual(parser.extract_structured_data(clause), {'bonus': 10})
+        clause.content = 'Geen bonus'
+        self.assertEqual(parser.extract_structured_data(clause), {'bonus': 0})
+
+    def test_bounded_patterns_extract_the_same_and_stay_linear(self):
+        self.assertEqual(bound_pattern(r'kunnen.*niet\.+[*+]\d+?', 50), r'kunnen.{0,50}niet\.{1,50}[*+]\d{1,50}?')
+        expected = self.extract_all()
+        self.parser = ContractParser(max_repeat=200)
+        self.assertEqual(self.extract_all(), expected)
+
+        clause = Clause(section_number='1', header='Opzegging', content='Partijen kunnen niet ' * 5000,
+                        clause_type='termination')
+        self.assertEqual(self.parser.extract_structured_data(clause), {})
+
+    def test_time_budget_records_skipped_rules(self):
+        parser = ContractParser(time_budget_ms=0)
+        clause = Clause(section_number='1', header='Pensioen', content='Er is geen pensioenregeling.',
+                        clause_type='pension')
+        self.assertEqual(parser.extract_structured_data(clause), {})
+        self.assertEqual(clause.skipped_rules, ['pension_scheme#0', 'pension_scheme#1', 'pension_scheme#2',
+                                                'pension_fund#3'])
+
+    def test_time_budget_stops_a_long_search(self):
+        parser = ContractParser(max_repeat=200, time_budget_ms=5)
+        clause = Clause(section_number='1', header='Indiensttreding',
+                        content='treedt op in dienst start from 12 ' * 2000, clause_type='contract_details')
+        start = time.perf_counter()
+        parser.extract_structured_data(clause)
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertIn('start_date#3', clause.skipped_rules)
+
+        # without running out, a windowed search finds what a plain search finds
+        parser = ContractParser(time_budget_ms=10000)
+        parser.SEARCH_WINDOW = 16
+        clause.content = 'Het contract gaat in per ' + 'x' * 100 + ' en treedt op 1 januari 2024 in werking.'
+        self.assertEqual(parser.extract_structured_data(clause)['start_date'], '1 januari 2024')
+
+    def test_pension_fund_is_the_run_of_capitalized_words_before_the_fund(self):
+        for content, fund in [('Deelname aan Stichting Bouw Pensioenfonds.', 'Stichting Bouw'),
+                              ('Werknemer valt onder xABP Pensioenfonds.', 'ABP'),
+                              ('Werknemer neemt deel aan het Pensioenfonds.', None),
+                              # looks back at most 100 characters
+                              ('Aa ' * 100 + 'PFZW Pensioenfonds', ' '.join(['Aa'] * 33 + ['PFZW']))]:
+            clause = Clause(section_number='1', header='Pensioen', content=content, clause_type='pension')
+            self.assertEqual(self.parser.extract_structured_data(clause).get('pension_fund'), fund)
+
+    def test_required_literals_of_each_alternative(self):
+        self.assertEqual(required_literals(r'(\d+)\s+vakantiedagen|(\d+)\s+Vacation days'),
+                         {'vakantiedagen', 'vacation days'})
+        self.assertEqual(required_literals(r'tegen.*einde.*maand|end of.*month'), {'tegen', 'end of'})
+        self.assertEqual(required_literals(r't\/m [a-z]+|non-compete?'), {'t/m ', 'non-compet'})
+        self.assertEqual(required_literals(r'\bfulltime\b'), {'fulltime'})
+        # an alternative without a literal outside groups can match anything
+        self.assertIsNone(required_literals(r'(?:tot|to)\s+(\d{4})'))
+        self.assertIsNone(required_literals(r'laptop|\d+'))
+
+    def test_keyword_scanner_finds_words_ignoring_case(self):
+        scanner = KeywordScanner(['bedrijf', 'bedrijfsvoering', 'company'])
+        self.assertEqual(scanner.scan('Informatie over de BEDRIJFSVOERING'), {'bedrijf', 'bedrijfsvoering'})
+        self.assertEqual(scanner.scan('het bedrijf en haar klanten'), {'bedrijf'})
+        self.assertEqual(scanner.scan('customers'), set())
+
+    def test_rules_without_trigger_words_in_the_clause_are_not_searched(self):
+        metrics = PipelineMetrics()
+        parser = ContractParser(metrics=metrics)
+        clause = Clause(section_number='9', header='Overige bepalingen', clause_type='other',
+                        content='De werknemer ontvangt een laptop. ' + 'Overige afspraken. ' * 500)
+
+        self.assertEqual(parser.extract_structured_data(clause), {'laptop_provided': True})
+        self.assertEqual([rule for _, rule in metrics.rules], ['laptop_provided#3'])
+
+
+class TestContractPipeline(unittest.TestCase):
+
+    def test_summary_is_built_from_clauses(self):
+        clauses = [
+            Clause('3', 'Gegevens arbeidsovereenkomst', 'a', 'contract_details', {'contract_type': 'permanent'}),
+            Clause('7', 'Vakantiedagen', 'b', 'vacation', {'vacation_days': 25, 'vacation_hours': 200}),
+            Clause('8', 'Geheimhouding', 'c', 'confidentiality', {'confidentiality_required': True}),
+            Clause('12', 'Ondertekening', 'd', 'unclassified', {}),
+        ]
+        summary = ContractPipeline.build_summary('contract.txt', clauses)
+        self.assertEqual(summary['contract_name'], 'contract.txt')
+        self.assertEqual(summary['total_clauses'], 4)
+        self.assertEqual(summary['summary'], {
+            'contract_details': {'count': 1, 'data': [{'contract_type': 'permanent'}]},
+            'vacation': {'count': 1, 'data': [{'vacation_days': '25', 'vacation_hours': '200'}]},
+            'confidentiality': {'count': 1, 'data': [{'confidentiality_required': 'true'}]},
+        })
+
+
+class TestDatabaseManager(unittest.TestCase):
+
+    def test_insert_clauses_sends_one_statement_per_table(self):
+        db = DatabaseManager({}, batch_size=500)
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        clauses = [
+            Clause('3', 'Gegevens arbeidsovereenkomst', 'a', 'contract_details', {'contract_type': 'permanent'}),
+            Clause('7', 'Vakantiedagen', 'b', 'vacation', {'vacation_days': 25, 'vacation_hours': 200}),
+            Clause('9', 'Opzegging arbeidsovereenkomst', 'c', 'contract_details', {'contract_type': 'fixed_term'}),
+        ]
+        with mock.patch('contract_pipeline.execute_values') as execute_values:
+            db.insert_clauses(42, clauses)
+
+        self.assertEqual(execute_values.call_count, 3)
+        (_, clause_sql, clause_rows), clause_kwargs = execute_values.call_args_list[0]
+        (_, data_sql, data_rows), _ = execute_values.call_args_list[1]
+        (_, facts_sql, facts_rows), _ = execute_values.call_args_list[2]
+        self.assertIn('INSERT INTO clauses', clause_sql)
+        self.assertEqual(clause_kwargs['page_size'], 500)
+        self.assertEqual([row[1] for row in clause_rows], ['9', '7'])
+        self.assertIn('INSERT INTO data_points', data_sql)
+        self.assertIn((42, 'contract_details', 'contract_type', 'fixed_term', 'string', None, None, None, None),
+                      data_rows)
+        self.assertIn((42, 'vacation', 'vacation_days', '25', 'integer', 25, None, None, None), data_rows)
+        self.assertEqual(len(data_rows), 3)
+        self.assertIn('INSERT INTO contract_facts', facts_sql)
+        self.assertEqual(len(facts_rows), 1)
+        db.conn.commit.assert_called_once()
+
+    def test_data_point_rows_fill_one_typed_column(self):
+        rows = DatabaseManager._data_point_rows(1, 'contract_details', {
+            'cao_applicable': False, 'start_date': '1 oktober 2025', 'end_date': '30-09-2026',
+            'job_title': 'data engineer', 'fte': 0.8,
+        })
+        self.assertEqual([row[4:] for row in rows], [
+            ('boolean', None, None, False, None),
+            ('date', None, None, None, datetime.date(2025, 10, 1)),
+            ('date', None, None, None, datetime.date(2026, 9, 30)),
+            ('string', None, None, None, None),
+            ('float', None, 0.8, None, None),
+        ])
+        self.assertIsNone(parse_date('31 februari 2025'))
+
+    def test_contract_fact_row_has_one_typed_column_per_key(self):
+        rows = DatabaseManager._data_point_rows(5, 'salary', {'salary_amount': '3.200', 'salary_period': 'monthly'})
+        rows += DatabaseManager._data_point_rows(5, 'working_hours', {'hours_per_week': 32})
+        facts = dict(zip(['contract_id', *CONTRACT_FACT_COLUMNS], contract_fact_row(5, rows)))
+        self.assertEqual(facts['contract_id'], 5)
+        self.assertEqual(facts['salary_amount'], Decimal('3200'))
+        self.assertEqual(facts['salary_period'], 'monthly')
+        self.assertEqual(facts['hours_per_week'], 32)
+        self.assertIsNone(facts['probation_months'])
+        self.assertEqual(facts['annual_salary_eur'], Decimal('38400.00'))
+        self.assertEqual([parse_amount(text) for text in ('3,200.50', '3.200,50', '€0,23', 'n.v.t.', '3.200,-',
+                                                          '3.200,50.')],
+                         [Decimal('3200.50'), Decimal('3200.50'), Decimal('0.23'), None, Decimal('3200'),
+                          Decimal('3200.50')])
+
+    def test_every_extracted_key_has_a_fact_column(self):
+        self.assertEqual(set(data_key_clause_types()) - set(CONTRACT_FACT_COLUMNS), set())
+        rows = DatabaseManager._data_point_rows(5, 'other', {'laptop_provided': True, 'expense_allowance': True})
+        facts = dict(zip(['contract_id', *CONTRACT_FACT_COLUMNS], contract_fact_row(5, rows)))
+        self.assertIs(facts['laptop_provided'], True)
+        self.assertIsNone(facts['travel_allowance_available'])
+
+        db = DatabaseManager({})
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        db.cur.fetchall.return_value = []
+        db.rebuild_contract_facts(refresh=True)
+        self.assertNotIn('NOT EXISTS', db.cur.execute.call_args_list[0].args[0])
+
+    def test_annual_salary_by_pay_period(self):
+        self.assertEqual(annual_salary(Decimal('3200'), 'monthly'), Decimal('38400.00'))
+        self.assertEqual(annual_salary(Decimal('52000'), 'yearly'), Decimal('52000.00'))
+        self.assertEqual(annual_salary(Decimal('800.10'), 'weekly'), Decimal('41605.20'))
+        self.assertEqual(annual_salary(Decimal('23.505'), 'hourly', 36), Decimal('44001.36'))
+        self.assertIsNone(annual_salary(Decimal('23.50'), 'hourly', None))
+        self.assertIsNone(annual_salary(Decimal('3200'), None))
+        self.assertIsNone(annual_salary(None, 'monthly'))
+
+    def test_normalize_contract_facts_derives_stored_rows_in_one_update(self):
+        db = DatabaseManager({})
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        db.cur.rowcount = 7
+        self.assertEqual(db.normalize_contract_facts(), 7)
+        sql = db.cur.execute.call_args.args[0]
+        self.assertIn("SET annual_salary_eur = ROUND(salary_amount * CASE salary_period WHEN 'yearly' THEN 1 "
+                      "WHEN 'monthly' THEN 12", sql)
+        self.assertIn("NULLIF(hours_per_week, 0)", sql)
+        db.conn.commit.assert_called_once()
+
+    def test_compare_data_points_orders_by_typed_column(self):
+        db = DatabaseManager({})
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        db.cur.fetchall.return_value = []
+        db.cur.description = []
+        db.compare_data_points('vacation_days', limit=10)
+
+        # the column comes from the key's declared type, not from probing a stored row
+        db.cur.execute.assert_called_once()
+        sql, params = db.cur.execute.call_args[0]
+        self.assertIn('dp.value_int IS NOT NULL', sql)
+        self.assertIn('ORDER BY dp.value_int DESC, dp.contract_id', sql)
+        self.assertNotIn('::INTEGER', sql)
+        self.assertEqual(params, ('vacation_days', 10))
+        db.compare_data_points('start_date')
+        self.assertIn('ORDER BY dp.value_date DESC', db.cur.execute.call_args[0][0])
+        db.compare_data_points('job_title')
+        self.assertIn('ORDER BY ct.contract_name', db.cur.execute.call_args[0][0])
+
+    def test_data_points_of_a_key_share_its_declared_typed_column(self):
+        rows = DatabaseManager._data_point_rows(1, 'probation', {'probation_period': 'Unknown',
+                                                                 'probation_months': None})
+        self.assertEqual([row[2:] for row in rows],
+                         [('probation_period', 'Unknown', 'string', None, None, None, None)])
+        rows = DatabaseManager._data_point_rows(1, 'contract_details', {'start_date': 'per direct'})
+        self.assertEqual(rows[0][4:], ('string', None, None, None, None))
+        rows = DatabaseManager._data_point_rows(1, 'salary', {'salary_amount': '3.200'})
+        self.assertEqual(rows[0][4:], ('string', None, Decimal('3200'), None, None))
+
+    def test_backfill_typed_values_follows_declared_types(self):
+        db = DatabaseManager({})
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        db.cur.rowcount = 2
+        db.cur.fetchall.return_value = [(1, 'salary', 'salary_amount', '3.200,50'),
+                                        (1, 'contract_details', 'start_date', '1 oktober 2025'),
+                                        (1, 'contract_details', 'end_date', 'onbekend')]
+        with mock.patch('contract_pipeline.execute_values') as execute_values:
+            self.assertEqual(db.backfill_typed_values(), 6)
+        delete_sql, (keys,) = db.cur.execute.call_args_list[0].args
+        self.assertIn("DELETE FROM data_points WHERE data_value = 'None'", delete_sql)
+        self.assertIn('probation_months', keys)
+        self.assertNotIn('pension_scheme', keys)  # 'None' is a real pension_scheme value
+        self.assertEqual(execute_values.call_args.args[2], [
+            (Decimal('3200.50'), None, 1, 'salary', 'salary_amount'),
+            (None, datetime.date(2025, 10, 1), 1, 'contract_details', 'start_date'),
+        ])
+
+    def test_clause_content_is_stored_as_offsets_and_rebuilt(self):
+        text = '**1. Proeftijd**\nEr geldt geen proeftijd.\n\n**2. Vakantiedagen**\n25 vakantiedagen.'
+        clauses = ContractParser().analyze_contract(text)
+        clause_rows, _ = DatabaseManager.contract_rows(9, clauses)
+        self.assertEqual([row[3] for row in clause_rows], [None, None])
+        spans = [row[5:] for row in clause_rows]
+        self.assertEqual([text[start:end] for start, end in spans], [clause.content for clause in clauses])
+
+        db = DatabaseManager({}, text_storage='compressed')
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        db.cur.fetchone.return_value = (9,)
+        db.insert_contract('contract.txt', text)
+        sql, params = db.cur.execute.call_args[0]
+        self.assertIn('INSERT INTO contract_texts', sql)
+        self.assertEqual(zlib.decompress(params[3]).decode('utf-8'), text)
+
+        db.cur.fetchall.side_effect = [
+            [(row[4], None, *row[5:]) for row in clause_rows],
+            [(9, None, None, params[3])],
+        ]
+        self.assertEqual(db.get_clause_texts(9), {clause.clause_type: clause.content for clause in clauses})
+
+    def test_query_cache_serves_repeats_until_a_write(self):
+        db = DatabaseManager({}, query_cache_size=2)
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        db.cur.description = [('contract_name',)]
+        db.cur.fetchall.return_value = [('a.txt',)]
+        first = db.get_contract_facts([1, 2])
+        self.assertIs(db.get_contract_facts([1, 2]), first)
+        self.assertEqual(db.cur.execute.call_count, 1)
+
+        db.mark_contract_processed(3)
+        db.get_contract_facts([1, 2])
+        self.assertEqual(db.cur.execute.call_count, 3)
+
+    def test_query_cache_entries_expire(self):
+        # another writer's changes are not seen by the cache until its entries expire
+        db = DatabaseManager({}, query_cache_size=2, query_cache_ttl=30)
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        db.cur.description = [('contract_name',)]
+        db.cur.fetchall.return_value = [('a.txt',)]
+        with mock.patch('contract_pipeline.time.monotonic', side_effect=[100.0, 129.0, 131.0, 132.0]):
+            db.get_contract_facts([1])
+            db.get_contract_facts([1])
+            self.assertEqual(db.cur.execute.call_count, 1)
+            db.get_contract_facts([1])
+            self.assertEqual(db.cur.execute.call_count, 2)
+            db.get_contract_facts([1])
+            self.assertEqual(db.cur.execute.call_count, 2)
+
+    def test_contract_transaction_commits_once_per_contract(self):
+        db = DatabaseManager({})
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        committed = []
+        with db.contract_transaction(on_commit=lambda: committed.append(1)):
+            db.mark_contract_processed(1)
+            db.mark_contract_processed(1)
+        self.assertEqual(db.conn.commit.call_count, 1)
+        self.assertEqual(committed, [1])
+
+    def test_group_commit_keeps_earlier_contracts_when_one_fails(self):
+        db = DatabaseManager({}, group_commit_size=3)
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        committed = []
+        with db.contract_transaction(on_commit=lambda: committed.append(1)):
+            db.mark_contract_processed(1)
+        with self.assertRaises(RuntimeError):
+            with db.contract_transaction(on_commit=lambda: committed.append(2)):
+                raise RuntimeError('bad contract')
+        with db.contract_transaction(on_commit=lambda: committed.append(3)):
+            db.mark_contract_processed(3)
+        self.assertEqual(committed, [])
+        db.commit()
+
+        self.assertEqual(committed, [1, 3])
+        db.cur.execute.assert_any_call('ROLLBACK TO SAVEPOINT contract')
+        db.conn.rollback.assert_not_called()
+
+    @mock.patch('contract_pipeline.psycopg2.extensions', create=True,
+                new=mock.Mock(TRANSACTION_STATUS_IDLE=0, TRANSACTION_STATUS_INTRANS=2))
+    def test_group_lost_with_the_connection_or_a_failed_commit(self):
+        pipeline = ContractPipeline({}, pool=mock.Mock(), group_commit_size=3)
+        db = pipeline.db
+        db.conn, db.cur = mock.Mock(closed=0), mock.Mock()
+        db.conn.get_transaction_status.return_value = 2
+        committed = []
+        with db.contract_transaction(on_commit=lambda: committed.append(1)):
+            db.mark_contract_processed(1)
+        self.assertFalse(pipeline.recover())  # a contract rolled back to its savepoint
+
+        db.conn.commit.side_effect = psycopg2.OperationalError('could not serialize access')
+        db.conn.get_transaction_status.return_value = 0
+        with self.assertRaises(psycopg2.OperationalError):
+            pipeline.flush()
+        conn = db.conn
+        self.assertTrue(pipeline.recover())
+        pipeline.pool.putconn.assert_called_once_with(conn)
+        self.assertIsNone(db.conn)
+        self.assertEqual((db._pending_contracts, db._on_commit, committed), (0, [], []))
+
+        for closed, status in [(1, 2), (0, 3)]:  # connection gone, transaction aborted
+            db.conn, db.cur = mock.Mock(closed=closed), mock.Mock()
+            db.conn.get_transaction_status.return_value = status
+            self.assertTrue(pipeline.recover())
+
+    def test_idle_group_is_committed_once_its_deadline_passes(self):
+        db = DatabaseManager({}, group_commit_size=100, group_commit_interval_ms=200)
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        committed = []
+        with mock.patch('contract_pipeline.time.monotonic', side_effect=[10.0, 10.0, 10.1, 10.25]):
+            with db.contract_transaction(on_commit=lambda: committed.append(1)):
+                db.mark_contract_processed(1)
+            self.assertFalse(db.flush_if_due())
+            self.assertEqual(committed, [])
+            self.assertTrue(db.flush_if_due())
+        self.assertEqual(committed, [1])
+        db.conn.commit.assert_called_once()
+        self.assertFalse(db.flush_if_due())
+
+    def test_hash_partitioning_creates_partitions_per_table(self):
+        db = DatabaseManager({}, partitioning='hash', hash_partitions=4)
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        db.cur.fetchone.return_value = None
+        db.cur.fetchall.return_value = []
+        db.initialize_schema()
+        schema_sql = next(call.args[0] for call in db.cur.execute.call_args_list if 'CREATE TABLE' in call.args[0])
+
+        self.assertEqual(schema_sql.count('PARTITION BY HASH (contract_id)'), 2)
+        for table in ('clauses', 'data_points'):
+            for remainder in range(4):
+                self.assertIn(f"CREATE TABLE IF NOT EXISTS {table}_p{remainder} PARTITION OF {table} "
+                              f"FOR VALUES WITH (MODULUS 4, REMAINDER {remainder});", schema_sql)
+
+    def test_schema_upgrade_hashes_contracts_stored_without_content_hash(self):
+        self.assertEqual(content_hash('regel 1\r\nregel 2\rregel 3\n'), content_hash('regel 1\nregel 2\nregel 3\n'))
+        db = DatabaseManager({}, batch_size=2)
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        db.cur.fetchone.return_value = None
+        text = 'Er geldt geen proeftijd.\n'
+        compressed = [(4, zlib.compress(text.encode('utf-8'))), (6, zlib.compress(b'ander contract'))]
+        db.cur.fetchall.side_effect = [compressed, [(9, zlib.compress(text.encode('utf-8')))], []]
+        with mock.patch('contract_pipeline.execute_values') as execute_values:
+            db.initialize_schema()
+
+        # existing rows get their hash before the unique index is built, identical texts only once
+        schema_sql = db.cur.execute.call_args_list[0].args[0]
+        backfill = schema_sql.index('UPDATE contracts ct SET content_hash = h.digest')
+        self.assertLess(schema_sql.index('ADD COLUMN IF NOT EXISTS content_hash'), backfill)
+        self.assertLess(backfill, schema_sql.index('CREATE UNIQUE INDEX IF NOT EXISTS idx_contracts_content_hash'))
+        self.assertIn("DISTINCT ON (digest)", schema_sql)
+        self.assertIn("regexp_replace(COALESCE(c.raw_text, tx.raw_text), E'\\r\\n?', E'\\n', 'g')", schema_sql)
+        # compressed texts are hashed in Python, in batches after the last contract_id seen
+        self.assertEqual([call.args[2] for call in execute_values.call_args_list],
+                         [[(content_hash(text), 4), (content_hash('ander contract'), 6)]])
+        self.assertEqual(db.cur.execute.call_args_list[2].args[1], (6, 2))
+        db.conn.commit.assert_called_once()
+
+    def test_clause_type_partitioning_has_a_partition_per_type(self):
+        db = DatabaseManager({}, partitioning='clause_type')
+        schema_sql = db._clause_tables_sql()
+        self.assertEqual(schema_sql.count('PARTITION BY LIST (clause_type)'), 2)
+        for clause_type in CLAUSE_TYPES:
+            self.assertIn(f"data_points_{clause_type} PARTITION OF data_points FOR VALUES IN ('{clause_type}')",
+                          schema_sql)
+        self.assertIn("clauses_default PARTITION OF clauses DEFAULT", schema_sql)
+        self.assertNotIn('PARTITION', DatabaseManager({})._clause_tables_sql())
+        with self.assertRaises(ValueError):
+            DatabaseManager({}, partitioning='range')
+
+    def test_plain_tables_are_migrated_not_silently_kept(self):
+        db = DatabaseManager({}, partitioning='hash', hash_partitions=2)
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        db.cur.fetchone.return_value = ('r',)
+        db.cur.fetchall.return_value = []
+        with self.assertRaises(RuntimeError):
+            db.initialize_schema()
+
+        db.cur.fetchone.side_effect = [('r',), ('p',)]
+        self.assertTrue(db.migrate_partitioning())
+        migration = next(call.args[0] for call in db.cur.execute.call_args_list if 'LOCK TABLE' in call.args[0])
+        steps = ['CREATE TABLE IF NOT EXISTS clauses_partitioned', 'clauses_p1 PARTITION OF clauses_partitioned',
+                 'INSERT INTO clauses_partitioned', 'INSERT INTO data_points_partitioned', 'DROP TABLE clauses',
+                 'ALTER TABLE clauses_partitioned RENAME TO clauses']
+        self.assertEqual(sorted(steps, key=migration.index), steps)
+        self.assertTrue(any('CREATE INDEX IF NOT EXISTS idx_data_points_key' in call.args[0]
+                            for call in db.cur.execute.call_args_list[-2:]))
+        db.conn.commit.assert_called_once()
+
+        db.cur.fetchone.side_effect = [('p',)]
+        self.assertFalse(db.migrate_partitioning())
+
+    def test_key_lookups_name_clause_types_for_partition_pruning(self):
+        self.assertEqual(data_key_clause_types()['salary_amount'], ('salary',))
+        db = DatabaseManager({}, partitioning='clause_type')
+        db.conn, db.cur = mock.Mock(), mock.Mock()
+        db.cur.fetchall.return_value = []
+        db.get_all_data_points_by_key('notice_period_weeks')
+        sql, params = db.cur.execute.call_args.args
+        self.assertIn('dp.clause_type = ANY(%s)', sql)
+        self.assertEqual(params, ('notice_period_weeks', ['termination']))
+
+        db.partitioning = 'hash'
+        db.get_all_data_points_by_key('notice_period_weeks')
+        sql, params = db.cur.execute.call_args.args
+        self.assertNotIn('ANY', sql)
+        self.assertEqual(params, ('notice_period_weeks',))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from unittest import mock
+import psycopg2
+from src.utils.database_connection import ConnectionPool
+
+
+def fake_connect(**params):
+    conn = mock.MagicMock()
+    conn.closed = 0
+    return conn
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def test_returned_connection_is_reused(self):
+        connect = mock.Mock(side_effect=fake_connect)
+        pool = ConnectionPool({'dbname': 'contracts'}, max_size=2, connect=connect)
+
+        first = pool.getconn()
+        pool.putconn(first)
+        second = pool.getconn()
+
+        self.assertIs(first, second)
+        connect.assert_called_once_with(dbname='contracts')
+
+    def test_expired_connection_is_replaced(self):
+        pool = ConnectionPool({}, max_size=1, max_lifetime=0, connect=fake_connect)
+
+        first = pool.getconn()
+        pool.putconn(first)
+        second = pool.getconn()
+
+        self.assertIsNot(first, second)
+        first.close.assert_called_once()
+
+    def test_idle_connection_failing_health_check_is_replaced(self):
+        pool = ConnectionPool({}, max_size=1, health_check_interval=0, connect=fake_connect)
+        first = pool.getconn()
+        pool.putconn(first)
+        first.cursor.return_value.__enter__.return_value.execute.side_effect = psycopg2.OperationalError()
+
+        second = pool.getconn()
+
+        self.assertIsNot(first, second)
+
+    def test_getconn_times_out_when_exhausted(self):
+        pool = ConnectionPool({}, max_size=1, connect_timeout=0.01, connect=fake_connect)
+        pool.getconn()
+        with self.assertRaises(TimeoutError):
+            pool.getconn()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import datetime
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest import mock
+import numpy as np
+from fact_snapshot import FactSnapshot
+
+KEYS = ['salary_amount', 'hours_per_week', 'contract_type', 'start_date', 'company_car']
+ROWS = [
+    (3, Decimal('3200.50'), 40, 'permanent', datetime.date(2025, 1, 1), True),
+    (5, None, 32, 'fixed_term', None, None),
+    (8, Decimal('4100'), None, 'permanent', datetime.date(2024, 5, 1), False),
+    (9, Decimal('2800'), 24, None, None, False),
+    (11, Decimal('5000'), 36, 'permanent', None, True),
+]
+
+
+class TestFactSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = FactSnapshot.from_rows(KEYS, [ROWS[:2], ROWS[2:]])
+
+    def test_columns_are_aligned_by_contract_id_with_null_masks(self):
+        self.assertEqual(self.snapshot.contract_ids.tolist(), [3, 5, 8, 9, 11])
+        salary = self.snapshot.columns['salary_amount']
+        self.assertEqual(salary.values.dtype, np.float64)
+        self.assertEqual(salary.mask.tolist(), [False, True, False, False, False])
+        contract_type = self.snapshot.columns['contract_type']
+        self.assertEqual(contract_type.categories.tolist(), ['permanent', 'fixed_term'])
+        self.assertEqual(contract_type.values.tolist(), [0, 1, 0, -1, 0])
+        self.assertEqual(self.snapshot.columns['start_date'].values[0], np.datetime64('2025-01-01'))
+        with self.assertRaises(ValueError):
+            FactSnapshot.from_rows(['salary'], [])
+
+    def test_statistics_ignore_nulls(self):
+        salaries = [3200.5, 4100, 2800, 5000]
+        self.assertEqual(self.snapshot.count('salary_amount'), 4)
+        self.assertAlmostEqual(self.snapshot.mean('salary_amount'), np.mean(salaries))
+        self.assertEqual(self.snapshot.percentiles('salary_amount', (10, 50)),
+                         dict(zip((10, 50), np.percentile(salaries, (10, 50)).tolist())))
+        counts, edges = self.snapshot.histogram('hours_per_week', bins=2, range=(20, 40))
+        self.assertEqual(counts.tolist(), [1, 3])
+        self.assertEqual(self.snapshot.mean('company_car'), 0.5)
+        self.assertEqual(self.snapshot.value_counts('contract_type'), {'permanent': 3, 'fixed_term': 1})
+        with self.assertRaises(TypeError):
+            self.snapshot.mean('contract_type')
+
+    def test_group_by_and_where(self):
+        groups = self.snapshot.group_by('contract_type', 'salary_amount', q=(25, 50))
+        permanent = [3200.5, 4100, 5000]
+        self.assertEqual(list(groups), ['permanent'])
+        self.assertEqual(groups['permanent']['count'], 3)
+        self.assertAlmostEqual(groups['permanent']['mean'], np.mean(permanent))
+        self.assertEqual([groups['permanent']['p25'], groups['permanent']['p50']],
+                         np.percentile(permanent, (25, 50)).tolist())
+
+        fulltime = self.snapshot.matches('hours_per_week', 36, 40)
+        self.assertEqual(fulltime.tolist(), [True, False, False, False, True])
+        self.assertEqual(self.snapshot.mean('salary_amount', where=fulltime), 4100.25)
+        self.assertEqual(self.snapshot.group_by('contract_type', 'hours_per_week', q=(),
+                                                where=self.snapshot.matches('contract_type', 'fixed_term')),
+                         {'fixed_term': {'count': 1, 'mean': 32.0}})
+
+    def test_npz_cache_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache', 'facts.npz')
+            self.snapshot.save(path)
+            loaded = FactSnapshot.load(path)
+            self.assertEqual(loaded.group_by('contract_type', 'salary_amount'),
+                             self.snapshot.group_by('contract_type', 'salary_amount'))
+            self.assertEqual(loaded.columns['start_date'].mask.tolist(), [False, True, False, True, True])
+
+            db = mock.Mock()
+            with mock.patch.object(FactSnapshot, 'from_database') as from_database:
+                self.assertEqual(len(FactSnapshot.cached(db, path, ['salary_amount', 'contract_type'])), 5)
+                self.assertFalse(from_database.called)
+                # a key the cache does not hold, or an expired cache, is reloaded
+                from_database.return_value = self.snapshot
+                FactSnapshot.cached(db, path, ['vacation_days'])
+                FactSnapshot.cached(db, path, KEYS, max_age=-1)
+                self.assertEqual(from_database.call_count, 2)
+
+    def test_from_database_fetches_in_batches_through_a_named_cursor(self):
+        db = mock.MagicMock()
+        cursor = db.conn.cursor.return_value.__enter__.return_value
+        cursor.fetchmany.side_effect = [ROWS[:3], ROWS[3:], []]
+        snapshot = FactSnapshot.from_database(db, KEYS, fetch_size=3)
+
+        db.conn.cursor.assert_called_once_with(name='fact_snapshot')
+        self.assertEqual(cursor.execute.call_args.args[0],
+                         f"SELECT contract_id, {', '.join(KEYS)} FROM contract_facts ORDER BY contract_id")
+        self.assertEqual(snapshot.contract_ids.tolist(), [3, 5, 8, 9, 11])
+        db.commit.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from src.data_ingestion.inbox import InboxWatcher
+
+
+def write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+class InboxWatcherTests:
+    use_inotify = None
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.inbox = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def watcher(self, **kwargs):
+        watcher = InboxWatcher([self.inbox], settle_seconds=0.05, poll_interval=0.02,
+                               use_inotify=self.use_inotify, **kwargs)
+        self.addCleanup(watcher.close)
+        return watcher
+
+    def poll_until(self, watcher, seconds=2.0):
+        deadline = time.monotonic() + seconds
+        ready = []
+        while time.monotonic() < deadline and not ready:
+            ready = watcher.poll()
+        return ready
+
+    def test_files_present_at_start_are_reported(self):
+        write(os.path.join(self.inbox, 'a.txt'), 'contract')
+        watcher = self.watcher()
+        self.assertEqual(self.poll_until(watcher), [os.path.join(self.inbox, 'a.txt')])
+
+    def test_new_file_is_reported_once_after_it_settles(self):
+        watcher = self.watcher()
+        path = os.path.join(self.inbox, 'b.txt')
+        write(path, 'first half')
+        self.assertEqual(watcher.poll(timeout=0.01), [])
+        self.assertEqual(self.poll_until(watcher), [path])
+        self.assertEqual(watcher.poll(timeout=0.1), [])
+
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(' and a change')
+        self.assertEqual(self.poll_until(watcher), [path])
+
+    def test_partial_and_hidden_files_are_ignored_until_renamed(self):
+        watcher = self.watcher()
+        partial = os.path.join(self.inbox, 'c.txt.part')
+        write(partial, 'contract')
+        write(os.path.join(self.inbox, '.d.txt'), 'contract')
+        write(os.path.join(self.inbox, 'notes.md'), 'notes')
+        self.assertEqual(self.poll_until(watcher, seconds=0.3), [])
+
+        os.rename(partial, os.path.join(self.inbox, 'c.txt'))
+        self.assertEqual(self.poll_until(watcher), [os.path.join(self.inbox, 'c.txt')])
+
+    def test_landing_time_is_when_the_file_was_first_seen(self):
+        watcher = self.watcher()
+        path = os.path.join(self.inbox, 'e.txt')
+        write(path, 'contract')
+        os.utime(path, (0, 0))  # copied with its original mtime, e.g. cp -p
+        before = time.time()
+        self.assertEqual(self.poll_until(watcher), [path])
+        self.assertGreaterEqual(watcher.landed_at(path), before - 0.1)
+
+    def test_files_moved_away_are_forgotten(self):
+        path = os.path.join(self.inbox, 'f.txt')
+        write(path, 'contract')
+        watcher = self.watcher()
+        self.assertEqual(self.poll_until(watcher), [path])
+        os.remove(path)
+        self.assertEqual(self.poll_until(watcher, seconds=0.2), [])
+        self.assertEqual(watcher._reported, {})
+
+
+class TestPollingInboxWatcher(InboxWatcherTests, unittest.TestCase):
+    use_inotify = False
+
+    def test_mode(self):
+        self.assertEqual(self.watcher().mode, 'polling')
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'inotify is Linux only')
+class TestInotifyInboxWatcher(InboxWatcherTests, unittest.TestCase):
+    use_inotify = True
+
+    def test_mode(self):
+        self.assertEqual(self.watcher().mode, 'inotify')
+
+    def test_missed_events_are_found_by_rescanning(self):
+        for overflowed in (True, False):
+            watcher = self.watcher()
+            if overflowed:
+                watcher._last_scan = float('inf')  # no periodic rescan: only the overflow finds the file
+            # events lost in a burst: overflow is reported, or nothing at all
+            watcher._inotify.read = lambda timeout, overflowed=overflowed: time.sleep(timeout) or ([], overflowed)
+            path = os.path.join(self.inbox, f'burst-{overflowed}.txt')
+            write(path, 'contract')
+            self.assertEqual(self.poll_until(watcher), [path])
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
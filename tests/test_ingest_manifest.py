@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+from src.data_ingestion.manifest import IngestManifest
+
+
+class TestIngestManifest(unittest.TestCase):
+
+    def test_unchanged_file_is_recognised_after_reload(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            contract = os.path.join(tmp, 'contract.txt')
+            with open(contract, 'w', encoding='utf-8') as f:
+                f.write('**1. Proeftijd**\nEr geldt geen proeftijd.')
+            manifest_path = os.path.join(tmp, 'state', 'manifest.json')
+
+            manifest = IngestManifest(manifest_path)
+            self.assertFalse(manifest.is_unchanged(contract))
+            manifest.record(contract, 'abc123')
+            manifest.save()
+
+            reloaded = IngestManifest(manifest_path)
+            self.assertTrue(reloaded.is_unchanged(contract))
+
+            with open(contract, 'a', encoding='utf-8') as f:
+                f.write('\nGewijzigd.')
+            self.assertFalse(reloaded.is_unchanged(contract))
+
+
+if __name__ == '__main__':
+    unittest.main()
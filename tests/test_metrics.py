@@ -0,0 +1,52 @@
+import os
+import pickle
+import unittest
+from unittest import mock
+from contract_pipeline import ContractParser
+from src.utils.metrics import CountingCursor, PipelineMetrics
+
+SAMPLE_CONTRACT = os.path.join(os.path.dirname(__file__), '..', 'data', 'raw', 'sample_contract.txt')
+
+
+class TestPipelineMetrics(unittest.TestCase):
+
+    def test_parser_records_stages_and_rules(self):
+        metrics = PipelineMetrics()
+        parser = ContractParser(metrics=metrics)
+        with open(SAMPLE_CONTRACT, 'r', encoding='utf-8') as f:
+            clauses = parser.analyze_contract(f.read())
+
+        for stage in ('parse_contract', 'classify_clause', 'extract_structured_data'):
+            self.assertEqual(metrics.stages[stage].count, 1)
+        matched = sum(int(matches) for _, matches, _ in metrics.rules.values())
+        self.assertGreater(matched, 0)
+        self.assertLessEqual(matched, sum(len(c.extracted_data) for c in clauses))
+
+    def test_merge_after_pickling_and_prometheus_export(self):
+        worker = PipelineMetrics()
+        worker.observe_stage('parse_contract', 0.002)
+        worker.observe_rules({('salary', 'salary_amount#0'): [1, 1, 0.0001]})
+        merged = PipelineMetrics()
+        merged.observe_stage('parse_contract', 0.5)
+        merged.merge(pickle.loads(pickle.dumps(worker.drain())))
+
+        self.assertEqual(worker.stages, {})
+        self.assertEqual(merged.stages['parse_contract'].count, 2)
+        text = merged.to_prometheus()
+        self.assertIn('contract_pipeline_stage_seconds_count{stage="parse_contract"} 2', text)
+        self.assertIn('contract_pipeline_stage_seconds_bucket{stage="parse_contract",le="+Inf"} 2', text)
+        self.assertIn('contract_pipeline_rule_calls_total{clause_type="salary",rule="salary_amount#0"} 1', text)
+
+    def test_counting_cursor_counts_statements_and_rows(self):
+        cursor = mock.MagicMock()
+        cursor.rowcount = 3
+        counting = CountingCursor(cursor)
+        counting.execute("UPDATE contracts SET processed = TRUE")
+        counting.execute("UPDATE contracts SET processed = TRUE")
+        self.assertEqual((counting.round_trips, counting.rows), (2, 6))
+        counting.fetchone()
+        cursor.fetchone.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import psycopg2
+
+import run_pipeline
+from contract_pipeline import content_hash
+
+
+class FakePipeline:
+    """
+    Group-committing pipeline over a shared table with a unique content hash:
+    storing a text whose row another pipeline holds in an open group waits
+    for that group to commit, like the INSERT ... ON CONFLICT does
+    """
+    owners = {}  # content hash -> pipeline holding it uncommitted
+    changed = threading.Condition()
+
+    def __init__(self, db_config, pool=None, group_commit_size=None, **options):
+        self.group_commit_size = group_commit_size
+        self.group = []
+
+    def process_contract(self, text, name, clauses=None, out=None, on_committed=None):
+        digest = content_hash(text)
+        with self.changed:
+            if not self.changed.wait_for(lambda: self.owners.get(digest) in (None, self), timeout=5):
+                raise AssertionError(f'{name} waited on an open group of another writer')
+            self.owners[digest] = self
+        self.group.append((digest, on_committed))
+        if len(self.group) >= self.group_commit_size:
+            self.flush()
+        return 1
+
+    def flush(self):
+        with self.changed:
+            for digest, on_committed in self.group:
+                self.owners.pop(digest, None)
+                on_committed()
+            self.group = []
+            self.changed.notify_all()
+
+    def flush_if_due(self):
+        return False
+
+    def close(self):
+        self.flush()
+
+
+class TestRunParallel(unittest.TestCase):
+
+    def test_duplicate_texts_with_size_only_group_commit(self):
+        with tempfile.TemporaryDirectory() as folder:
+            files = []
+            for i in range(12):
+                path = os.path.join(folder, f'{i:02}.txt')
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(f'**1. Salaris**\nHet salaris is € {i % 3}.000 per maand.\n')
+                files.append((path, os.stat(path)))
+            manifest = mock.Mock()
+            with mock.patch.object(run_pipeline, 'ContractPipeline', FakePipeline), \
+                    mock.patch('builtins.print'):
+                run_pipeline.run_parallel({}, None, files, 2, 2, {'group_commit_size': 5}, manifest)
+        self.assertEqual(sorted(call.args[0] for call in manifest.record.call_args_list),
+                         [path for path, _ in files])
+
+
+class ScriptedWatcher:
+    """InboxWatcher reporting the given batches of files, then stopping the daemon"""
+    batches = []
+
+    def __init__(self, directories, **options):
+        self.directories = directories
+        self.mode = 'polling'
+        self.batches = list(self.batches)
+
+    def poll(self, timeout=None):
+        if not self.batches:
+            raise KeyboardInterrupt
+        return self.batches.pop(0)
+
+    def landed_at(self, path):
+        return time.time()
+
+    def close(self):
+        pass
+
+
+class FlakyPipeline:
+    """Group-committing pipeline that loses its connection once, on the contract or commit named in fail"""
+    fail = None
+
+    def __init__(self, db_config, pool=None, **options):
+        self.group = []
+        self.lost = False
+
+    def process_contract(self, text, name, clauses=None, out=None, on_committed=None):
+        if name == type(self).fail:
+            type(self).fail = None
+            self.lost = True
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        self.group.append(on_committed)
+        return 1
+
+    def flush(self):
+        if type(self).fail == 'commit':
+            type(self).fail = None
+            self.lost = True
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        for on_committed in self.group:
+            on_committed()
+        self.group = []
+
+    def recover(self):
+        lost, self.lost = self.lost, False
+        if lost:
+            self.group = []
+        return lost
+
+    def close(self):
+        self.flush()
+
+
+class TestRunWatch(unittest.TestCase):
+
+    def watch(self, fail, batches):
+        FlakyPipeline.fail = fail
+        with tempfile.TemporaryDirectory() as inbox:
+            paths = []
+            for name in ('a.txt', 'b.txt'):
+                paths.append(os.path.join(inbox, name))
+                with open(paths[-1], 'w', encoding='utf-8') as f:
+                    f.write(f'**1. Salaris**\n{name}\n')
+            ScriptedWatcher.batches = [[paths[i] for i in batch] for batch in batches]
+            manifest = mock.Mock()
+            manifest.is_unchanged.return_value = False
+            with mock.patch.object(run_pipeline, 'ContractPipeline', FlakyPipeline), \
+                    mock.patch.object(run_pipeline, 'InboxWatcher', ScriptedWatcher), \
+                    mock.patch('builtins.print'), self.assertRaises(KeyboardInterrupt):
+                run_pipeline.run_watch({}, None, [inbox], {}, manifest)
+        return [os.path.basename(call.args[0]) for call in manifest.record.call_args_list]
+
+    def test_contracts_of_a_lost_group_are_processed_again(self):
+        self.assertEqual(self.watch('b.txt', [[0, 1], []]), ['a.txt', 'b.txt'])
+
+    def test_contracts_of_a_failed_commit_are_processed_again(self):
+        self.assertEqual(self.watch('commit', [[0, 1], [], []]), ['a.txt', 'b.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()